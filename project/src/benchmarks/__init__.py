@@ -0,0 +1,3 @@
+"""
+Mjerenja performansi kritičnih dijelova simulacije.
+"""
\ No newline at end of file
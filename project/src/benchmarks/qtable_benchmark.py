@@ -0,0 +1,83 @@
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from ..simulation.qtable import QTable
+
+def generate_transitions(n_transitions: int, n_states: int, state_size: int,
+                         n_actions: int, seed: int = 0) -> Tuple[List[Tuple], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generira sintetičke prijelaze (s, a, r, s') sa stanjima oblika kao u get_state().
+
+    Returns:
+        Lista mogućih stanja i polja indeksa stanja, akcija i nagrada
+    """
+    rng = np.random.default_rng(seed)
+    pool = [tuple(int(x) for x in row) for row in rng.integers(0, 30, size=(n_states, state_size))]
+    # Zipfova razdioba: neka stanja se ponavljaju češće, kao u stvarnom prometu
+    states = (rng.zipf(1.3, size=n_transitions + 1) - 1) % n_states
+    actions = rng.integers(0, n_actions, size=n_transitions)
+    rewards = rng.normal(size=n_transitions)
+    return pool, states, actions, rewards
+
+def run_dict(pool, states, actions, rewards, n_actions, alpha=0.1, gamma=0.9) -> Dict:
+    """Q-learning ažuriranja nad rječnikom s (stanje, akcija) ključevima"""
+    q_table = {}
+    for i in range(len(actions)):
+        s, s_new, a = pool[states[i]], pool[states[i + 1]], int(actions[i])
+        old_value = q_table.get((s, a), 0)
+        next_max = max([q_table.get((s_new, a_new), 0) for a_new in range(n_actions)])
+        q_table[(s, a)] = old_value + alpha * (rewards[i] + gamma * next_max - old_value)
+    return q_table
+
+def run_qtable(pool, states, actions, rewards, n_actions, alpha=0.1, gamma=0.9) -> QTable:
+    """Ista ažuriranja nad QTable (internirana stanja, float32 matrica)"""
+    q_table = QTable(n_actions)
+    for i in range(len(actions)):
+        s = q_table.state_id(pool[states[i]])
+        s_new = q_table.state_id(pool[states[i + 1]])
+        a = int(actions[i])
+        values = q_table.values
+        old_value = values[s, a]
+        values[s, a] = old_value + alpha * (rewards[i] + gamma * values[s_new].max() - old_value)
+    return q_table
+
+def measure(name: str, fn: Callable, *args) -> Tuple[object, float, int]:
+    """Mjeri vrijeme (bez tracemalloc-a) i vršnu memoriju (u zasebnom prolazu)"""
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n = len(args[2])
+    print(f"{name:>8}: {elapsed:7.2f}s, {n / elapsed:10.0f} prijelaza/s, "
+          f"vršna memorija {peak / 2**20:8.1f} MiB")
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Usporedba dict Q-tablice i QTable")
+    parser.add_argument('--transitions', type=int, default=10**6)
+    parser.add_argument('--states', type=int, default=100_000)
+    parser.add_argument('--lanes', type=int, default=8)
+    parser.add_argument('--actions', type=int, default=4)
+    args = parser.parse_args()
+
+    pool, states, actions, rewards = generate_transitions(
+        args.transitions, args.states, 4 * args.lanes + 1, args.actions)
+    print(f"{args.transitions} prijelaza, {args.states} mogućih stanja, "
+          f"{4 * args.lanes + 1} elemenata po stanju, {args.actions} akcija")
+
+    dict_table, dict_time, dict_peak = measure('dict', run_dict, pool, states, actions, rewards, args.actions)
+    q_table, q_time, q_peak = measure('QTable', run_qtable, pool, states, actions, rewards, args.actions)
+
+    print(f"Ubrzanje: {dict_time / q_time:.2f}x, memorija: {dict_peak / max(q_peak, 1):.2f}x manje")
+    print(f"Viđeno stanja: {q_table.n_states}, matrica Q-vrijednosti: {q_table.nbytes / 2**20:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
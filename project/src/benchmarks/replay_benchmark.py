@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+import numpy as np
+from collections import deque
+from ..simulation.qtable import QTable
+from ..simulation.replay import ReplayBuffer
+
+def run_deque(pool, states, actions, rewards, n_actions, capacity, batch_size,
+              alpha=0.1, gamma=0.9) -> float:
+    """Stari update_q_table: deque, random.sample i petlja nad rječnikom"""
+    q_table = {}
+    experience = deque(maxlen=capacity)
+    start = time.perf_counter()
+    for i in range(len(actions)):
+        experience.append((pool[states[i]], actions[i], rewards[i], pool[states[i + 1]]))
+        if len(experience) >= batch_size:
+            batch = random.sample(experience, batch_size)
+            for s, a, r, s_new in batch:
+                old_value = q_table.get((s, a), 0)
+                next_max = max([q_table.get((s_new, a_new), 0) for a_new in range(n_actions)])
+                q_table[(s, a)] = old_value + alpha * (r + gamma * next_max - old_value)
+    return time.perf_counter() - start
+
+def run_replay(pool, states, actions, rewards, n_actions, capacity, batch_size,
+               alpha=0.1, gamma=0.9) -> float:
+    """Novi update_q_table: ReplayBuffer i QTable.update_batch"""
+    q_table = QTable(n_actions)
+    experience = ReplayBuffer(capacity)
+    start = time.perf_counter()
+    for i in range(len(actions)):
+        experience.append(q_table.state_id(pool[states[i]]), actions[i],
+                          rewards[i], q_table.state_id(pool[states[i + 1]]))
+        if len(experience) >= batch_size:
+            q_table.update_batch(*experience.sample(batch_size), alpha, gamma)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Cijena update_q_table po koraku")
+    parser.add_argument('--steps', type=int, default=20_000)
+    parser.add_argument('--states', type=int, default=5_000)
+    parser.add_argument('--lanes', type=int, default=8)
+    parser.add_argument('--actions', type=int, default=4)
+    parser.add_argument('--capacity', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pool = [tuple(int(x) for x in row)
+            for row in rng.integers(0, 30, size=(args.states, 4 * args.lanes + 1))]
+    # Python liste kako petlja ne bi mjerila pretvorbu NumPy skalara
+    states = rng.integers(0, args.states, size=args.steps + 1).tolist()
+    actions = rng.integers(0, args.actions, size=args.steps).tolist()
+    rewards = rng.normal(size=args.steps).tolist()
+    params = (pool, states, actions, rewards, args.actions, args.capacity, args.batch_size)
+
+    old_time = run_deque(*params)
+    new_time = run_replay(*params)
+    print(f"batch_size={args.batch_size}, {args.steps} koraka")
+    print(f"  deque + dict: {old_time / args.steps * 1e6:8.1f} µs/korak")
+    print(f"  ReplayBuffer: {new_time / args.steps * 1e6:8.1f} µs/korak")
+    print(f"Ubrzanje: {old_time / new_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
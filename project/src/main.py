@@ -1,150 +1,176 @@
 import os
-import numpy as np
+import time
 from typing import Dict, List, Optional
 from simulation.qlearning import TrafficLightQLearning
+from simulation.multi_agent import MultiIntersectionQLearning
+from simulation.dqn import DeepQLearningAgent
+from simulation.shared_policy import SharedPolicyQLearning
+from simulation.discretizer import calibrate_agents
+from simulation.rewards import RewardEngine
+from simulation.checkpoint import load_checkpoint
+from simulation.evaluation import run_evaluation
+from simulation.vec_env import run_vec_training
 from simulation.standard_simulation import run_standard_simulation, SimulationStats
+from simulation.runner import run_episodes
 from utils.sumo_utils import (
-    initialize_simulation,
     load_trips,
-    get_traffic_lights,
-    get_traffic_light_phases,
-    get_controlled_lanes,
     get_waiting_vehicles,
-    get_vehicle_data,
-    save_network_state,
-    close_simulation
+    save_network_state
 )
 from utils.mapping import generate_full_mapping
+from utils.observation import SubscriptionObserver
+from utils.topology import load_topology
+from utils.reset import EpisodeResetManager
+from utils.demand import DemandSampler
+from utils.metrics_sink import MetricsSink
 
 def run_simulation(simulation_type: str, net_file: str, trips_file: str, 
-                  episodes: Optional[int] = None, steps: Optional[int] = None) -> SimulationStats:
+                  episodes: Optional[int] = None, steps: Optional[int] = None,
+                  reset_mode: str = 'auto', decision_interval: int = 1,
+                  min_green: int = 0, metrics_dir: Optional[str] = None,
+                  warm_start: Optional[str] = None, checkpoint_dir: Optional[str] = None,
+                  checkpoint_every: int = 10, discretize: bool = False,
+                  calibration_steps: int = 300, reward_config: Optional[str] = None,
+                  pipelined: bool = False, backend: Optional[str] = None,
+                  n_envs: int = 4, asynchronous: bool = False,
+                  demand_window: Optional[int] = None, demand_scale: float = 1.0,
+                  demand_seed: int = 0) -> SimulationStats:
     """
     Pokreće simulaciju odabranog tipa.
     
     Args:
-        simulation_type: Tip simulacije ('standard', 'qlearning', 'deep_qlearning')
+        simulation_type: Tip simulacije ('standard', 'qlearning', 'qlearning_multi', 'deep_qlearning')
+            'qlearning_multi' je isti Q-learning, ali svi semafori uče odjednom
+            preko MultiIntersectionQLearning
+            'deep_qlearning' koristi DeepQLearningAgent (NumPy DQN) u istoj petlji
+            'qlearning_shared' je jedna zajednička DQN politika za sve semafore (SharedPolicyQLearning)
+            'qlearning_eval' je evaluacija pohlepne politike iz checkpointa (warm_start), bez učenja
+            'qlearning_vec' je Q-learning s n_envs paralelnih simulacija (VecEnv) i jednim učenikom
         net_file: Putanja do SUMO mrežne datoteke
         trips_file: Putanja do datoteke s rutama vozila
         episodes: Broj epizoda (za RL simulacije)
         steps: Broj koraka po epizodi
+        reset_mode: Način resetiranja između epizoda ('load_state', 'restart', 'auto')
+        decision_interval: Sekunde simulacije između odluka agenata
+        min_green: Minimalno trajanje faze u sekundama
+        metrics_dir: Direktorij za metrike po koraku, semaforu i epizodi (None = bez zapisivanja)
+        warm_start: Checkpoint iz kojeg se nastavlja učenje
+        checkpoint_dir: Direktorij u koji se periodički sprema checkpoint
+        checkpoint_every: Broj epizoda između dva checkpointa
+        discretize: Ograničeni indeks stanja (StateDiscretizer) i gusta Q-tablica za 'qlearning'
+        calibration_steps: Trajanje kalibracijskog prolaza za granice razreda u sekundama
+        reward_config: JSON s težinama članova nagrade (None = zadane težine)
+        pipelined: Ažuriranje iz spremnika na pozadinskoj dretvi dok SUMO računa sljedeći korak
+        backend: Pozadina simulatora ('traci', 'libsumo', 'fake', 'queue'; default: SUMO_BACKEND ili 'traci')
+        n_envs: Broj paralelnih simulacija za 'qlearning_vec'
+        asynchronous: 'qlearning_vec' obrađuje simulacije čim odgovore, bez čekanja ostalih
+        demand_window: Trajanje vremenskog prozora potražnje u sekundama (default: steps);
+            epizode učenja uzimaju nasumične prozore, ostali tipovi prvi prozor s polascima
+        demand_scale: Faktor potražnje (npr. 2 ili 4 za testove opterećenja)
+        demand_seed: Sjeme za odabir prozora i uzorkovanje vozila
     
     Returns:
         SimulationStats objekt s prikupljenim statistikama
     """
+    # Izrezi potražnje po vremenskim prozorima (samo ako su zatraženi)
+    sampler = None
+    if demand_window or demand_scale != 1.0:
+        sampler = DemandSampler(trips_file, demand_window or steps or 1000, scale=demand_scale, seed=demand_seed)
+        if simulation_type not in ('qlearning', 'qlearning_multi', 'qlearning_shared', 'deep_qlearning'):
+            trips_file = sampler.slice(sampler.start)
+    
     if simulation_type == 'standard':
-        return run_standard_simulation(net_file, trips_file, steps or 1000)
-    elif simulation_type == 'qlearning':
-        # Inicijalizacija SUMO simulacije
-        traci = initialize_simulation(net_file, trips_file)
+        return run_standard_simulation(net_file, trips_file, steps or 1000, metrics_dir=metrics_dir,
+                                       backend=backend)
+    elif simulation_type == 'qlearning_eval':
+        if not warm_start:
+            raise ValueError("Evaluacija zahtijeva checkpoint (warm_start)")
+        return run_evaluation(net_file, trips_file, warm_start, episodes or 5, steps or 1000,
+                              decision_interval=decision_interval, min_green=min_green,
+                              reset_mode=reset_mode, metrics_dir=metrics_dir, backend=backend)
+    elif simulation_type == 'qlearning_vec':
+        return run_vec_training(net_file, trips_file, n_envs=n_envs, episodes=episodes or 100,
+                                steps=steps or 1000, asynchronous=asynchronous, reset_mode=reset_mode,
+                                decision_interval=decision_interval, min_green=min_green,
+                                reward_config=reward_config, backend=backend, warm_start=warm_start,
+                                checkpoint_dir=checkpoint_dir, checkpoint_every=checkpoint_every)
+    elif simulation_type in ('qlearning', 'qlearning_multi', 'qlearning_shared', 'deep_qlearning'):
+        # Inicijalizacija SUMO simulacije (početno stanje se sprema jednom po pokretanju)
+        resets = EpisodeResetManager(net_file, sampler.sample() if sampler else trips_file,
+                                     mode=reset_mode, backend=backend)
+        traci = resets.start()
         
-        # Učitavanje ruta vozila
-        num_vehicles = load_trips(trips_file)
-        print(f"Učitano {num_vehicles} vozila iz {trips_file}")
+        # Učitavanje ruta vozila (izrez potražnje ako je zadan prozor)
+        num_vehicles = load_trips(resets.trips_file)
+        print(f"Učitano {num_vehicles} vozila iz {resets.trips_file}")
         
         # Inicijalizacija agenata za semafore
-        traffic_lights = get_traffic_lights()
+        # Statička topologija mreže (jedinstvene trake i faze po semaforu)
+        topology = load_topology(net_file, traci)
+        traffic_lights = topology.traffic_lights
         agents = {}
         
+        # Zajednički opažač: jedna snimka po koraku za sve agente i statistiku
+        observer = SubscriptionObserver(connection=traci)
+        agent_class = DeepQLearningAgent if simulation_type == 'deep_qlearning' else TrafficLightQLearning
+        reward_engine = RewardEngine.from_config(reward_config) if reward_config else None
+        
         for tl_id in traffic_lights:
-            phases = get_traffic_light_phases(tl_id)
-            controlled_lanes = get_controlled_lanes(tl_id)
+            phases = topology.phases(tl_id)
+            controlled_lanes = topology.lanes(tl_id)
             
             if not controlled_lanes:
                 print(f"Upozorenje: Semafor {tl_id} nema kontroliranih traka")
                 continue
                 
-            agents[tl_id] = TrafficLightQLearning(
+            agents[tl_id] = agent_class(
                 tl_id=tl_id,
                 phases=phases,
-                controlled_lanes=controlled_lanes
+                controlled_lanes=controlled_lanes,
+                decision_interval=decision_interval,
+                min_green=min_green,
+                observer=observer,
+                reward_engine=reward_engine
             )
             print(f"Agent inicijaliziran za semafor {tl_id} s {len(phases)} faza")
         
-        # Inicijalizacija statistike
-        stats = SimulationStats()
+        # Vektorizirani odabir akcija i ažuriranje za sve semafore
+        if simulation_type == 'qlearning_multi':
+            multi = MultiIntersectionQLearning(agents)
+        elif simulation_type == 'qlearning_shared':
+            multi = SharedPolicyQLearning(agents)
+        else:
+            multi = None
         
-        # Glavna petlja učenja
-        for episode in range(episodes or 100):
-            print(f"\nEpizoda {episode + 1}/{episodes or 100}")
-            
-            # Resetiranje simulacije
-            traci.simulation.loadState("Input/initial_state.xml")
-            
-            # Inicijalizacija stanja za epizodu
-            states = {tl_id: agent.get_state() for tl_id, agent in agents.items()}
-            total_reward = 0
-            
-            for step in range(steps or 1000):
-                # Prikupljanje podataka o vozilima
-                vehicle_data = get_vehicle_data()
-                
-                # Prikupljanje statistike
-                current_stats = {
-                    'waiting_time': 0,
-                    'queue_length': 0,
-                    'speed': 0,
-                    'stops': 0
-                }
-                
-                for vehicle_id, data in vehicle_data.items():
-                    current_stats['waiting_time'] += data.get('waiting_time', 0)
-                    if data.get('speed', 0) < 0.1:
-                        current_stats['queue_length'] += 1
-                    current_stats['speed'] += data.get('speed', 0)
-                    current_stats['stops'] += data.get('stops', 0)
-                
-                if vehicle_data:
-                    stats.waiting_times.append(current_stats['waiting_time'] / len(vehicle_data))
-                    stats.queue_lengths.append(current_stats['queue_length'])
-                    stats.vehicle_speeds.append(current_stats['speed'] / len(vehicle_data))
-                    stats.vehicle_counts.append(len(vehicle_data))
-                    stats.stops_count.append(current_stats['stops'])
-                
-                # Ažuriranje Q-tablice za svaki semafor
-                for tl_id, agent in agents.items():
-                    # Odabir akcije
-                    action = agent.choose_action(states[tl_id])
-                    
-                    # Izvršavanje akcije
-                    traci.trafficlight.setPhase(tl_id, action)
-                    
-                    # Dobivanje novog stanja i nagrade
-                    new_state = agent.get_state()
-                    reward = agent.get_reward()
-                    
-                    # Ažuriranje Q-tablice
-                    agent.update_q_table(states[tl_id], action, reward, new_state)
-                    
-                    # Ažuriranje stanja
-                    states[tl_id] = new_state
-                    total_reward += reward
-                
-                # Napredovanje simulacije
-                traci.simulationStep()
-                
-                # Ispisivanje napretka
-                if (step + 1) % 100 == 0:
-                    print(f"Korak {step + 1}/{steps or 1000}, "
-                          f"Broj vozila: {len(vehicle_data)}, "
-                          f"Ukupna nagrada: {total_reward:.2f}")
-            
-            # Ispisivanje statistike za epizodu
-            print(f"Epizoda {episode + 1} završena. "
-                  f"Ukupna nagrada: {total_reward:.2f}, "
-                  f"Broj vozila: {len(vehicle_data)}")
+        # Diskretizacija stanja: granice razreda iz kalibracijskog prolaza, gusta Q-tablica
+        if discretize and simulation_type == 'qlearning':
+            calibrate_agents(agents, traci, steps=calibration_steps)
+            resets.invalidate()
+        
+        # Nastavak učenja iz spremljenog checkpointa
+        done = 0
+        if warm_start:
+            done = load_checkpoint(warm_start, agents=agents, multi=multi)
+            print(f"Učitan checkpoint {warm_start} ({done} epizoda učenja)")
+        
+        # Inicijalizacija statistike i zapisivanja metrika
+        stats = SimulationStats()
+        sink = MetricsSink(metrics_dir, run_id=f"{simulation_type}-{time.strftime('%Y%m%d-%H%M%S')}",
+                           tl_ids=list(agents)) if metrics_dir else None
         
-        # Zatvaranje simulacije
-        close_simulation()
+        # Glavna petlja učenja (zatvara simulaciju, statistiku i metrike)
+        run_episodes(resets, observer, agents, stats, episodes or 100, steps or 1000,
+                     multi=multi, decision_interval=decision_interval, sink=sink,
+                     pipelined=pipelined, sampler=sampler, checkpoint_dir=checkpoint_dir,
+                     checkpoint_every=checkpoint_every, completed=done)
         
         return stats
-    elif simulation_type == 'deep_qlearning':
-        # TODO: Implementirati Deep Q-learning
-        raise NotImplementedError("Deep Q-learning još nije implementiran")
     else:
         raise ValueError(f"Nepoznat tip simulacije: {simulation_type}")
 
 def compare_simulations(simulation_types: List[str], net_file: str, trips_file: str,
-                       episodes: Optional[int] = None, steps: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+                       episodes: Optional[int] = None, steps: Optional[int] = None,
+                       metrics_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
     """
     Uspoređuje različite tipove simulacija.
     
@@ -154,6 +180,7 @@ def compare_simulations(simulation_types: List[str], net_file: str, trips_file:
         trips_file: Putanja do datoteke s rutama vozila
         episodes: Broj epizoda (za RL simulacije)
         steps: Broj koraka po epizodi
+        metrics_dir: Direktorij za metrike po koraku, semaforu i epizodi (None = bez zapisivanja)
     
     Returns:
         Rječnik s usporednim statistikama
@@ -162,15 +189,10 @@ def compare_simulations(simulation_types: List[str], net_file: str, trips_file:
     
     for sim_type in simulation_types:
         print(f"\nPokretanje {sim_type} simulacije...")
-        stats = run_simulation(sim_type, net_file, trips_file, episodes, steps)
+        stats = run_simulation(sim_type, net_file, trips_file, episodes, steps, metrics_dir=metrics_dir)
         
-        comparison[sim_type] = {
-            'avg_waiting_time': np.mean(stats.waiting_times),
-            'avg_queue_length': np.mean(stats.queue_lengths),
-            'avg_speed': np.mean(stats.vehicle_speeds),
-            'avg_vehicles': np.mean(stats.vehicle_counts),
-            'total_stops': np.sum(stats.stops_count)
-        }
+        # Online agregati, bez držanja svih koraka u memoriji
+        comparison[sim_type] = stats.summary()
     
     return comparison
 
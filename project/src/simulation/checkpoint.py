@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import numpy as np
+from typing import Dict, Optional
+from .qlearning import TrafficLightQLearning
+from .multi_agent import MultiIntersectionQLearning
+from .dqn import DeepQLearningAgent
+from .shared_policy import SharedPolicyQLearning
+from .qtable import QTable, DenseQTable
+from .discretizer import StateDiscretizer
+
+CHECKPOINT_VERSION = 1
+
+def _encode_multi_state(state):
+    """(indeks semafora, stanje) -> ravna n-torka"""
+    return (state[0],) + state[1]
+
+def _decode_multi_state(row: np.ndarray):
+    values = row.tolist()
+    return values[0], tuple(values[1:])
+
+def _replace_directory(tmp_dir: str, directory: str) -> None:
+    """Zamjenjuje direktorij checkpointa novim (stari se briše tek nakon zamjene)"""
+    old_dir = f"{directory}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, old_dir)
+    os.rename(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def read_checkpoint_meta(directory: str) -> dict:
+    """Čita checkpoint.json i provjerava inačicu"""
+    with open(os.path.join(directory, 'checkpoint.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Nepodržana inačica checkpointa: {meta.get('version')}")
+    return meta
+
+def save_checkpoint(directory: str, agents: Optional[Dict[str, TrafficLightQLearning]] = None,
+                    multi: Optional[MultiIntersectionQLearning] = None, episode: int = 0) -> None:
+    """
+    Sprema Q-tablice, epsilon/temperaturu i spremnike iskustava.
+
+    Checkpoint je direktorij s checkpoint.json i binarnim datotekama po
+    agentu: Q-vrijednosti i indeks stanja kao .npy (učitljivi memorijski
+    mapirano) te spremnik iskustava kao .npz. Zapisuje se u privremeni
+    direktorij koji tek na kraju zamjenjuje stari checkpoint.
+
+    Args:
+        directory: Direktorij checkpointa
+        agents: Agenti po ID-u semafora
+        multi: Vektorizirani agent ili zajednička politika (umjesto agents)
+        episode: Broj završenih epizoda
+    """
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    meta = {'version': CHECKPOINT_VERSION, 'episode': episode}
+
+    if isinstance(multi, SharedPolicyQLearning):
+        meta['kind'] = 'shared'
+        meta['tl_ids'] = multi.tl_ids
+        meta['n_features'] = multi.n_features
+        meta['epsilon'] = multi.epsilon
+        multi.save(os.path.join(tmp_dir, 'shared'))
+    elif multi is not None:
+        meta['kind'] = 'multi'
+        meta['tl_ids'] = multi.tl_ids
+        meta['n_actions'] = multi.n_actions.tolist()
+        multi.q_table.save(os.path.join(tmp_dir, 'multi'), encode=_encode_multi_state)
+        np.savez(os.path.join(tmp_dir, 'multi.params.npz'),
+                 epsilon=multi.epsilon, temperature=multi.temperature)
+        idx = (multi.position - multi.size + np.arange(multi.size)) % multi.experience_size
+        np.savez(os.path.join(tmp_dir, 'multi.replay.npz'),
+                 transitions=multi.transitions[:, idx], rewards=multi.rewards[:, idx])
+    else:
+        meta['kind'] = 'agents'
+        meta['agents'] = []
+        for i, (tl_id, agent) in enumerate((agents or {}).items()):
+            prefix = os.path.join(tmp_dir, f"agent{i}")
+            if isinstance(agent, DeepQLearningAgent):
+                model = 'dqn'
+                agent.save(prefix)
+            else:
+                model = 'dense' if agent.discretizer is not None else 'qtable'
+                agent.q_table.save(prefix)
+                agent.experience.save(f"{prefix}.replay.npz")
+            meta['agents'].append({
+                'tl_id': tl_id,
+                'prefix': f"agent{i}",
+                'model': model,
+                'discretizer': agent.discretizer.to_dict() if model == 'dense' else None,
+                'n_actions': len(agent.phases),
+                'controlled_lanes': list(agent.controlled_lanes),
+                'epsilon': agent.epsilon,
+                'temperature': agent.temperature
+            })
+
+    with open(os.path.join(tmp_dir, 'checkpoint.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    _replace_directory(tmp_dir, directory)
+
+def load_checkpoint(directory: str, agents: Optional[Dict[str, TrafficLightQLearning]] = None,
+                    multi: Optional[MultiIntersectionQLearning] = None,
+                    mmap: bool = False, replay: bool = True) -> int:
+    """
+    Učitava checkpoint u postojeće agente (warm start).
+
+    Args:
+        directory: Direktorij checkpointa
+        agents: Agenti po ID-u semafora
+        multi: Vektorizirani agent ili zajednička politika (umjesto agents)
+        mmap: Q-tablice se učitavaju memorijski mapirano (za evaluaciju)
+        replay: Učitava i spremnike iskustava
+
+    Returns:
+        Broj epizoda spremljen u checkpointu
+    """
+    meta = read_checkpoint_meta(directory)
+
+    if isinstance(multi, SharedPolicyQLearning):
+        # Politika ne ovisi o semaforima, pa se može nastaviti i na drugoj mreži
+        if meta['kind'] != 'shared' or meta['n_features'] != multi.n_features:
+            raise ValueError("Checkpoint ne odgovara zajedničkoj politici")
+        multi.load(os.path.join(directory, 'shared'), replay=replay)
+        multi.epsilon = meta['epsilon']
+        return meta['episode']
+
+    if multi is not None:
+        if meta['kind'] != 'multi' or meta['tl_ids'] != multi.tl_ids:
+            raise ValueError("Checkpoint ne odgovara semaforima vektoriziranog agenta")
+        multi.q_table = QTable.load(os.path.join(directory, 'multi'), mmap=mmap,
+                                    decode=_decode_multi_state)
+        with np.load(os.path.join(directory, 'multi.params.npz')) as params:
+            multi.epsilon = params['epsilon']
+            multi.temperature = params['temperature']
+        if replay:
+            with np.load(os.path.join(directory, 'multi.replay.npz')) as data:
+                transitions = data['transitions'][:, -multi.experience_size:]
+                rewards = data['rewards'][:, -multi.experience_size:]
+            multi.size = rewards.shape[1]
+            multi.transitions[:, :multi.size] = transitions
+            multi.rewards[:, :multi.size] = rewards
+            multi.position = multi.size % multi.experience_size
+        return meta['episode']
+
+    if meta['kind'] != 'agents':
+        raise ValueError("Checkpoint je spremljen za vektoriziranog agenta ili zajedničku politiku")
+    for item in meta['agents']:
+        agent = (agents or {}).get(item['tl_id'])
+        if agent is None:
+            print(f"Upozorenje: Semafor {item['tl_id']} iz checkpointa ne postoji")
+            continue
+        if item['n_actions'] != len(agent.phases) or item['controlled_lanes'] != list(agent.controlled_lanes):
+            print(f"Upozorenje: Semafor {item['tl_id']} ima drugačije faze ili trake, preskačem")
+            continue
+        model = item.get('model', 'qtable')
+        if (model == 'dqn') != isinstance(agent, DeepQLearningAgent):
+            raise ValueError(f"Checkpoint semafora {item['tl_id']} je spremljen za model '{model}'")
+        prefix = os.path.join(directory, item['prefix'])
+        if model == 'dqn':
+            agent.load(prefix, replay=replay)
+            agent.epsilon = item['epsilon']
+            continue
+        if model == 'dense':
+            # Diskretizator iz checkpointa zamjenjuje kalibrirani (indeksi moraju odgovarati tablici)
+            agent.set_discretizer(StateDiscretizer.from_dict(item['discretizer']))
+            agent.q_table = DenseQTable.load(prefix, mmap=mmap)
+        else:
+            agent.discretizer = None
+            agent.q_table = QTable.load(prefix, mmap=mmap)
+        agent.epsilon = item['epsilon']
+        agent.temperature = item['temperature']
+        if replay:
+            agent.experience.load(f"{prefix}.replay.npz")
+    return meta['episode']
@@ -0,0 +1,183 @@
+import numpy as np
+from typing import Dict, List, Sequence
+
+# Zadane granice razreda za značajke trake (vozila koja čekaju, prosječno
+# vrijeme čekanja u sekundama, duljina reda, prosječna brzina u m/s)
+DEFAULT_EDGES = (
+    (1, 2, 4, 8),
+    (5, 15, 30, 60, 120),
+    (1, 2, 4, 8),
+    (1, 5, 10)
+)
+
+# Granice razreda za vrijeme od zadnje promjene faze (brojač se ograničava na max_steps)
+DEFAULT_STEP_EDGES = (5, 10, 20, 40)
+
+# Sjeme koeficijenata raspršivanja (fiksno, pa su koeficijenti isti u svakom procesu)
+_HASH_SEED = 0x5EED
+
+class StateDiscretizer:
+    """
+    Preslikavanje značajki stanja u ograničeni cjelobrojni indeks.
+
+    Ulaz je redak značajki kao u TrafficLightQLearning.get_state (4 po
+    traci i vrijeme od promjene faze). Svaka značajka se svrstava u razred
+    po granicama (zadanim ili naučenim kao kvantili iz kalibracijskog
+    prolaza), brojač koraka se ograničava, a znamenke razreda se slažu u
+    indeks mješovite baze. Ako bi taj indeks premašio max_states, znamenke
+    se raspršuju u n_buckets pretinaca. Indeks je uvijek u [0, n_states),
+    pa Q-tablica može biti gusto polje. Sve je vektorizirano po retcima.
+    """
+
+    def __init__(self, n_lanes: int, edges: Sequence[Sequence[float]] = DEFAULT_EDGES,
+                 step_edges: Sequence[float] = DEFAULT_STEP_EDGES, max_steps: int = 120,
+                 max_states: int = 1 << 20, n_buckets: int = 1 << 16):
+        """
+        Args:
+            n_lanes: Broj kontroliranih traka
+            edges: Granice razreda za svaku od 4 značajke trake (zajedničke za sve trake)
+            step_edges: Granice razreda za vrijeme od zadnje promjene faze
+            max_steps: Gornja granica brojača koraka
+            max_states: Najveći broj stanja za izravno (gusto) indeksiranje
+            n_buckets: Broj pretinaca kad se koristi raspršivanje
+        """
+        if len(edges) != 4:
+            raise ValueError("Potrebne su granice za 4 značajke trake")
+        self.n_lanes = n_lanes
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.step_edges = np.asarray(step_edges, dtype=np.float64)
+        self.max_steps = max_steps
+        self.max_states = max_states
+        self.n_buckets = n_buckets
+        self._build()
+
+    def _build(self) -> None:
+        """Računa baze znamenki, broj stanja i koeficijente indeksa"""
+        columns = [self.edges[j] for _ in range(self.n_lanes) for j in range(4)] + [self.step_edges]
+        self._column_edges = columns
+        self.radix = np.array([len(e) + 1 for e in columns], dtype=np.int64)
+
+        # Veličina prostora mješovite baze (Python int, bez preljeva)
+        size = 1
+        for r in self.radix.tolist():
+            size *= r
+        self.hashed = size > self.max_states
+        if self.hashed:
+            self.n_states = self.n_buckets
+            # Neparni 64-bitni koeficijenti za raspršivanje znamenki
+            rng = np.random.default_rng(_HASH_SEED)
+            coefficients = rng.integers(1, 2 ** 62, size=len(columns), dtype=np.int64).astype(np.uint64)
+            self._coefficients = coefficients * np.uint64(2) + np.uint64(1)
+        else:
+            self.n_states = size
+            self._coefficients = np.ones(len(columns), dtype=np.int64)
+            self._coefficients[:-1] = np.cumprod(self.radix[::-1])[::-1][1:]
+
+    def digits(self, features: np.ndarray) -> np.ndarray:
+        """Razredi značajki [retci, stupci] (brojač koraka je ograničen)"""
+        features = np.atleast_2d(features)
+        result = np.empty(features.shape, dtype=np.int64)
+        for j, edges in enumerate(self._column_edges[:-1]):
+            result[:, j] = np.searchsorted(edges, features[:, j], side='right')
+        steps = np.minimum(features[:, -1], self.max_steps)
+        result[:, -1] = np.searchsorted(self.step_edges, steps, side='right')
+        return result
+
+    def encode_batch(self, features: np.ndarray) -> np.ndarray:
+        """
+        Indeksi stanja za matricu značajki.
+
+        Args:
+            features: Značajke [retci, 4 * n_lanes + 1]
+
+        Returns:
+            int64 indeksi u [0, n_states)
+        """
+        digits = self.digits(features)
+        if not self.hashed:
+            return digits @ self._coefficients
+        # Multiplikativno raspršivanje (uint64 aritmetika se namjerno prelijeva)
+        mixed = (digits.astype(np.uint64) + np.uint64(1)) * self._coefficients
+        h = np.bitwise_xor.reduce(mixed, axis=1)
+        h ^= h >> np.uint64(29)
+        return (h % np.uint64(self.n_buckets)).astype(np.int64)
+
+    def encode(self, features: np.ndarray) -> int:
+        """Indeks stanja za jedan redak značajki"""
+        return int(self.encode_batch(features)[0])
+
+    def calibrate(self, samples: np.ndarray, n_bins: int = 5) -> 'StateDiscretizer':
+        """
+        Uči granice razreda značajki traka kao kvantile iz kalibracijskog prolaza.
+        Vrijednosti istih značajki svih traka se spajaju; ponovljene granice se uklanjaju.
+
+        Args:
+            samples: Značajke [retci, 4 * n_lanes + 1]
+            n_bins: Broj razreda po značajci
+        """
+        samples = np.atleast_2d(samples)
+        if not len(samples) or not self.n_lanes:
+            return self
+        lanes = samples[:, :4 * self.n_lanes].reshape(-1, 4)
+        quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+        edges = []
+        for j in range(4):
+            e = np.unique(np.quantile(lanes[:, j], quantiles))
+            # Razred "nula" (nema vozila) ostaje odvojen od ostalih
+            e = e[e > 0]
+            edges.append(e if len(e) else self.edges[j])
+        self.edges = edges
+        self._build()
+        return self
+
+    def to_dict(self) -> Dict:
+        """Parametri kao rječnik (za checkpoint.json)"""
+        return {
+            'n_lanes': self.n_lanes,
+            'edges': [e.tolist() for e in self.edges],
+            'step_edges': self.step_edges.tolist(),
+            'max_steps': self.max_steps,
+            'max_states': self.max_states,
+            'n_buckets': self.n_buckets
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StateDiscretizer':
+        return cls(data['n_lanes'], data['edges'], data['step_edges'], data['max_steps'],
+                   data['max_states'], data['n_buckets'])
+
+def calibrate_agents(agents: Dict, connection, steps: int = 300, n_bins: int = 5,
+                     **kwargs) -> Dict[str, StateDiscretizer]:
+    """
+    Kalibracijski prolaz: simulacija teče s programima semafora iz mreže,
+    a značajke svakog agenta se skupljaju i iz njih uče granice razreda.
+    Svaki agent dobiva vlastiti diskretizator (i gustu Q-tablicu).
+
+    Args:
+        agents: Agenti po ID-u semafora (TrafficLightQLearning)
+        connection: TraCI konekcija
+        steps: Broj sekundi kalibracije
+        n_bins: Broj razreda po značajci
+        kwargs: Ostali parametri StateDiscretizer
+
+    Returns:
+        Diskretizatori po ID-u semafora
+    """
+    if not agents:
+        return {}
+    observer = next(iter(agents.values())).observer
+    samples: Dict[str, List[np.ndarray]] = {tl_id: [] for tl_id in agents}
+    for _ in range(steps):
+        connection.simulationStep()
+        snapshot = observer.snapshot()
+        for tl_id, agent in agents.items():
+            samples[tl_id].append(agent.features(snapshot))
+
+    discretizers = {}
+    for tl_id, agent in agents.items():
+        discretizer = StateDiscretizer(len(agent.controlled_lanes), **kwargs)
+        discretizer.calibrate(np.array(samples[tl_id]), n_bins)
+        agent.set_discretizer(discretizer)
+        discretizers[tl_id] = discretizer
+    print(f"Kalibrirano {len(discretizers)} diskretizatora stanja ({steps} koraka)")
+    return discretizers
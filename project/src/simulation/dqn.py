@@ -0,0 +1,318 @@
+import numpy as np
+from typing import Dict, List, Sequence
+from ..utils.observation import SubscriptionObserver, StepSnapshot
+from .qlearning import TrafficLightQLearning
+from .replay import TransitionBuffer
+
+# Skale za normalizaciju značajki trake (vozila koja čekaju, prosječno
+# vrijeme čekanja, duljina reda, prosječna brzina)
+FEATURE_SCALE = np.array([10.0, 60.0, 10.0, 15.0], dtype=np.float32)
+
+class MLP:
+    """
+    Mala potpuno povezana mreža (ReLU skriveni slojevi, linearni izlaz) u NumPyju.
+
+    Ulaz je uvijek serija (batch × značajke), pa su prolaz unaprijed i
+    unatrag po jedna matrična operacija po sloju. Težine su float32 i
+    uče se Adamom s Huber gubitkom nad Q-vrijednostima odabranih akcija.
+    Svi parametri (i njihovi gradijenti) su pogledi u jedno ravno polje,
+    pa je Adam korak nekoliko operacija nad cijelom mrežom odjednom.
+    """
+
+    def __init__(self, sizes: Sequence[int], learning_rate: float = 1e-3, seed: int = None):
+        """
+        Args:
+            sizes: Veličine slojeva, od ulaza do izlaza (npr. [ulaz, 64, 64, akcije])
+            learning_rate: Stopa učenja za Adam
+            seed: Sjeme za inicijalizaciju težina
+        """
+        rng = np.random.default_rng(seed)
+        self.sizes = list(sizes)
+        self.learning_rate = learning_rate
+        shapes = [shape for n_in, n_out in zip(self.sizes[:-1], self.sizes[1:])
+                  for shape in ((n_in, n_out), (n_out,))]
+        self.flat = np.zeros(sum(int(np.prod(shape)) for shape in shapes), dtype=np.float32)
+        self.grad = np.zeros_like(self.flat)
+        params = self._views(self.flat, shapes)
+        grads = self._views(self.grad, shapes)
+        self.weights, self.biases = params[0::2], params[1::2]
+        self._weight_grads, self._bias_grads = grads[0::2], grads[1::2]
+
+        # He inicijalizacija za ReLU slojeve (pomaci ostaju 0)
+        for w in self.weights:
+            w[...] = rng.standard_normal(w.shape) * np.sqrt(2.0 / w.shape[0])
+
+        # Adam momenti
+        self._m = np.zeros_like(self.flat)
+        self._v = np.zeros_like(self.flat)
+        self._t = 0
+
+    @staticmethod
+    def _views(flat: np.ndarray, shapes) -> List[np.ndarray]:
+        """Dijeli ravno polje na poglede zadanih oblika"""
+        views = []
+        offset = 0
+        for shape in shapes:
+            size = int(np.prod(shape))
+            views.append(flat[offset:offset + size].reshape(shape))
+            offset += size
+        return views
+
+    def parameters(self) -> List[np.ndarray]:
+        """Težine i pomaci, redom po slojevima"""
+        return [p for layer in zip(self.weights, self.biases) for p in layer]
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        """Q-vrijednosti za seriju ulaza"""
+        h = x
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w + b
+            if i < last:
+                np.maximum(h, 0, out=h)
+        return h
+
+    def train_batch(self, x: np.ndarray, actions: np.ndarray, targets: np.ndarray) -> float:
+        """
+        Jedan korak Adama na seriji: Huber gubitak između Q(s, a) i ciljeva.
+
+        Returns:
+            Prosječni gubitak serije
+        """
+        # Prolaz unaprijed uz pamćenje aktivacija
+        activations = [x]
+        h = x
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w + b
+            if i < last:
+                np.maximum(h, 0, out=h)
+            activations.append(h)
+
+        # Gradijent samo za izlaze odabranih akcija
+        rows = np.arange(len(actions))
+        error = activations[-1][rows, actions] - targets
+        abs_error = np.abs(error)
+        loss = np.where(abs_error < 1.0, 0.5 * error ** 2, abs_error - 0.5).mean()
+        grad = np.zeros_like(activations[-1])
+        grad[rows, actions] = np.clip(error, -1.0, 1.0) / len(actions)
+
+        # Prolaz unatrag (gradijenti se pišu izravno u ravno polje)
+        for i in range(last, -1, -1):
+            grad.sum(axis=0, out=self._bias_grads[i])
+            np.matmul(activations[i].T, grad, out=self._weight_grads[i])
+            if i > 0:
+                grad = (grad @ self.weights[i].T) * (activations[i] > 0)
+
+        # Adam nad svim parametrima odjednom
+        self._t += 1
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = self.learning_rate * np.sqrt(1 - beta2 ** self._t) / (1 - beta1 ** self._t)
+        g = self.grad
+        self._m *= beta1
+        self._m += (1 - beta1) * g
+        self._v *= beta2
+        self._v += (1 - beta2) * g * g
+        self.flat -= np.float32(step) * self._m / (np.sqrt(self._v) + np.float32(eps))
+        return float(loss)
+
+    def copy_from(self, other: 'MLP') -> None:
+        """Kopira težine druge mreže (za ciljnu mrežu)"""
+        self.flat[...] = other.flat
+
+    def state_dict(self, optimizer: bool = False) -> Dict[str, np.ndarray]:
+        """Težine kao rječnik polja (za np.savez), po potrebi i stanje Adam optimizatora"""
+        arrays = {f"p{i}": p for i, p in enumerate(self.parameters())}
+        arrays['sizes'] = np.array(self.sizes)
+        if optimizer:
+            arrays['adam_m'] = self._m
+            arrays['adam_v'] = self._v
+            arrays['adam_t'] = np.array(self._t)
+        return arrays
+
+    def load_state_dict(self, arrays) -> None:
+        """
+        Učitava težine spremljene metodom state_dict. Stanje Adam
+        optimizatora (momenti i broj koraka za korekciju pristranosti)
+        učitava se ako je spremljeno, inače se optimizator resetira.
+        """
+        if list(arrays['sizes']) != self.sizes:
+            raise ValueError(f"Arhitektura mreže se ne podudara: {list(arrays['sizes'])} != {self.sizes}")
+        for i, p in enumerate(self.parameters()):
+            p[...] = arrays[f"p{i}"]
+        if 'adam_t' in arrays:
+            self._m[...] = arrays['adam_m']
+            self._v[...] = arrays['adam_v']
+            self._t = int(arrays['adam_t'])
+        else:
+            self._m[...] = 0
+            self._v[...] = 0
+            self._t = 0
+
+class DeepQLearningAgent(TrafficLightQLearning):
+    """
+    Deep Q-learning agent za semafor (DQN na CPU-u, samo NumPy).
+
+    Umjesto Q-tablice nad diskretnim stanjima, Q-vrijednosti procjenjuje
+    MLP iz normaliziranih značajki traka, pa agent generalizira na stanja
+    koja nije vidio. Iskustva se spremaju u unaprijed alocirana polja
+    značajki, a učenje je vektorizirano po seriji uz ciljnu mrežu koja se
+    osvježava svakih target_update ažuriranja. Sučelje (get_state,
+    choose_action, apply_action, update_q_table) je isto kao kod
+    TrafficLightQLearning, pa agent radi u istoj petlji simulacije.
+    """
+
+    def __init__(self, tl_id: str, phases: List[int], controlled_lanes: List[str],
+                 gamma: float = 0.9,
+                 epsilon: float = 1.0,
+                 min_epsilon: float = 0.05,
+                 epsilon_decay: float = 0.999,
+                 learning_rate: float = 1e-3,
+                 hidden_sizes: Sequence[int] = (64, 64),
+                 experience_size: int = 50000,
+                 batch_size: int = 64,
+                 train_every: int = 1,
+                 target_update: int = 500,
+                 seed: int = None,
+                 decision_interval: int = 1,
+                 min_green: int = 0,
+                 observer: SubscriptionObserver = None,
+                 **kwargs):
+        """
+        Inicijalizacija DQN agenta za semafor.
+
+        Args:
+            tl_id: ID semafora
+            phases: Lista mogućih faza
+            controlled_lanes: Lista kontroliranih traka
+            gamma: Faktor diskontiranja
+            epsilon: Početna vjerojatnost istraživanja
+            min_epsilon: Minimalna vjerojatnost istraživanja
+            epsilon_decay: Smanjenje epsilon-a po odluci
+            learning_rate: Stopa učenja mreže (Adam)
+            hidden_sizes: Veličine skrivenih slojeva
+            experience_size: Veličina spremnika iskustava
+            batch_size: Veličina serije za učenje
+            train_every: Broj odluka između dva koraka učenja
+            target_update: Broj koraka učenja između osvježavanja ciljne mreže
+            seed: Sjeme za inicijalizaciju mreže
+            decision_interval: Sekunde simulacije između dvije odluke agenta
+            min_green: Minimalno trajanje faze u sekundama
+            observer: Zajednički opažač preko TraCI pretplata
+            kwargs: Ostali parametri TrafficLightQLearning (npr. alpha, ne koristi se)
+        """
+        super().__init__(tl_id, phases, controlled_lanes, gamma=gamma, epsilon=epsilon,
+                         min_epsilon=min_epsilon, epsilon_decay=epsilon_decay,
+                         decision_interval=decision_interval, min_green=min_green,
+                         observer=observer, tabular=False, **kwargs)
+        self.learning_rate = learning_rate
+        self.experience_size = experience_size
+        self.batch_size = batch_size
+        self.train_every = train_every
+        self.target_update = target_update
+
+        # Značajke: 4 po traci, vrijeme od promjene faze i one-hot trenutne faze
+        self.n_features = 4 * len(self.controlled_lanes) + 1 + len(phases)
+        sizes = [self.n_features] + list(hidden_sizes) + [len(phases)]
+        self.network = MLP(sizes, learning_rate=learning_rate, seed=seed)
+        self.target_network = MLP(sizes, learning_rate=learning_rate, seed=seed)
+        self.target_network.copy_from(self.network)
+
+        # Spremnik iskustava sa značajkama umjesto ID-ova stanja
+        self.experience = TransitionBuffer(experience_size, self.n_features)
+        self.decisions = 0
+        self.train_steps = 0
+        self.last_loss = float('nan')
+
+    def get_state(self, snapshot: StepSnapshot = None) -> np.ndarray:
+        """
+        Normalizirane značajke stanja (float32 vektor):
+        - po traci: vozila koja čekaju, prosječno vrijeme čekanja, duljina reda, prosječna brzina
+        - vrijeme od zadnje promjene faze
+        - trenutna faza (one-hot)
+
+        Args:
+            snapshot: Snimka koraka (ako nije zadana, uzima se od opažača)
+        """
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+
+        state = np.zeros(self.n_features, dtype=np.float32)
+        n = 4 * len(lanes)
+        lane_features = state[:n].reshape(-1, 4)
+        lane_features[:, 0] = snapshot.lane_stopped[lanes]
+        lane_features[:, 1] = snapshot.lane_waiting_sum[lanes] / np.maximum(snapshot.lane_vehicle_count[lanes], 1)
+        lane_features[:, 2] = snapshot.lane_halting[lanes]
+        lane_features[:, 3] = snapshot.lane_mean_speed[lanes]
+        lane_features /= FEATURE_SCALE
+        state[n] = min(self.steps_since_last_change, 120) / 60.0
+        if self.current_phase is not None:
+            state[n + 1 + self.current_phase] = 1.0
+        return state
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        """Q-vrijednosti za jedno stanje ili seriju stanja"""
+        return self.network.forward(np.atleast_2d(states))
+
+    def greedy_action(self, state: np.ndarray) -> int:
+        """Akcija s najvećom procijenjenom Q-vrijednošću"""
+        return int(self.q_values(state)[0].argmax())
+
+    def choose_action(self, state: np.ndarray) -> int:
+        """
+        Epsilon-greedy odabir akcije (u evaluaciji samo pohlepni odabir).
+        """
+        if self.evaluation:
+            return self.greedy_action(state)
+
+        # Smanjivanje epsilon-a
+        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
+
+        if np.random.random() < self.epsilon:
+            # Nasumična akcija (istraživanje)
+            return np.random.randint(len(self.phases))
+        return self.greedy_action(state)
+
+    def record(self, state: np.ndarray, action: int, reward: float, new_state: np.ndarray) -> None:
+        """Sprema iskustvo (u evaluaciji ništa ne radi)"""
+        if self.evaluation:
+            return
+        self.experience.append(state, action, reward, new_state)
+        self.decisions += 1
+
+    def learn(self) -> None:
+        """Svakih train_every odluka uči mrežu na seriji iz spremnika"""
+        if self.evaluation:
+            return
+        if len(self.experience) >= self.batch_size and self.decisions % self.train_every == 0:
+            self.train_batch()
+
+    def train_batch(self) -> float:
+        """Jedan korak učenja na nasumičnoj seriji iskustava"""
+        states, actions, rewards, new_states = self.experience.sample(self.batch_size)
+        targets = rewards + self.gamma * self.target_network.forward(new_states).max(axis=1)
+        self.last_loss = self.network.train_batch(states, actions, targets)
+        self.train_steps += 1
+        if self.train_steps % self.target_update == 0:
+            self.target_network.copy_from(self.network)
+        return self.last_loss
+
+    def save(self, prefix: str) -> None:
+        """
+        Sprema mrežu sa stanjem optimizatora, ciljnu mrežu i spremnik
+        iskustava (prefix.network.npz, prefix.replay.npz)
+        """
+        arrays = {f"online_{k}": v for k, v in self.network.state_dict(optimizer=True).items()}
+        arrays.update({f"target_{k}": v for k, v in self.target_network.state_dict().items()})
+        np.savez(f"{prefix}.network.npz", **arrays)
+        self.experience.save(f"{prefix}.replay.npz")
+
+    def load(self, prefix: str, replay: bool = True) -> None:
+        """Učitava stanje spremljeno metodom save"""
+        with np.load(f"{prefix}.network.npz") as data:
+            for name, network in (('online', self.network), ('target', self.target_network)):
+                network.load_state_dict({k[len(name) + 1:]: data[k] for k in data.files
+                                         if k.startswith(f"{name}_")})
+        if replay:
+            self.experience.load(f"{prefix}.replay.npz")
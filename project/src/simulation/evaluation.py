@@ -0,0 +1,97 @@
+import time
+from typing import Optional
+from ..utils.sumo_utils import load_trips
+from ..utils.observation import SubscriptionObserver
+from ..utils.topology import load_topology
+from ..utils.reset import EpisodeResetManager
+from ..utils.metrics_sink import MetricsSink
+from .qlearning import TrafficLightQLearning
+from .multi_agent import MultiIntersectionQLearning
+from .dqn import DeepQLearningAgent
+from .shared_policy import SharedPolicyQLearning
+from .checkpoint import load_checkpoint, read_checkpoint_meta
+from .standard_simulation import SimulationStats
+from .runner import run_episodes
+
+def run_evaluation(net_file: str, trips_file: str, checkpoint: str,
+                   episodes: int = 5, steps: int = 1000,
+                   decision_interval: int = 1, min_green: int = 0,
+                   reset_mode: str = 'auto', metrics_dir: Optional[str] = None,
+                   backend: Optional[str] = None) -> SimulationStats:
+    """
+    Evaluacija naučene politike bez učenja.
+
+    Agenti se učitavaju iz checkpointa (Q-tablice memorijski mapirano) i
+    biraju pohlepnu akciju; nema istraživanja, spremnika iskustava ni
+    ažuriranja, pa su metrike usporedive sa standardnom simulacijom.
+    Vrsta agenta određuje se iz checkpointa: agenti po semaforu (Q-tablica
+    ili DQN), vektorizirani agent (MultiIntersectionQLearning) ili
+    zajednička politika (SharedPolicyQLearning).
+
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        trips_file: Putanja do datoteke s rutama vozila
+        checkpoint: Direktorij checkpointa (save_checkpoint)
+        episodes: Broj evaluacijskih epizoda
+        steps: Broj sekundi simulacije po epizodi
+        decision_interval: Sekunde simulacije između odluka agenata
+        min_green: Minimalno trajanje faze u sekundama
+        reset_mode: Način resetiranja između epizoda ('load_state', 'restart', 'auto')
+        metrics_dir: Direktorij za metrike (None = bez zapisivanja)
+        backend: Pozadina simulatora (vidi utils.backend.BACKENDS)
+
+    Returns:
+        SimulationStats objekt s prikupljenim statistikama
+    """
+    # Inicijalizacija SUMO simulacije i spremanje početnog stanja
+    resets = EpisodeResetManager(net_file, trips_file, mode=reset_mode, backend=backend)
+    traci = resets.start()
+
+    # Učitavanje ruta vozila
+    num_vehicles = load_trips(trips_file)
+    print(f"Učitano {num_vehicles} vozila iz {trips_file}")
+
+    # Agenti sa zamrznutim Q-tablicama (ili mrežama) iz checkpointa
+    meta = read_checkpoint_meta(checkpoint)
+    if meta.get('kind') not in ('agents', 'multi', 'shared'):
+        raise ValueError(f"Nepodržana vrsta checkpointa: {meta.get('kind')}")
+    deep = any(item.get('model') == 'dqn' for item in meta.get('agents', []))
+    agent_class = DeepQLearningAgent if deep else TrafficLightQLearning
+    topology = load_topology(net_file, traci)
+    observer = SubscriptionObserver(connection=traci)
+    agents = {}
+    for tl_id in topology.traffic_lights:
+        controlled_lanes = topology.lanes(tl_id)
+        if not controlled_lanes:
+            continue
+        agents[tl_id] = agent_class(
+            tl_id=tl_id,
+            phases=topology.phases(tl_id),
+            controlled_lanes=controlled_lanes,
+            decision_interval=decision_interval,
+            min_green=min_green,
+            observer=observer
+        )
+    if meta['kind'] == 'multi':
+        multi = MultiIntersectionQLearning(agents)
+    elif meta['kind'] == 'shared':
+        # Širina značajki traka iz checkpointa (politika može biti naučena na drugoj mreži)
+        max_actions = max(len(agent.phases) for agent in agents.values())
+        max_lanes = (meta['n_features'] - 1 - 2 * max_actions) // 4
+        multi = SharedPolicyQLearning(agents, max_lanes=max_lanes if max_lanes > 0 else None)
+    else:
+        multi = None
+    trained = load_checkpoint(checkpoint, agents=agents, multi=multi, mmap=True, replay=False)
+    for agent in ([multi] if multi is not None else agents.values()):
+        agent.freeze()
+    print(f"Evaluacija politike iz {checkpoint} ({trained} epizoda učenja, {len(agents)} semafora)")
+
+    stats = SimulationStats()
+    sink = MetricsSink(metrics_dir, run_id=f"evaluation-{time.strftime('%Y%m%d-%H%M%S')}",
+                       tl_ids=list(agents)) if metrics_dir else None
+
+    # Ista petlja kao učenje; zamrznuti agenti ne zapisuju prijelaze i ne uče
+    run_episodes(resets, observer, agents, stats, episodes, steps, multi=multi,
+                 decision_interval=decision_interval, sink=sink)
+
+    return stats
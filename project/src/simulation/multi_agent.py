@@ -0,0 +1,246 @@
+import numpy as np
+from typing import Dict, Tuple
+from ..utils.observation import StepSnapshot
+from .qlearning import TrafficLightQLearning
+from .qtable import QTable
+
+class MultiIntersectionQLearning:
+    """
+    Q-learning za sve semafore odjednom.
+
+    Q-tablice svih semafora dijele jednu float32 matricu (stanje se
+    internira zajedno s indeksom semafora), a epsilon, temperatura,
+    brojači i spremnici iskustava su složeni u polja po semaforima.
+    Odabir akcija je jedno vektorizirano epsilon-greedy/Boltzmann
+    izvlačenje, a ažuriranje jedna serija za sve semafore, pa Python
+    petlja po semaforima ostaje samo za interniranje stanja i setPhase.
+    Semafori s manje faza imaju višak akcija popunjen s -inf.
+    """
+
+    def __init__(self, agents: Dict[str, TrafficLightQLearning]):
+        """
+        Args:
+            agents: Agenti po ID-u semafora (parametri i trake preuzimaju se od njih)
+        """
+        if not agents:
+            raise ValueError("Potreban je barem jedan agent")
+        first = next(iter(agents.values()))
+        if any(a.alpha != first.alpha or a.gamma != first.gamma for a in agents.values()):
+            raise ValueError("Svi agenti moraju imati iste alpha i gamma")
+
+        self.tl_ids = list(agents)
+        self.observer = first.observer
+        self.n_agents = len(self.tl_ids)
+        self.alpha = first.alpha
+        self.gamma = first.gamma
+        self.reward_engine = first.reward_engine
+        self.batch_size = first.batch_size
+        self.experience_size = first.experience_size
+
+        agent_list = [agents[tl_id] for tl_id in self.tl_ids]
+        self.n_actions = np.array([len(a.phases) for a in agent_list], dtype=np.int64)
+        self.max_actions = int(self.n_actions.max())
+        self.valid_actions = np.arange(self.max_actions) < self.n_actions[:, None]
+
+        # Epsilon, temperatura i brojači po semaforu
+        self.epsilon = np.array([a.epsilon for a in agent_list], dtype=np.float64)
+        self.min_epsilon = np.array([a.min_epsilon for a in agent_list], dtype=np.float64)
+        self.epsilon_decay = np.array([a.epsilon_decay for a in agent_list], dtype=np.float64)
+        self.temperature = np.array([a.temperature for a in agent_list], dtype=np.float64)
+        self.min_temperature = np.array([a.min_temperature for a in agent_list], dtype=np.float64)
+        self.temperature_decay = np.array([a.temperature_decay for a in agent_list], dtype=np.float64)
+        self.steps_since_last_change = np.zeros(self.n_agents, dtype=np.int64)
+
+        # Interval odluka i minimalno zeleno po semaforu (-1 = faza još nije postavljena)
+        self.decision_interval = min(a.decision_interval for a in agent_list)
+        self.min_green = np.array([a.min_green for a in agent_list], dtype=np.int64)
+        self.current_phase = np.full(self.n_agents, -1, dtype=np.int64)
+        self.switch_pending = np.zeros(self.n_agents, dtype=bool)
+
+        # Kontrolirane trake svih semafora kao matrica indeksa (s maskom za višak)
+        self.controlled_lanes = [list(a.controlled_lanes) for a in agent_list]
+        self.n_lanes = np.array([len(lanes) for lanes in self.controlled_lanes], dtype=np.int64)
+        self.lane_mask = np.arange(max(self.n_lanes.max(), 1)) < self.n_lanes[:, None]
+        self._lane_ids = None
+        self._lane_matrix = None
+
+        # Zajednička Q-tablica: ključ stanja je (indeks semafora, stanje)
+        self.q_table = QTable(self.max_actions)
+
+        # Spremnici iskustava: svi semafori dodaju iskustvo u istom koraku
+        self.transitions = np.zeros((self.n_agents, self.experience_size, 3), dtype=np.int64)
+        self.rewards = np.zeros((self.n_agents, self.experience_size), dtype=np.float64)
+        self.position = 0
+        self.size = 0
+        self.evaluation = False
+
+    def freeze(self) -> None:
+        """
+        Prebacuje sve semafore u evaluaciju: pohlepni argmax nad Q-tablicom,
+        bez istraživanja, interniranja novih stanja, spremnika i ažuriranja.
+        """
+        self.evaluation = True
+        self.position = 0
+        self.size = 0
+
+    def unfreeze(self) -> None:
+        """Vraća semafore u način učenja"""
+        self.evaluation = False
+
+    def start_episode(self) -> None:
+        """Poništava faze i brojače na početku epizode"""
+        self.current_phase[:] = -1
+        self.steps_since_last_change[:] = 0
+        self.switch_pending[:] = False
+
+    def next_interval(self) -> int:
+        """Sekunde do sljedeće odluke (ranije ako blokirani semafor postane slobodan)"""
+        waiting = (self.min_green - self.steps_since_last_change)[self.switch_pending]
+        if not len(waiting):
+            return self.decision_interval
+        return max(1, min(self.decision_interval, int(waiting.min())))
+
+    def advance(self, seconds: int) -> None:
+        """Bilježi koliko je sekundi simulacije prošlo od zadnje odluke"""
+        self.steps_since_last_change += seconds
+
+    def _snapshot_lanes(self, snapshot: StepSnapshot) -> np.ndarray:
+        """Matrica indeksa kontroliranih traka u snimci [semafori, trake]"""
+        if snapshot.lane_ids is not self._lane_ids:
+            self._lane_ids = snapshot.lane_ids
+            matrix = np.zeros(self.lane_mask.shape, dtype=np.int64)
+            for i, lanes in enumerate(self.controlled_lanes):
+                matrix[i, :len(lanes)] = snapshot.lane_indices(lanes)
+            self._lane_matrix = matrix
+        return self._lane_matrix
+
+    def _state_id(self, agent: int, state: Tuple) -> int:
+        """
+        Internira stanje semafora; nova stanja dobivaju -inf za nepostojeće akcije.
+        U evaluaciji se stanje samo traži (-1 za neviđeno stanje).
+        """
+        if self.evaluation:
+            return self.q_table.lookup((agent, state))
+        n_states = self.q_table.n_states
+        sid = self.q_table.state_id((agent, state))
+        if sid == n_states and self.n_actions[agent] < self.max_actions:
+            self.q_table.values[sid, self.n_actions[agent]:] = -np.inf
+        return sid
+
+    def get_states(self, snapshot: StepSnapshot = None) -> np.ndarray:
+        """
+        Računa stanja svih semafora odjednom (isto kao TrafficLightQLearning.get_state).
+
+        Returns:
+            ID-ovi stanja u zajedničkoj Q-tablici [semafori]
+        """
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+
+        features = np.stack([
+            snapshot.lane_stopped[lanes],
+            snapshot.lane_waiting_sum[lanes] / np.maximum(snapshot.lane_vehicle_count[lanes], 1),
+            snapshot.lane_halting[lanes],
+            snapshot.lane_mean_speed[lanes]
+        ], axis=2).astype(np.int64)
+        features[~self.lane_mask] = 0
+
+        rows = features.reshape(self.n_agents, -1).tolist()
+        steps = self.steps_since_last_change.tolist()
+        return np.array([
+            self._state_id(i, tuple(row[:4 * self.n_lanes[i]]) + (steps[i],))
+            for i, row in enumerate(rows)
+        ], dtype=np.int64)
+
+    def get_rewards(self, snapshot: StepSnapshot = None) -> np.ndarray:
+        """Računa nagrade svih semafora odjednom (isto kao TrafficLightQLearning.get_reward)"""
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+        return self.reward_engine.compute_batch(snapshot, lanes, self.lane_mask, self.steps_since_last_change)
+
+    def junction_metrics(self, snapshot: StepSnapshot = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Red i ukupno vrijeme čekanja na kontroliranim trakama svih semafora"""
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+        queues = (snapshot.lane_halting[lanes] * self.lane_mask).sum(axis=1)
+        waiting = (snapshot.lane_waiting_sum[lanes] * self.lane_mask).sum(axis=1)
+        return queues, waiting
+
+    def choose_actions(self, state_ids: np.ndarray) -> np.ndarray:
+        """
+        Odabire akcije za sve semafore jednim izvlačenjem:
+        epsilon-greedy istraživanje, inače Boltzmann po Q-vrijednostima
+        (u evaluaciji samo pohlepni odabir).
+        """
+        if self.evaluation:
+            # Za neviđeno stanje zadržava se trenutna faza
+            greedy = self.q_table.values[np.maximum(state_ids, 0)].argmax(axis=1)
+            return np.where(state_ids >= 0, greedy, np.maximum(self.current_phase, 0))
+
+        self.epsilon = np.maximum(self.min_epsilon, self.epsilon * self.epsilon_decay)
+        self.temperature = np.maximum(self.min_temperature, self.temperature * self.temperature_decay)
+
+        uniform = np.random.random((2, self.n_agents))
+        random_actions = (uniform[0] * self.n_actions).astype(np.int64)
+
+        # Boltzmann: oduzimanje maksimuma ne mijenja vjerojatnosti, a sprječava preljev
+        logits = self.q_table.values[state_ids].astype(np.float64) / self.temperature[:, None]
+        logits -= logits.max(axis=1, keepdims=True)
+        cumulative = np.cumsum(np.exp(logits), axis=1)
+        threshold = uniform[1] * cumulative[:, -1]
+        boltzmann_actions = (cumulative <= threshold[:, None]).sum(axis=1)
+        boltzmann_actions = np.minimum(boltzmann_actions, self.n_actions - 1)
+
+        explore = np.random.random(self.n_agents) < self.epsilon
+        return np.where(explore, random_actions, boltzmann_actions)
+
+    def apply_actions(self, actions: np.ndarray, connection) -> np.ndarray:
+        """
+        Postavlja odabrane faze na semafore poštujući minimalno zeleno.
+
+        Returns:
+            Stvarno izvršene akcije (one se spremaju u iskustvo)
+        """
+        change = actions != self.current_phase
+        blocked = (self.current_phase >= 0) & change & (self.steps_since_last_change < self.min_green)
+        actions = np.where(blocked, self.current_phase, actions)
+        self.switch_pending = blocked
+        self.steps_since_last_change[change & ~blocked] = 0
+        self.current_phase = actions
+
+        # setPhase i za istu fazu, kako SUMO program ne bi sam prešao na sljedeću
+        for tl_id, action in zip(self.tl_ids, actions.tolist()):
+            connection.trafficlight.setPhase(tl_id, action)
+        return actions
+
+    def update(self, state_ids: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               new_state_ids: np.ndarray) -> None:
+        """Dodaje iskustva svih semafora i radi jedno ažuriranje za sve"""
+        self.record(state_ids, actions, rewards, new_state_ids)
+        self.learn()
+
+    def record(self, state_ids: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               new_state_ids: np.ndarray) -> None:
+        """Dodaje iskustva svih semafora u spremnike"""
+        if self.evaluation:
+            return
+        i = self.position
+        self.transitions[:, i, 0] = state_ids
+        self.transitions[:, i, 1] = actions
+        self.transitions[:, i, 2] = new_state_ids
+        self.rewards[:, i] = rewards
+        self.position = (i + 1) % self.experience_size
+        self.size = min(self.size + 1, self.experience_size)
+
+    def learn(self) -> None:
+        """Jedno ažuriranje za sve semafore (može se izvoditi na pozadinskoj dretvi)"""
+        if not self.evaluation and self.size >= self.batch_size:
+            # Svaki semafor uzorkuje vlastitu seriju iz svog spremnika
+            idx = (np.random.random((self.n_agents, self.batch_size)) * self.size).astype(np.intp)
+            batch = np.take_along_axis(self.transitions, idx[:, :, None], axis=1).reshape(-1, 3)
+            batch_rewards = np.take_along_axis(self.rewards, idx, axis=1).reshape(-1)
+            self.q_table.update_batch(batch[:, 0], batch[:, 1], batch_rewards, batch[:, 2],
+                                      self.alpha, self.gamma)
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+class PipelinedLearner:
+    """
+    Učenje agenata na pozadinskoj dretvi, preklopljeno s korakom SUMO-a.
+
+    Sav TraCI promet ostaje na glavnoj dretvi. Redoslijed u petlji je:
+    odabir akcija -> submit(learn) -> simulationStep -> snimka -> wait()
+    -> record. Dok glavna dretva čeka odgovor SUMO-a (socket otpušta
+    GIL), radna dretva radi ažuriranje serije iz spremnika. Na kritičnom
+    putu ostaju odabir akcija i zapis iskustva, a ažuriranje za prijelaz
+    t primjenjuje se nakon odabira akcije u koraku t+1 (kašnjenje od jednog
+    koraka). Prije record se uvijek čeka radna dretva, jer record može
+    proširiti Q-tablicu.
+
+    Primjer:
+        learner = PipelinedLearner()
+        learner.submit(agent.learn)
+        traci.simulationStep()
+        learner.wait()
+        agent.record(state, action, reward, new_state)
+        ...
+        learner.close()
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="learner")
+        self._future: Optional[Future] = None
+        self.learn_time = 0.0
+        self.wait_time = 0.0
+        self.submitted = 0
+
+    def _timed(self, fn: Callable, *args) -> None:
+        start = time.perf_counter()
+        fn(*args)
+        self.learn_time += time.perf_counter() - start
+
+    def submit(self, fn: Callable, *args) -> None:
+        """Pokreće učenje na radnoj dretvi (nakon što prethodno završi)"""
+        self.wait()
+        self._future = self._executor.submit(self._timed, fn, *args)
+        self.submitted += 1
+
+    def wait(self) -> None:
+        """Čeka da radna dretva završi (i prosljeđuje njezinu iznimku)"""
+        if self._future is None:
+            return
+        start = time.perf_counter()
+        try:
+            self._future.result()
+        finally:
+            self._future = None
+            self.wait_time += time.perf_counter() - start
+
+    def close(self) -> None:
+        """Čeka zadnje učenje i zaustavlja radnu dretvu"""
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
+
+    def print_summary(self) -> None:
+        """Ispisuje koliko je učenja skriveno iza simulacije"""
+        hidden = 1.0 - self.wait_time / self.learn_time if self.learn_time > 0 else 0.0
+        print(f"Učenje u pozadini: {self.submitted} ažuriranja, {self.learn_time:.2f} s, "
+              f"čekanje glavne dretve {self.wait_time:.2f} s ({max(hidden, 0.0) * 100:.0f}% skriveno)")
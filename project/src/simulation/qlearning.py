@@ -1,9 +1,9 @@
 import numpy as np
-import traci
 from typing import List, Dict, Tuple
-from collections import deque
-import random
-from ..utils.sumo_utils import get_waiting_vehicles, get_controlled_lanes
+from ..utils.observation import SubscriptionObserver, StepSnapshot
+from .qtable import QTable, DenseQTable
+from .replay import ReplayBuffer
+from .rewards import RewardEngine
 
 class TrafficLightQLearning:
     def __init__(self, tl_id: str, phases: List[int], controlled_lanes: List[str],
@@ -11,7 +11,13 @@ class TrafficLightQLearning:
                  gamma: float = 0.9,  # Optimalna vrijednost iz grid searcha
                  epsilon: float = 0.2,  # Optimalna vrijednost iz grid searcha
                  min_epsilon: float = 0.01,
-                 epsilon_decay: float = 0.995):  # Optimalna vrijednost iz grid searcha
+                 epsilon_decay: float = 0.995,  # Optimalna vrijednost iz grid searcha
+                 decision_interval: int = 1,
+                 min_green: int = 0,
+                 observer: SubscriptionObserver = None,
+                 discretizer=None,
+                 reward_engine: RewardEngine = None,
+                 tabular: bool = True):
         """
         Inicijalizacija Q-learning agenta za semafor.
         
@@ -26,10 +32,17 @@ class TrafficLightQLearning:
             epsilon_decay: Smanjenje epsilon-a (default: 0.995)
             experience_size: Veličina spremnika iskustava (povećana na 2000)
             batch_size: Veličina serije za učenje (povećana na 64)
+            decision_interval: Sekunde simulacije između dvije odluke agenta
+            min_green: Minimalno trajanje faze u sekundama prije nego što se smije promijeniti
+            observer: Opažač preko TraCI pretplata, zajednički za sve agente (ako nije zadan, kreira se vlastiti)
+            discretizer: StateDiscretizer za ograničeni indeks stanja i gustu Q-tablicu (None = n-torke cijelih brojeva)
+            reward_engine: Članovi i težine nagrade (default: RewardEngine s DEFAULT_REWARD_WEIGHTS)
+            tabular: Alocira Q-tablicu i spremnik iskustava (False za podklase koje ih ne koriste, npr. DQN)
         """
         self.tl_id = tl_id
         self.phases = phases
-        self.controlled_lanes = controlled_lanes
+        # getControlledLanes vraća traku za svaku vezu, pa se duplikati uklanjaju
+        self.controlled_lanes = list(dict.fromkeys(controlled_lanes))
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
@@ -37,27 +50,149 @@ class TrafficLightQLearning:
         self.epsilon_decay = epsilon_decay
         self.experience_size = 2000
         self.batch_size = 64
+        self.decision_interval = decision_interval
+        self.min_green = min_green
+        self.reward_engine = reward_engine or RewardEngine()
         
-        # Q-tablica
-        self.q_table = {}
+        # Q-tablica (stanja internirana u ID-ove, vrijednosti u float32 matrici)
+        self.q_table = QTable(len(phases)) if tabular else None
         
-        # Spremnik iskustava za experience replay
-        self.experience = deque(maxlen=self.experience_size)
+        # Spremnik iskustava za experience replay (NumPy prsten)
+        self.experience = ReplayBuffer(self.experience_size) if tabular else None
         
-        # Brojač koraka od zadnje promjene faze
+        # Sekunde simulacije od zadnje promjene faze
         self.steps_since_last_change = 0
         
+        # Trenutna faza (None dok agent u epizodi ne postavi prvu fazu)
+        self.current_phase = None
+        
+        # Agent je htio promijeniti fazu, ali minimalno zeleno još nije isteklo
+        self.switch_pending = False
+        
+        # Evaluacija: pohlepna politika nad zamrznutom Q-tablicom, bez učenja
+        self.evaluation = False
+        
         # Temperatura za Boltzmann strategiju
         self.temperature = 1.0
         self.min_temperature = 0.1
         self.temperature_decay = 0.995
         
         # Provjeri ima li semafor prilaze
-        self.controlled_lanes = get_controlled_lanes(tl_id)
         if not self.controlled_lanes:
             print(f"Upozorenje: Semafor {tl_id} nema prilaze!")
         
-    def get_state(self) -> Tuple:
+        # Stanje i nagrada čitaju se iz iste snimke pretplata
+        self.observer = observer or SubscriptionObserver()
+        self.observer.add_lanes(self.controlled_lanes)
+        
+        # Indeksi kontroliranih traka u poljima snimke
+        self._lane_ids = None
+        self._lane_idx = None
+        
+        self.discretizer = None
+        if discretizer is not None:
+            self.set_discretizer(discretizer)
+    
+    def set_discretizer(self, discretizer) -> None:
+        """
+        Uključuje diskretizaciju stanja: stanje postaje ograničeni indeks,
+        a Q-tablica gusto polje [discretizer.n_states, akcije] (prazni spremnik iskustava).
+        """
+        self.discretizer = discretizer
+        self.q_table = DenseQTable(discretizer.n_states, len(self.phases))
+        self.experience.clear()
+    
+    def reset_observer(self) -> None:
+        """Osvježava snimku opažača nakon resetiranja simulacije (loadState)"""
+        self.observer.reset()
+    
+    def freeze(self) -> None:
+        """
+        Prebacuje agenta u evaluaciju: pohlepni argmax nad Q-tablicom,
+        bez istraživanja, Boltzmann uzorkovanja, spremnika iskustava i ažuriranja.
+        """
+        self.evaluation = True
+        self.experience.clear()
+    
+    def unfreeze(self) -> None:
+        """Vraća agenta u način učenja"""
+        self.evaluation = False
+    
+    def greedy_action(self, state: Tuple) -> int:
+        """
+        Pohlepna akcija bez dodavanja stanja u tablicu.
+        Za neviđeno stanje zadržava se trenutna faza.
+        """
+        sid = self.q_table.lookup(state)
+        if sid < 0:
+            return self.current_phase if self.current_phase is not None else 0
+        return int(self.q_table.values[sid].argmax())
+    
+    def start_episode(self) -> None:
+        """Poništava fazu i brojač na početku epizode"""
+        self.current_phase = None
+        self.steps_since_last_change = 0
+        self.switch_pending = False
+    
+    def seconds_until_switchable(self) -> int:
+        """Sekunde do isteka minimalnog zelenog za trenutnu fazu"""
+        return max(0, self.min_green - self.steps_since_last_change)
+    
+    def apply_action(self, action: int, connection) -> int:
+        """
+        Postavlja odabranu fazu poštujući minimalno trajanje zelenog.
+        Ako faza još ne smije mijenjati, zadržava se trenutna.
+        
+        Returns:
+            Stvarno izvršena akcija (ona se sprema u iskustvo)
+        """
+        if (self.current_phase is not None and action != self.current_phase
+                and self.seconds_until_switchable() > 0):
+            self.switch_pending = True
+            action = self.current_phase
+        else:
+            self.switch_pending = False
+            if action != self.current_phase:
+                self.steps_since_last_change = 0
+            self.current_phase = action
+        # setPhase i za istu fazu, kako SUMO program ne bi sam prešao na sljedeću
+        connection.trafficlight.setPhase(self.tl_id, action)
+        return action
+    
+    def advance(self, seconds: int) -> None:
+        """Bilježi koliko je sekundi simulacije prošlo od zadnje odluke"""
+        self.steps_since_last_change += seconds
+    
+    def _snapshot_lanes(self, snapshot: StepSnapshot) -> np.ndarray:
+        """Vraća indekse kontroliranih traka u snimci (računa se samo kad se raspored promijeni)"""
+        if snapshot.lane_ids is not self._lane_ids:
+            self._lane_ids = snapshot.lane_ids
+            self._lane_idx = snapshot.lane_indices(self.controlled_lanes)
+        return self._lane_idx
+        
+    def features(self, snapshot: StepSnapshot = None) -> np.ndarray:
+        """
+        Neobrađene značajke stanja (float64 vektor duljine 4 * trake + 1):
+        po traci vozila koja čekaju, prosječno vrijeme čekanja, duljina reda
+        i prosječna brzina, te vrijeme od zadnje promjene faze.
+        
+        Args:
+            snapshot: Snimka koraka (ako nije zadana, uzima se od opažača)
+        """
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+        
+        features = np.empty(4 * len(lanes) + 1, dtype=np.float64)
+        lane_features = features[:-1].reshape(-1, 4)
+        lane_features[:, 0] = snapshot.lane_stopped[lanes]
+        lane_features[:, 1] = snapshot.lane_waiting_sum[lanes] / np.maximum(snapshot.lane_vehicle_count[lanes], 1)
+        lane_features[:, 2] = snapshot.lane_halting[lanes]
+        lane_features[:, 3] = snapshot.lane_mean_speed[lanes]
+        features[-1] = self.steps_since_last_change
+        return features
+        
+    def get_state(self, snapshot: StepSnapshot = None):
         """
         Dohvaća trenutno stanje semafora.
         Stanje uključuje:
@@ -66,75 +201,56 @@ class TrafficLightQLearning:
         - Duljina reda na svakoj traci
         - Brzina vozila na svakoj traci
         - Vrijeme od zadnje promjene faze
+        
+        Bez diskretizatora stanje je n-torka cijelih brojeva (odrezane
+        značajke), a s diskretizatorom ograničeni cjelobrojni indeks.
+        
+        Args:
+            snapshot: Snimka koraka (ako nije zadana, uzima se od opažača)
         """
-        state = []
-        
-        for lane in self.controlled_lanes:
-            # Dohvaćanje vozila na traci
-            vehicles = traci.lane.getLastStepVehicleIDs(lane)
-            
-            # Broj vozila koja čekaju
-            waiting = len([v for v in vehicles if traci.vehicle.getSpeed(v) < 0.1])
-            state.append(waiting)
-            
-            # Prosječno vrijeme čekanja
-            waiting_time = sum(traci.vehicle.getWaitingTime(v) for v in vehicles) / max(len(vehicles), 1)
-            state.append(waiting_time)
-            
-            # Duljina reda
-            queue_length = traci.lane.getLastStepHaltingNumber(lane)
-            state.append(queue_length)
-            
-            # Prosječna brzina
-            speed = traci.lane.getLastStepMeanSpeed(lane)
-            state.append(speed)
-        
-        # Vrijeme od zadnje promjene faze
-        state.append(self.steps_since_last_change)
-        
-        # Diskretizacija stanja
-        state = tuple(int(x) for x in state)
-        return state
-    
-    def get_reward(self) -> float:
+        return self.state_from_features(self.features(snapshot))
+    
+    def state_from_features(self, features: np.ndarray):
+        """Stanje iz neobrađenih značajki (npr. izračunatih u drugom procesu)"""
+        if self.discretizer is not None:
+            return self.discretizer.encode(features)
+        
+        # Diskretizacija stanja odrezivanjem
+        return tuple(features.astype(np.int64).tolist())
+    
+    def get_reward(self, snapshot: StepSnapshot = None) -> float:
         """
         Računa nagradu za trenutno stanje.
-        Nagrada uključuje:
+        Nagrada (zadane težine, vidi RewardEngine) uključuje:
         - Kažnjavanje za čekanje vozila
         - Nagradu za propusnost
         - Kažnjavanje za česte promjene faze
         - Kažnjavanje za dugo čekanje
-        """
-        reward = 0.0
         
-        # Kažnjavanje za čekanje
-        for lane in self.controlled_lanes:
-            vehicles = traci.lane.getLastStepVehicleIDs(lane)
-            waiting = len([v for v in vehicles if traci.vehicle.getSpeed(v) < 0.1])
-            reward -= waiting * 0.1  # Kažnjavanje po vozilu
-            
-            # Kažnjavanje za dugo čekanje
-            for v in vehicles:
-                waiting_time = traci.vehicle.getWaitingTime(v)
-                if waiting_time > 30:  # Ako vozilo čeka više od 30 sekundi
-                    reward -= waiting_time * 0.01
-        
-        # Nagrada za propusnost
-        for lane in self.controlled_lanes:
-            departed = traci.lane.getLastStepVehicleNumber(lane)
-            reward += departed * 0.2  # Nagrada za svako vozilo koje prođe
-        
-        # Kažnjavanje za česte promjene faze
-        if self.steps_since_last_change < 10:  # Ako je faza promijenjena u zadnjih 10 koraka
-            reward -= 0.5
-        
-        return reward
+        Args:
+            snapshot: Snimka koraka (ako nije zadana, uzima se od opažača)
+        """
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+        return self.reward_engine.compute(snapshot, lanes, self.steps_since_last_change)
+    
+    def junction_metrics(self, snapshot: StepSnapshot = None) -> Tuple[int, float]:
+        """Red (vozila koja stoje) i ukupno vrijeme čekanja na kontroliranim trakama"""
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)
+        return int(snapshot.lane_halting[lanes].sum()), float(snapshot.lane_waiting_sum[lanes].sum())
     
     def choose_action(self, state: Tuple) -> int:
         """
         Odabire akciju na temelju trenutnog stanja.
-        Koristi kombinaciju epsilon-greedy i Boltzmann strategije.
+        Koristi kombinaciju epsilon-greedy i Boltzmann strategije
+        (u evaluaciji samo pohlepni odabir).
         """
+        if self.evaluation:
+            return self.greedy_action(state)
+        
         # Smanjivanje epsilon-a
         self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
         
@@ -146,30 +262,41 @@ class TrafficLightQLearning:
             return np.random.randint(len(self.phases))
         else:
             # Boltzmann strategija
-            q_values = [self.q_table.get((state, a), 0) for a in range(len(self.phases))]
-            exp_q = np.exp(np.array(q_values) / self.temperature)
+            q_values = self.q_table.row(state).astype(np.float64)
+            exp_q = np.exp(q_values / self.temperature)
             probs = exp_q / exp_q.sum()
             return np.random.choice(len(self.phases), p=probs)
     
     def update_q_table(self, state: Tuple, action: int, reward: float, new_state: Tuple):
         """
-        Ažurira Q-tablicu koristeći experience replay.
-        """
-        # Dodavanje iskustva u spremnik
-        self.experience.append((state, action, reward, new_state))
-        
-        # Ažuriranje Q-tablice ako imamo dovoljno iskustava
-        if len(self.experience) >= self.batch_size:
-            # Odabir serije iskustava
-            batch = random.sample(self.experience, self.batch_size)
-            
-            for s, a, r, s_new in batch:
-                # Q-learning formula
-                old_value = self.q_table.get((s, a), 0)
-                next_max = max([self.q_table.get((s_new, a_new), 0) 
-                              for a_new in range(len(self.phases))])
-                new_value = old_value + self.alpha * (r + self.gamma * next_max - old_value)
-                self.q_table[(s, a)] = new_value
-        
-        # Ažuriranje brojača koraka
-        self.steps_since_last_change += 1 
\ No newline at end of file
+        Ažurira Q-tablicu koristeći experience replay (u evaluaciji ništa ne radi).
+        """
+        self.record(state, action, reward, new_state)
+        self.learn()
+    
+    def record(self, state: Tuple, action: int, reward: float, new_state: Tuple) -> None:
+        """
+        Dodaje iskustvo u spremnik (stanja se spremaju kao ID-ovi).
+        Mijenja Q-tablicu (nova stanja), pa se ne smije izvoditi istodobno s learn.
+        """
+        if self.evaluation:
+            return
+        state_id = self.q_table.state_id(state)
+        new_state_id = self.q_table.state_id(new_state)
+        self.experience.append(state_id, action, reward, new_state_id)
+    
+    def learn(self) -> None:
+        """Q-learning ažuriranje serije iz spremnika (može se izvoditi na pozadinskoj dretvi)"""
+        if self.evaluation or len(self.experience) < self.batch_size:
+            return
+        # Odabir serije iskustava i Q-learning ažuriranje cijele serije
+        states, actions, rewards, new_states = self.experience.sample(self.batch_size)
+        self.q_table.update_batch(states, actions, rewards, new_states, self.alpha, self.gamma)
+
+def next_decision_interval(agents, decision_interval: int) -> int:
+    """
+    Sekunde simulacije do sljedeće odluke: decision_interval, ili ranije ako
+    agent kojem je promjena faze bila odbijena u međuvremenu smije promijeniti fazu.
+    """
+    waiting = [agent.seconds_until_switchable() for agent in agents if agent.switch_pending]
+    return max(1, min([decision_interval] + waiting))
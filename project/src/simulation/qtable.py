@@ -0,0 +1,372 @@
+import numpy as np
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+def _flat_state(state: Hashable) -> Sequence[int]:
+    """Stanje agenta je već ravna n-torka cijelih brojeva"""
+    return state
+
+def _tuple_state(row: np.ndarray) -> Hashable:
+    return tuple(row.tolist())
+
+class FrozenStateIndex:
+    """
+    Indeks stanje -> ID nad spremljenim poljima, bez gradnje rječnika.
+
+    Stanja su spremljena kao ravno polje cijelih brojeva s pomacima (CSR),
+    uz sortirane hash vrijednosti stanja. Traženje je binarno pretraživanje
+    po hashu i usporedba s dekodiranim retkom, pa polja mogu ostati
+    memorijski mapirana. Hash n-torki cijelih brojeva ne ovisi o procesu.
+    """
+
+    def __init__(self, hashes: np.ndarray, order: np.ndarray, flat: np.ndarray,
+                 offsets: np.ndarray, decode: Callable[[np.ndarray], Hashable]):
+        self.hashes = hashes
+        self.order = order
+        self.flat = flat
+        self.offsets = offsets
+        self.decode = decode
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, sid: int) -> Hashable:
+        """Dekodira stanje s ID-om sid"""
+        return self.decode(self.flat[self.offsets[sid]:self.offsets[sid + 1]])
+
+    def get(self, state: Hashable, default: Optional[int] = None) -> Optional[int]:
+        h = hash(state)
+        i = int(np.searchsorted(self.hashes, h))
+        while i < len(self.hashes) and self.hashes[i] == h:
+            sid = int(self.order[i])
+            if self[sid] == state:
+                return sid
+            i += 1
+        return default
+
+    def __contains__(self, state: Hashable) -> bool:
+        return self.get(state) is not None
+
+class QTable:
+    """
+    Kompaktna Q-tablica.
+
+    Stanja se pretvaraju (interniraju) u cjelobrojne ID-ove, a Q-vrijednosti
+    se drže u jednoj NumPy float32 matrici oblika [n_states, n_actions] koja
+    raste geometrijski. Pohlepni odabir i maksimum po akcijama su jedan
+    odrezak retka umjesto len(phases) dohvata iz rječnika.
+    """
+
+    def __init__(self, n_actions: int, initial_capacity: int = 1024,
+                 growth_factor: float = 2.0, dtype=np.float32):
+        """
+        Args:
+            n_actions: Broj akcija (faza semafora)
+            initial_capacity: Početni broj redaka matrice
+            growth_factor: Faktor povećanja matrice kad se popuni
+            dtype: Tip Q-vrijednosti (default: float32)
+        """
+        self.n_actions = n_actions
+        self.growth_factor = growth_factor
+        self.values = np.zeros((max(initial_capacity, 1), n_actions), dtype=dtype)
+        self.state_ids: Dict[Hashable, int] = {}
+        self.states: List[Hashable] = []
+        self._decay_powers = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __contains__(self, state: Hashable) -> bool:
+        return state in self.state_ids
+
+    @property
+    def n_states(self) -> int:
+        """Broj viđenih stanja"""
+        return len(self.states)
+
+    @property
+    def nbytes(self) -> int:
+        """Veličina matrice Q-vrijednosti u bajtovima"""
+        return self.values.nbytes
+
+    def _grow(self, min_capacity: int) -> None:
+        """Povećava matricu geometrijski (nova stanja počinju s Q = 0)"""
+        capacity = len(self.values)
+        while capacity < min_capacity:
+            capacity = max(int(capacity * self.growth_factor), capacity + 1)
+        values = np.zeros((capacity, self.n_actions), dtype=self.values.dtype)
+        values[:len(self.values)] = self.values
+        self.values = values
+
+    @property
+    def frozen(self) -> bool:
+        """Tablica je učitana memorijski mapirano (samo za čitanje)"""
+        return isinstance(self.state_ids, FrozenStateIndex)
+
+    def thaw(self) -> None:
+        """Pretvara memorijski mapiranu tablicu u običnu (kopira vrijednosti, gradi rječnik)"""
+        if not self.frozen:
+            return
+        index = self.state_ids
+        self.states = [index[sid] for sid in range(len(index))]
+        self.state_ids = {state: sid for sid, state in enumerate(self.states)}
+        values = np.zeros((max(len(self.states), 1), self.n_actions), dtype=self.values.dtype)
+        values[:len(self.states)] = self.values[:len(self.states)]
+        self.values = values
+
+    def lookup(self, state: Hashable) -> int:
+        """Vraća ID stanja ili -1 ako stanje nije viđeno (bez dodavanja)"""
+        sid = self.state_ids.get(state)
+        return -1 if sid is None else sid
+
+    def state_id(self, state: Hashable) -> int:
+        """Vraća ID stanja, a novo stanje dodaje u tablicu"""
+        sid = self.state_ids.get(state)
+        if sid is None:
+            if self.frozen:
+                self.thaw()
+            sid = len(self.states)
+            if sid >= len(self.values):
+                self._grow(sid + 1)
+            self.state_ids[state] = sid
+            self.states.append(state)
+        return sid
+
+    def row(self, state: Hashable) -> np.ndarray:
+        """Vraća Q-vrijednosti svih akcija za stanje (pogled na redak matrice)"""
+        return self.values[self.state_id(state)]
+
+    def get(self, state: Hashable, action: int, default: float = 0.0) -> float:
+        """Vraća Q(s, a) bez dodavanja novog stanja"""
+        sid = self.state_ids.get(state)
+        if sid is None:
+            return default
+        return float(self.values[sid, action])
+
+    def set(self, state: Hashable, action: int, value: float) -> None:
+        """Postavlja Q(s, a)"""
+        sid = self.state_id(state)
+        if self.frozen:
+            self.thaw()
+        self.values[sid, action] = value
+
+    def max_value(self, state: Hashable) -> float:
+        """Vraća max_a Q(s, a)"""
+        sid = self.state_ids.get(state)
+        if sid is None:
+            return 0.0
+        return float(self.values[sid].max())
+
+    def best_action(self, state: Hashable) -> int:
+        """Vraća pohlepnu akciju argmax_a Q(s, a)"""
+        sid = self.state_ids.get(state)
+        if sid is None:
+            return 0
+        return int(self.values[sid].argmax())
+
+    def update_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                     next_states: np.ndarray, alpha: float, gamma: float) -> None:
+        """
+        Q-learning ažuriranje cijele serije odjednom.
+
+        Ciljevi r + gamma * max_a' Q(s', a') računaju se iz tablice prije
+        serije. Ako se isti par (s, a) pojavi više puta, rezultat je isti kao
+        da su ažuriranja primijenjena redom:
+        Q <- (1 - alpha)^k * Q + sum_i alpha * (1 - alpha)^(k - 1 - i) * cilj_i
+
+        Args:
+            states: ID-ovi stanja
+            actions: Akcije
+            rewards: Nagrade
+            next_states: ID-ovi novih stanja
+            alpha: Stopa učenja
+            gamma: Faktor diskontiranja
+        """
+        if self.frozen:
+            # Memorijski mapirana tablica je samo za čitanje: kopira se pri prvom pisanju
+            self.thaw()
+        values = self.values
+        batch = len(states)
+        decay = 1.0 - alpha
+
+        # max po akcijama nad kontiguiranim poljem oblika [akcije, serija]
+        next_q = np.ascontiguousarray(values.take(next_states, axis=0).T)
+        targets = rewards + gamma * np.maximum.reduce(next_q)
+
+        # Sortiranje parova (s, a) kako bi ponavljanja bila susjedna
+        keys = states * self.n_actions + actions
+        order = keys.argsort(kind='stable')
+        sorted_keys = keys.take(order)
+        first = np.empty(batch, dtype=bool)
+        first[0] = True
+        np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=first[1:])
+
+        flat = values.reshape(-1)
+        if first.all():
+            # Nema ponavljanja: obično Q-learning ažuriranje
+            flat[keys] = decay * flat.take(keys) + alpha * targets
+            return
+
+        # Potencije (1 - alpha)^k za k = 0..batch (računaju se jednom)
+        if self._decay_powers is None or self._decay_powers[0] != decay or len(self._decay_powers[1]) <= batch:
+            self._decay_powers = (decay, decay ** np.arange(batch + 1))
+        powers = self._decay_powers[1]
+
+        # Težina svakog cilja ovisi o broju kasnijih ažuriranja istog para
+        group = np.cumsum(first) - 1
+        starts = first.nonzero()[0]
+        ends = np.empty_like(starts)
+        ends[:-1] = starts[1:]
+        ends[-1] = batch
+        later = ends.take(group) - 1 - np.arange(batch)
+        weighted = alpha * powers.take(later) * targets.take(order)
+        unique_keys = sorted_keys.take(starts)
+        flat[unique_keys] = (powers.take(ends - starts) * flat.take(unique_keys)
+                             + np.bincount(group, weights=weighted))
+
+    def table(self) -> np.ndarray:
+        """Vraća Q-vrijednosti samo za viđena stanja"""
+        return self.values[:len(self.states)]
+
+    def save(self, prefix: str, encode: Callable[[Hashable], Sequence[int]] = _flat_state) -> None:
+        """
+        Sprema tablicu u datoteke <prefix>.values.npy, <prefix>.states.npy,
+        <prefix>.offsets.npy i <prefix>.hashes.npy.
+
+        Args:
+            prefix: Putanja bez nastavka
+            encode: Pretvara stanje u ravnu n-torku cijelih brojeva
+        """
+        n = self.n_states
+        rows = [encode(self.states[sid]) for sid in range(n)]
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=offsets[1:])
+        flat = np.fromiter((x for row in rows for x in row), dtype=np.int64, count=int(offsets[-1]))
+        hashes = np.array([hash(self.states[sid]) for sid in range(n)], dtype=np.int64)
+        order = hashes.argsort(kind='stable')
+
+        np.save(f"{prefix}.values.npy", np.ascontiguousarray(self.table()))
+        np.save(f"{prefix}.states.npy", flat)
+        np.save(f"{prefix}.offsets.npy", offsets)
+        np.save(f"{prefix}.hashes.npy", np.stack([hashes[order], order]))
+
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = False,
+             decode: Callable[[np.ndarray], Hashable] = _tuple_state) -> 'QTable':
+        """
+        Učitava tablicu spremljenu metodom save.
+
+        Args:
+            prefix: Putanja bez nastavka
+            mmap: Memorijski mapirano učitavanje (samo za čitanje; tablica se
+                kopira u memoriju tek kad se doda novo stanje ili ažurira vrijednost)
+            decode: Pretvara redak cijelih brojeva natrag u stanje
+        """
+        mode = 'r' if mmap else None
+        values = np.load(f"{prefix}.values.npy", mmap_mode=mode)
+        table = cls(values.shape[1], initial_capacity=1, dtype=values.dtype)
+        if mmap:
+            hashes = np.load(f"{prefix}.hashes.npy", mmap_mode=mode)
+            table.values = values
+            table.state_ids = FrozenStateIndex(
+                hashes[0], hashes[1],
+                np.load(f"{prefix}.states.npy", mmap_mode=mode),
+                np.load(f"{prefix}.offsets.npy", mmap_mode=mode),
+                decode
+            )
+            table.states = table.state_ids
+            return table
+
+        flat = np.load(f"{prefix}.states.npy")
+        offsets = np.load(f"{prefix}.offsets.npy")
+        table.states = [decode(flat[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+        table.state_ids = {state: sid for sid, state in enumerate(table.states)}
+        table.values = np.zeros((max(len(table.states), 1024), table.n_actions), dtype=values.dtype)
+        table.values[:len(values)] = values
+        return table
+
+class DenseQTable(QTable):
+    """
+    Q-tablica nad ograničenim indeksom stanja (StateDiscretizer).
+
+    Stanje je cijeli broj u [0, n_states) i ujedno redak matrice, pa nema
+    interniranja ni rječnika: dohvat je izravno indeksiranje, a memorija je
+    unaprijed poznata (n_states × akcije). Viđena stanja se prate maskom.
+    """
+
+    def __init__(self, n_states: int, n_actions: int, dtype=np.float32):
+        """
+        Args:
+            n_states: Broj mogućih stanja (StateDiscretizer.n_states)
+            n_actions: Broj akcija (faza semafora)
+            dtype: Tip Q-vrijednosti (default: float32)
+        """
+        self.n_actions = n_actions
+        self.growth_factor = 1.0
+        self.values = np.zeros((n_states, n_actions), dtype=dtype)
+        self.visited = np.zeros(n_states, dtype=bool)
+        self._decay_powers = None
+
+    def __len__(self) -> int:
+        return int(self.visited.sum())
+
+    def __contains__(self, state: int) -> bool:
+        return bool(self.visited[state])
+
+    @property
+    def n_states(self) -> int:
+        """Broj viđenih stanja"""
+        return len(self)
+
+    @property
+    def frozen(self) -> bool:
+        """Tablica je učitana memorijski mapirano (samo za čitanje)"""
+        return not self.values.flags.writeable
+
+    def thaw(self) -> None:
+        """Kopira memorijski mapiranu tablicu u memoriju"""
+        if self.frozen:
+            self.values = np.array(self.values)
+            self.visited = np.array(self.visited)
+
+    def lookup(self, state: int) -> int:
+        """Vraća indeks stanja ili -1 ako stanje nije viđeno"""
+        return state if self.visited[state] else -1
+
+    def state_id(self, state: int) -> int:
+        """Indeks stanja je već ID (označava se kao viđeno)"""
+        if not self.visited[state]:
+            if self.frozen:
+                self.thaw()
+            self.visited[state] = True
+        return state
+
+    def get(self, state: int, action: int, default: float = 0.0) -> float:
+        """Vraća Q(s, a)"""
+        return float(self.values[state, action]) if self.visited[state] else default
+
+    def max_value(self, state: int) -> float:
+        """Vraća max_a Q(s, a)"""
+        return float(self.values[state].max()) if self.visited[state] else 0.0
+
+    def best_action(self, state: int) -> int:
+        """Vraća pohlepnu akciju argmax_a Q(s, a)"""
+        return int(self.values[state].argmax()) if self.visited[state] else 0
+
+    def table(self) -> np.ndarray:
+        """Vraća cijelu matricu Q-vrijednosti"""
+        return self.values
+
+    def save(self, prefix: str, encode=None) -> None:
+        """Sprema tablicu u <prefix>.values.npy i <prefix>.visited.npy"""
+        np.save(f"{prefix}.values.npy", np.ascontiguousarray(self.values))
+        np.save(f"{prefix}.visited.npy", self.visited)
+
+    @classmethod
+    def load(cls, prefix: str, mmap: bool = False, decode=None) -> 'DenseQTable':
+        """Učitava tablicu spremljenu metodom save (mmap: samo za čitanje do prvog novog stanja ili ažuriranja)"""
+        mode = 'r' if mmap else None
+        values = np.load(f"{prefix}.values.npy", mmap_mode=mode)
+        table = cls(0, values.shape[1], dtype=values.dtype)
+        table.values = values
+        table.visited = np.load(f"{prefix}.visited.npy", mmap_mode=mode)
+        return table
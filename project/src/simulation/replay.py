@@ -0,0 +1,161 @@
+import numpy as np
+from typing import Tuple
+
+class ReplayBuffer:
+    """
+    Spremnik iskustava za experience replay.
+
+    Iskustva (ID stanja, akcija, nagrada, ID novog stanja) se drže u
+    unaprijed alociranim NumPy poljima koja se koriste kao prsten: kad se
+    spremnik popuni, najstarije iskustvo se prepisuje. Uzorkovanje je
+    indeksiranje polja, pa ne ovisi o veličini spremnika kao random.sample
+    nad deque-om.
+    """
+
+    def __init__(self, capacity: int = 2000):
+        """
+        Args:
+            capacity: Maksimalan broj iskustava
+        """
+        self.capacity = capacity
+        # Stupci: ID stanja, akcija, ID novog stanja
+        self.transitions = np.zeros((capacity, 3), dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.position = 0
+        self.size = 0
+
+        # Unaprijed generirani slučajni brojevi za uzorkovanje
+        self._uniform = np.empty(0)
+        self._uniform_pos = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, state_id: int, action: int, reward: float, next_state_id: int) -> None:
+        """Dodaje iskustvo (prepisuje najstarije kad je spremnik pun)"""
+        i = self.position
+        row = self.transitions[i]
+        row[0] = state_id
+        row[1] = action
+        row[2] = next_state_id
+        self.rewards[i] = reward
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Nasumično odabire seriju iskustava (s ponavljanjem).
+
+        Returns:
+            Polja ID-ova stanja, akcija, nagrada i ID-ova novih stanja
+        """
+        if self._uniform_pos + batch_size > len(self._uniform):
+            self._uniform = np.random.random(max(batch_size, 1) * 256)
+            self._uniform_pos = 0
+        uniform = self._uniform[self._uniform_pos:self._uniform_pos + batch_size]
+        self._uniform_pos += batch_size
+
+        idx = (uniform * self.size).astype(np.intp)
+        batch = self.transitions.take(idx, axis=0)
+        return batch[:, 0], batch[:, 1], self.rewards.take(idx), batch[:, 2]
+
+    def clear(self) -> None:
+        """Prazni spremnik"""
+        self.position = 0
+        self.size = 0
+
+    def save(self, path: str) -> None:
+        """Sprema popunjeni dio spremnika (redom od najstarijeg) u .npz"""
+        idx = (self.position - self.size + np.arange(self.size)) % self.capacity
+        np.savez(path, transitions=self.transitions[idx], rewards=self.rewards[idx])
+
+    def load(self, path: str) -> None:
+        """Učitava spremnik spremljen metodom save (zadržava najnovija iskustva)"""
+        with np.load(path) as data:
+            transitions = data['transitions'][-self.capacity:]
+            rewards = data['rewards'][-self.capacity:]
+        self.size = len(rewards)
+        self.transitions[:self.size] = transitions
+        self.rewards[:self.size] = rewards
+        self.position = self.size % self.capacity
+
+class TransitionBuffer:
+    """
+    Spremnik iskustava sa značajkama stanja (za DQN).
+
+    Kao ReplayBuffer, ali se umjesto ID-ova stanja spremaju vektori
+    značajki u unaprijed alocirana float32 polja (kapacitet × značajke),
+    pa je serija za učenje izravno ulaz u mrežu.
+    """
+
+    def __init__(self, capacity: int, n_features: int):
+        """
+        Args:
+            capacity: Maksimalan broj iskustava
+            n_features: Broj značajki stanja
+        """
+        self.capacity = capacity
+        self.n_features = n_features
+        self.states = np.zeros((capacity, n_features), dtype=np.float32)
+        self.next_states = np.zeros((capacity, n_features), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, state: np.ndarray, action: int, reward: float, next_state: np.ndarray) -> None:
+        """Dodaje iskustvo (prepisuje najstarije kad je spremnik pun)"""
+        i = self.position
+        self.states[i] = state
+        self.next_states[i] = next_state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               next_states: np.ndarray) -> None:
+        """Dodaje seriju iskustava odjednom (npr. svih semafora u istom koraku)"""
+        n = min(len(actions), self.capacity)
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states[-n:]
+        self.next_states[idx] = next_states[-n:]
+        self.actions[idx] = actions[-n:]
+        self.rewards[idx] = rewards[-n:]
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Nasumično odabire seriju iskustava (s ponavljanjem).
+
+        Returns:
+            Polja stanja, akcija, nagrada i novih stanja
+        """
+        idx = np.random.randint(0, self.size, batch_size)
+        return (self.states.take(idx, axis=0), self.actions.take(idx),
+                self.rewards.take(idx), self.next_states.take(idx, axis=0))
+
+    def clear(self) -> None:
+        """Prazni spremnik"""
+        self.position = 0
+        self.size = 0
+
+    def save(self, path: str) -> None:
+        """Sprema popunjeni dio spremnika (redom od najstarijeg) u .npz"""
+        idx = (self.position - self.size + np.arange(self.size)) % self.capacity
+        np.savez(path, states=self.states[idx], actions=self.actions[idx],
+                 rewards=self.rewards[idx], next_states=self.next_states[idx])
+
+    def load(self, path: str) -> None:
+        """Učitava spremnik spremljen metodom save (zadržava najnovija iskustva)"""
+        with np.load(path) as data:
+            if data['states'].shape[1] != self.n_features:
+                raise ValueError("Broj značajki u spremniku se ne podudara")
+            self.size = min(len(data['rewards']), self.capacity)
+            for name in ('states', 'actions', 'rewards', 'next_states'):
+                getattr(self, name)[:self.size] = data[name][-self.capacity:]
+        self.position = self.size % self.capacity
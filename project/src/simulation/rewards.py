@@ -0,0 +1,115 @@
+import json
+import numpy as np
+from typing import Callable, Dict, Optional
+from ..utils.observation import StepSnapshot
+
+# Član nagrade: (snimka, matrica indeksa traka [semafori, trake], maska traka,
+# sekunde od promjene faze po semaforu, parametri) -> vrijednost po semaforu
+RewardTerm = Callable[[StepSnapshot, np.ndarray, np.ndarray, np.ndarray, Dict], np.ndarray]
+
+def _lane_sum(values: np.ndarray, lanes: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Zbroj agregata traka po semaforu (popunjene trake se ne broje)"""
+    return (values[lanes] * mask).sum(axis=1)
+
+def waiting_term(snapshot, lanes, mask, steps, params) -> np.ndarray:
+    """Broj vozila koja čekaju (brzina < 0.1)"""
+    return _lane_sum(snapshot.lane_stopped, lanes, mask)
+
+def long_waiting_term(snapshot, lanes, mask, steps, params) -> np.ndarray:
+    """Zbroj vremena čekanja vozila koja čekaju dulje od 30 s"""
+    return _lane_sum(snapshot.lane_long_waiting_sum, lanes, mask)
+
+def throughput_term(snapshot, lanes, mask, steps, params) -> np.ndarray:
+    """Propusnost: broj vozila na kontroliranim trakama"""
+    return _lane_sum(snapshot.lane_vehicle_number, lanes, mask)
+
+def queue_term(snapshot, lanes, mask, steps, params) -> np.ndarray:
+    """Duljina reda (vozila koja stoje prema SUMO-u)"""
+    return _lane_sum(snapshot.lane_halting, lanes, mask)
+
+def phase_change_term(snapshot, lanes, mask, steps, params) -> np.ndarray:
+    """1 ako je faza promijenjena unutar phase_change_window sekundi"""
+    return (steps < params.get('phase_change_window', 10)).astype(np.float64)
+
+# Registrirani članovi nagrade (novi se dodaju s register_reward_term)
+REWARD_TERMS: Dict[str, RewardTerm] = {
+    'waiting': waiting_term,
+    'long_waiting': long_waiting_term,
+    'throughput': throughput_term,
+    'queue': queue_term,
+    'phase_change': phase_change_term
+}
+
+# Težine koje odgovaraju dosadašnjoj nagradi agenta
+DEFAULT_REWARD_WEIGHTS = {
+    'waiting': -0.1,
+    'long_waiting': -0.01,
+    'throughput': 0.2,
+    'phase_change': -0.5
+}
+
+def register_reward_term(name: str, term: RewardTerm) -> None:
+    """Dodaje član nagrade koji se zatim može koristiti u težinama"""
+    REWARD_TERMS[name] = term
+
+class RewardEngine:
+    """
+    Nagrada kao težinska suma članova.
+
+    Članovi se računaju iz agregata traka u snimci (pretplate i tablica
+    vozilo -> traka), bez TraCI poziva po vozilu, i to za sve semafore
+    odjednom nad matricom indeksa traka. Težine i parametri dolaze iz
+    konfiguracije, pa se nagrada može podešavati bez promjene koda.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, **params):
+        """
+        Args:
+            weights: Težina po članu nagrade (default: DEFAULT_REWARD_WEIGHTS)
+            params: Parametri članova (npr. phase_change_window=10)
+        """
+        self.weights = dict(DEFAULT_REWARD_WEIGHTS if weights is None else weights)
+        unknown = [name for name in self.weights if name not in REWARD_TERMS]
+        if unknown:
+            raise ValueError(f"Nepoznati članovi nagrade: {unknown}")
+        self.params = params
+
+    @classmethod
+    def from_config(cls, path: str) -> 'RewardEngine':
+        """
+        Učitava težine iz JSON datoteke, npr.
+        {"weights": {"waiting": -0.1, "throughput": 0.2}, "phase_change_window": 10}
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        weights = config.pop('weights', None)
+        return cls(weights, **config)
+
+    def terms(self, snapshot: StepSnapshot, lanes: np.ndarray, mask: np.ndarray,
+              steps: np.ndarray) -> Dict[str, np.ndarray]:
+        """Netežinske vrijednosti svih članova po semaforu"""
+        return {name: REWARD_TERMS[name](snapshot, lanes, mask, steps, self.params)
+                for name in self.weights}
+
+    def compute_batch(self, snapshot: StepSnapshot, lanes: np.ndarray, mask: np.ndarray,
+                      steps: np.ndarray) -> np.ndarray:
+        """
+        Nagrade svih semafora.
+
+        Args:
+            snapshot: Snimka koraka
+            lanes: Indeksi traka u snimci [semafori, trake]
+            mask: Maska stvarnih traka [semafori, trake]
+            steps: Sekunde od zadnje promjene faze [semafori]
+        """
+        reward = np.zeros(len(lanes), dtype=np.float64)
+        for name, weight in self.weights.items():
+            if weight:
+                reward += weight * REWARD_TERMS[name](snapshot, lanes, mask, steps, self.params)
+        return reward
+
+    def compute(self, snapshot: StepSnapshot, lanes: np.ndarray, steps: int) -> float:
+        """Nagrada jednog semafora (lanes su indeksi njegovih traka u snimci)"""
+        lanes = lanes[None, :]
+        return float(self.compute_batch(snapshot, lanes, np.ones(lanes.shape, dtype=bool),
+                                        np.array([steps]))[0])
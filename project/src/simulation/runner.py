@@ -0,0 +1,196 @@
+from typing import Dict, List, Optional
+from ..utils.sumo_utils import load_trips
+from ..utils.observation import SubscriptionObserver
+from ..utils.reset import EpisodeResetManager
+from ..utils.demand import DemandSampler
+from ..utils.metrics_sink import MetricsSink
+from .qlearning import TrafficLightQLearning, next_decision_interval
+from .pipeline import PipelinedLearner
+from .checkpoint import save_checkpoint
+from .standard_simulation import SimulationStats
+
+# Sekunde simulacije između dva ispisa napretka unutar epizode
+REPORT_EVERY = 100
+
+def checkpoint_due(done: int, every: int, total: int) -> bool:
+    """Checkpoint se sprema svakih `every` završenih epizoda i nakon zadnje"""
+    return done % every == 0 or done == total
+
+def run_episodes(resets: EpisodeResetManager, observer: SubscriptionObserver,
+                 agents: Dict[str, TrafficLightQLearning], stats: SimulationStats,
+                 episodes: int, steps: int, multi=None, decision_interval: int = 1,
+                 sink: Optional[MetricsSink] = None, pipelined: bool = False,
+                 sampler: Optional[DemandSampler] = None, checkpoint_dir: Optional[str] = None,
+                 checkpoint_every: int = 10, completed: int = 0,
+                 report_every: int = REPORT_EVERY) -> List[float]:
+    """
+    Zajednička petlja epizoda za učenje i evaluaciju.
+
+    Svaka epizoda: resetiranje (po potrebi novi prozor potražnje), zatim
+    odluke agenata svakih decision_interval sekundi (ili ranije kad
+    blokirana faza postane slobodna), prijelazi u spremnike i učenje.
+    Zamrznuti agenti (freeze) ne zapisuju prijelaze i ne uče, pa je ista
+    petlja i evaluacija. Na kraju se zatvaraju simulacija, statistika i
+    zapisivanje metrika.
+
+    Args:
+        resets: Upravitelj resetiranja pokrenute simulacije
+        observer: Zajednički opažač agenata i statistike
+        agents: Agenti po ID-u semafora
+        stats: Statistika u koju se bilježi svaki korak
+        episodes: Broj epizoda
+        steps: Broj sekundi simulacije po epizodi
+        multi: Vektorizirani agent ili zajednička politika (umjesto petlje po agentima)
+        decision_interval: Sekunde simulacije između odluka agenata
+        sink: Zapisivanje metrika po koraku, semaforu i epizodi
+        pipelined: Učenje na pozadinskoj dretvi dok SUMO računa sljedeći korak
+        sampler: Izrezi potražnje; svaka epizoda osim prve uzima novi prozor
+        checkpoint_dir: Direktorij u koji se periodički sprema checkpoint
+        checkpoint_every: Broj epizoda između dva checkpointa (i nakon zadnje)
+        completed: Broj epizoda učenja prije ovog pokretanja (za checkpoint)
+        report_every: Sekunde simulacije između ispisa napretka (0 = bez ispisa)
+
+    Returns:
+        Ukupna nagrada svake epizode
+    """
+    # Učenje (ažuriranje iz spremnika) za sve agente, po potrebi na pozadinskoj dretvi
+    def learn_all():
+        for agent in agents.values():
+            agent.learn()
+    learn = multi.learn if multi is not None else learn_all
+    learner = PipelinedLearner() if pipelined else None
+    total_rewards = []
+
+    try:
+        for episode in range(episodes):
+            print(f"\nEpizoda {episode + 1}/{episodes}")
+
+            # Resetiranje simulacije i osvježavanje pretplata (novi prozor potražnje po epizodi)
+            if sampler is not None and episode > 0:
+                window = sampler.sample()
+                if window != resets.trips_file:
+                    print(f"Prozor potražnje: {load_trips(window)} vozila iz {window}")
+                resets.set_trips_file(window)
+            reset_latency = resets.reset(observer)
+            traci = resets.connection
+            stats.start_episode()
+
+            # Inicijalizacija stanja za epizodu
+            snapshot = observer.snapshot()
+            if multi is not None:
+                multi.start_episode()
+                state_ids = multi.get_states(snapshot)
+            else:
+                for agent in agents.values():
+                    agent.start_episode()
+                states = {tl_id: agent.get_state(snapshot) for tl_id, agent in agents.items()}
+            total_reward = 0.0
+
+            start_time = snapshot.time
+            end_time = start_time + steps
+            next_report = start_time + report_every
+            while snapshot.time < end_time:
+                # Prikupljanje statistike
+                stats.record_snapshot(snapshot)
+                if sink is not None:
+                    sink.log_step(episode, snapshot)
+
+                if multi is not None:
+                    # Odabir i izvršavanje akcija za sve semafore odjednom
+                    actions = multi.apply_actions(multi.choose_actions(state_ids), traci)
+                    interval = multi.next_interval()
+                else:
+                    # Odabir i izvršavanje akcije za svaki semafor
+                    actions = {
+                        tl_id: agent.apply_action(agent.choose_action(states[tl_id]), traci)
+                        for tl_id, agent in agents.items()
+                    }
+                    interval = next_decision_interval(agents.values(), decision_interval)
+
+                # Učenje iz prethodnih prijelaza na radnoj dretvi dok SUMO računa korak
+                if learner is not None:
+                    learner.submit(learn)
+
+                # Napredovanje simulacije do sljedeće odluke jednim pozivom
+                interval = max(1, min(interval, int(end_time - snapshot.time)))
+                traci.simulationStep(snapshot.time + interval)
+                snapshot = observer.snapshot()
+                if learner is not None:
+                    learner.wait()
+
+                if multi is not None:
+                    # Nagrade i ažuriranje za sve semafore odjednom
+                    multi.advance(interval)
+                    new_state_ids = multi.get_states(snapshot)
+                    rewards = multi.get_rewards(snapshot)
+                    multi.record(state_ids, actions, rewards, new_state_ids)
+                    if learner is None:
+                        multi.learn()
+                    state_ids = new_state_ids
+                    total_reward += rewards.sum()
+                else:
+                    # Ažuriranje Q-tablice za svaki semafor
+                    rewards = {}
+                    for tl_id, agent in agents.items():
+                        agent.advance(interval)
+
+                        # Dobivanje novog stanja i nagrade
+                        new_state = agent.get_state(snapshot)
+                        reward = agent.get_reward(snapshot)
+
+                        # Ažuriranje Q-tablice (na radnoj dretvi u sljedećem koraku ako je pipelined)
+                        agent.record(states[tl_id], actions[tl_id], reward, new_state)
+                        if learner is None:
+                            agent.learn()
+
+                        states[tl_id] = new_state
+                        rewards[tl_id] = reward
+                        total_reward += reward
+
+                # Zapisivanje akcija, nagrada i redova po semaforu
+                if sink is not None:
+                    if multi is not None:
+                        queues, waiting = multi.junction_metrics(snapshot)
+                        sink.log_junctions(episode, snapshot.time, multi.tl_ids, actions, rewards, queues, waiting)
+                    else:
+                        metrics = [agent.junction_metrics(snapshot) for agent in agents.values()]
+                        sink.log_junctions(episode, snapshot.time, list(agents), list(actions.values()),
+                                           list(rewards.values()), [m[0] for m in metrics], [m[1] for m in metrics])
+
+                # Ispisivanje napretka
+                if report_every and snapshot.time >= next_report:
+                    next_report += report_every
+                    print(f"Korak {int(snapshot.time - start_time)}/{steps}, "
+                          f"Broj vozila: {snapshot.vehicle_count}, "
+                          f"Ukupna nagrada: {total_reward:.2f}")
+
+            # Ispisivanje statistike za epizodu
+            total_rewards.append(float(total_reward))
+            print(f"Epizoda {episode + 1} završena. "
+                  f"Ukupna nagrada: {total_reward:.2f}, "
+                  f"Broj vozila: {snapshot.vehicle_count}, "
+                  f"Prosječno vrijeme čekanja: {stats.episode['waiting_time'].mean:.2f}s")
+            if sink is not None:
+                sink.log_episode(episode, total_reward, stats.episode['waiting_time'].mean,
+                                 stats.episode['queue_length'].mean, reset_latency)
+
+            # Periodički checkpoint (i nakon zadnje epizode)
+            if checkpoint_dir and checkpoint_due(episode + 1, checkpoint_every, episodes):
+                save_checkpoint(checkpoint_dir, agents=agents, multi=multi, episode=completed + episode + 1)
+
+        # Zadnje ažuriranje iz spremnika
+        if learner is not None:
+            learner.submit(learn)
+    finally:
+        # Zaustavljanje radne dretve i zatvaranje simulacije (i nakon greške)
+        if learner is not None:
+            learner.close()
+            learner.print_summary()
+        resets.print_summary()
+        resets.close()
+        stats.close()
+        if sink is not None:
+            sink.close()
+            print(f"Metrike spremljene u {sink.run_dir}")
+
+    return total_rewards
@@ -0,0 +1,175 @@
+import numpy as np
+from typing import Dict, Sequence
+from ..utils.observation import StepSnapshot
+from .qlearning import TrafficLightQLearning
+from .multi_agent import MultiIntersectionQLearning
+from .dqn import MLP, FEATURE_SCALE
+from .replay import TransitionBuffer
+
+class SharedPolicyQLearning(MultiIntersectionQLearning):
+    """
+    Jedna zajednička politika za sve semafore (dijeljenje parametara).
+
+    Stanje svakog semafora su normalizirane značajke neovisne o semaforu:
+    značajke traka popunjene nulama do fiksne širine max_lanes, vrijeme od
+    promjene faze, one-hot trenutne faze i maska dopuštenih akcija (sve
+    do max_actions). Jedna MLP procjenjuje Q-vrijednosti svih semafora
+    jednim prolazom po koraku odluke, a iskustva svih semafora idu u
+    jedan spremnik, pa se učenje ne dijeli po semaforima i memorija ne
+    raste s njihovim brojem. Minimalno zeleno, interval odluka i nagrade
+    su isti kao u MultiIntersectionQLearning.
+    """
+
+    def __init__(self, agents: Dict[str, TrafficLightQLearning],
+                 max_lanes: int = None,
+                 hidden_sizes: Sequence[int] = (128, 128),
+                 learning_rate: float = 1e-3,
+                 epsilon: float = 1.0,
+                 min_epsilon: float = 0.05,
+                 epsilon_decay: float = 0.999,
+                 experience_size: int = 100000,
+                 batch_size: int = 256,
+                 target_update: int = 500,
+                 seed: int = None):
+        """
+        Args:
+            agents: Agenti po ID-u semafora (trake, faze, gamma i min_green preuzimaju se od njih)
+            max_lanes: Širina značajki traka (default: najveći broj traka; višak traka se odbacuje)
+            hidden_sizes: Veličine skrivenih slojeva zajedničke mreže
+            learning_rate: Stopa učenja mreže (Adam)
+            epsilon: Početna vjerojatnost istraživanja
+            min_epsilon: Minimalna vjerojatnost istraživanja
+            epsilon_decay: Smanjenje epsilon-a po koraku odluke
+            experience_size: Veličina zajedničkog spremnika iskustava
+            batch_size: Veličina serije za učenje
+            target_update: Broj koraka učenja između osvježavanja ciljne mreže
+            seed: Sjeme za inicijalizaciju mreže
+        """
+        super().__init__(agents)
+        # Spremnici i Q-tablica po semaforu se ne koriste
+        self.q_table = None
+        self.transitions = None
+        self.rewards = None
+
+        self.max_lanes = int(max_lanes or self.n_lanes.max())
+        if (self.n_lanes > self.max_lanes).any():
+            print(f"Upozorenje: {(self.n_lanes > self.max_lanes).sum()} semafora ima više od "
+                  f"{self.max_lanes} traka, višak traka se zanemaruje")
+        self.feature_lanes = np.minimum(self.n_lanes, self.max_lanes)
+        self.n_features = 4 * self.max_lanes + 1 + 2 * self.max_actions
+        self._phase_offset = 4 * self.max_lanes + 1
+        self._valid_offset = self._phase_offset + self.max_actions
+
+        # Epsilon je zajednički (jedna politika)
+        self.epsilon = epsilon
+        self.min_epsilon = min_epsilon
+        self.epsilon_decay = epsilon_decay
+        self.batch_size = batch_size
+        self.experience_size = experience_size
+        self.target_update = target_update
+        self.evaluation = False
+
+        sizes = [self.n_features] + list(hidden_sizes) + [self.max_actions]
+        self.network = MLP(sizes, learning_rate=learning_rate, seed=seed)
+        self.target_network = MLP(sizes, learning_rate=learning_rate, seed=seed)
+        self.target_network.copy_from(self.network)
+        self.experience = TransitionBuffer(experience_size, self.n_features)
+        self.train_steps = 0
+        self.last_loss = float('nan')
+
+        # Stalni dio značajki: maska dopuštenih akcija
+        self._features = np.zeros((self.n_agents, self.n_features), dtype=np.float32)
+        self._features[:, self._valid_offset:] = self.valid_actions
+        self._feature_mask = (np.arange(self.max_lanes) < self.feature_lanes[:, None])[:, :, None]
+
+    def freeze(self) -> None:
+        """Evaluacija: pohlepna politika bez istraživanja i učenja"""
+        self.evaluation = True
+        self.experience.clear()
+
+    def unfreeze(self) -> None:
+        """Vraća politiku u način učenja"""
+        self.evaluation = False
+
+    def get_states(self, snapshot: StepSnapshot = None) -> np.ndarray:
+        """
+        Značajke svih semafora kao jedna matrica.
+
+        Returns:
+            float32 matrica [semafori, značajke]
+        """
+        if snapshot is None:
+            snapshot = self.observer.snapshot()
+        lanes = self._snapshot_lanes(snapshot)[:, :self.max_lanes]
+
+        states = self._features.copy()
+        lane_features = states[:, :4 * lanes.shape[1]].reshape(self.n_agents, -1, 4)
+        lane_features[:, :, 0] = snapshot.lane_stopped[lanes]
+        lane_features[:, :, 1] = snapshot.lane_waiting_sum[lanes] / np.maximum(snapshot.lane_vehicle_count[lanes], 1)
+        lane_features[:, :, 2] = snapshot.lane_halting[lanes]
+        lane_features[:, :, 3] = snapshot.lane_mean_speed[lanes]
+        lane_features /= FEATURE_SCALE
+        lane_features *= self._feature_mask[:, :lanes.shape[1]]
+
+        states[:, self._phase_offset - 1] = np.minimum(self.steps_since_last_change, 120) / 60.0
+        phased = self.current_phase >= 0
+        states[np.flatnonzero(phased), self._phase_offset + self.current_phase[phased]] = 1.0
+        return states
+
+    def _masked_q_values(self, network: MLP, states: np.ndarray) -> np.ndarray:
+        """Q-vrijednosti s -inf za akcije koje semafor nema (maska je dio značajki)"""
+        q_values = network.forward(states)
+        q_values[states[:, self._valid_offset:] == 0] = -np.inf
+        return q_values
+
+    def choose_actions(self, states: np.ndarray) -> np.ndarray:
+        """
+        Odabire akcije za sve semafore jednim prolazom kroz mrežu:
+        epsilon-greedy (u evaluaciji samo pohlepni odabir).
+        """
+        greedy = self._masked_q_values(self.network, states).argmax(axis=1)
+        if self.evaluation:
+            return greedy
+
+        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
+        uniform = np.random.random((2, self.n_agents))
+        random_actions = (uniform[0] * self.n_actions).astype(np.int64)
+        return np.where(uniform[1] < self.epsilon, random_actions, greedy)
+
+    def record(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               new_states: np.ndarray) -> None:
+        """Dodaje iskustva svih semafora u zajednički spremnik"""
+        if self.evaluation:
+            return
+        self.experience.extend(states, actions, rewards, new_states)
+
+    def learn(self) -> None:
+        """Jedan korak učenja zajedničke mreže"""
+        if not self.evaluation and len(self.experience) >= self.batch_size:
+            self.train_batch()
+
+    def train_batch(self) -> float:
+        """Jedan korak učenja na nasumičnoj seriji iz zajedničkog spremnika"""
+        states, actions, rewards, new_states = self.experience.sample(self.batch_size)
+        targets = rewards + self.gamma * self._masked_q_values(self.target_network, new_states).max(axis=1)
+        self.last_loss = self.network.train_batch(states, actions, targets)
+        self.train_steps += 1
+        if self.train_steps % self.target_update == 0:
+            self.target_network.copy_from(self.network)
+        return self.last_loss
+
+    def save(self, prefix: str) -> None:
+        """Sprema mreže (mrežu sa stanjem optimizatora) i spremnik iskustava (prefix.network.npz, prefix.replay.npz)"""
+        arrays = {f"online_{k}": v for k, v in self.network.state_dict(optimizer=True).items()}
+        arrays.update({f"target_{k}": v for k, v in self.target_network.state_dict().items()})
+        np.savez(f"{prefix}.network.npz", **arrays)
+        self.experience.save(f"{prefix}.replay.npz")
+
+    def load(self, prefix: str, replay: bool = True) -> None:
+        """Učitava stanje spremljeno metodom save"""
+        with np.load(f"{prefix}.network.npz") as data:
+            for name, network in (('online', self.network), ('target', self.target_network)):
+                network.load_state_dict({k[len(name) + 1:]: data[k] for k in data.files
+                                         if k.startswith(f"{name}_")})
+        if replay:
+            self.experience.load(f"{prefix}.replay.npz")
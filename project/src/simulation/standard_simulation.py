@@ -1,23 +1,116 @@
-import traci
-import xml.etree.ElementTree as ET
-from typing import Dict, List
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence
 from ..utils.sumo_utils import (
     initialize_simulation,
     load_trips,
-    get_traffic_lights,
-    get_vehicle_data,
     close_simulation
 )
+from ..utils.observation import SubscriptionObserver, StepSnapshot
+from ..utils.streaming_stats import RunningStat, SeriesRing, DEFAULT_QUANTILES
+from ..utils.metrics_sink import MetricsSink
+
+# Metrike koje se bilježe za svaki korak
+METRICS = ('waiting_time', 'queue_length', 'speed', 'vehicle_count', 'stops')
 
 class SimulationStats:
-    def __init__(self):
-        self.waiting_times = []
-        self.queue_lengths = []
-        self.vehicle_speeds = []
-        self.vehicle_counts = []
-        self.stops_count = []
+    """
+    Statistika simulacije s konstantnom memorijom.
+    
+    Za svaku metriku se vode online agregati (Welford, zbroj, min/max,
+    P² kvantili) za trenutnu epizodu i za cijelo pokretanje. Sirove
+    vrijednosti po koraku čuvaju se samo ako je zadan history (NumPy
+    prsten zadnjih koraka), a spill_path ih dodatno zapisuje na disk.
+    """
+    
+    def __init__(self, history: int = 0, spill_path: Optional[str] = None,
+                 quantiles: Sequence[float] = DEFAULT_QUANTILES):
+        """
+        Args:
+            history: Broj zadnjih koraka koji se čuvaju kao sirove vrijednosti (0 = ništa)
+            spill_path: Datoteka u koju se zapisuju sve sirove vrijednosti (vidi load_series)
+            quantiles: Kvantili koji se prate za svaku metriku
+        """
+        self.quantiles = tuple(quantiles)
+        self.overall = {metric: RunningStat(self.quantiles) for metric in METRICS}
+        self.episode = {metric: RunningStat(self.quantiles) for metric in METRICS}
+        self.episode_summaries: List[Dict[str, Dict[str, float]]] = []
+        if history or spill_path:
+            self.series = SeriesRing(history or 1024, len(METRICS), spill_path)
+        else:
+            self.series = None
+    
+    def start_episode(self) -> None:
+        """Zaključuje trenutnu epizodu (ako ima podataka) i započinje novu"""
+        self.end_episode()
+    
+    def end_episode(self) -> None:
+        """Dodaje sažetak otvorene epizode (ako ima podataka) u episode_summaries"""
+        if self.episode[METRICS[0]].count:
+            self.episode_summaries.append(
+                {metric: stat.summary() for metric, stat in self.episode.items()})
+        self.episode = {metric: RunningStat(self.quantiles) for metric in METRICS}
+    
+    def record(self, values: Sequence[float]) -> None:
+        """Dodaje vrijednosti jednog koraka (redom kao METRICS)"""
+        for metric, value in zip(METRICS, values):
+            self.overall[metric].add(value)
+            self.episode[metric].add(value)
+        if self.series is not None:
+            self.series.append(values)
+    
+    def record_snapshot(self, snapshot: StepSnapshot) -> None:
+        """Dodaje statistiku jednog koraka iz zajedničke snimke"""
+        if not snapshot.vehicle_count:
+            return
+        self.record(snapshot.vehicle_data().aggregates())
+    
+    def summary(self) -> Dict[str, float]:
+        """Prosjeci za cijelo pokretanje (kao u usporedbi simulacija)"""
+        return {
+            'avg_waiting_time': self.overall['waiting_time'].mean,
+            'avg_queue_length': self.overall['queue_length'].mean,
+            'avg_speed': self.overall['speed'].mean,
+            'avg_vehicles': self.overall['vehicle_count'].mean,
+            'total_stops': self.overall['stops'].total
+        }
+    
+    def close(self) -> None:
+        """Zaključuje zadnju epizodu i zapisuje preostale sirove vrijednosti na disk"""
+        self.end_episode()
+        if self.series is not None:
+            self.series.flush()
+    
+    def _column(self, metric: str) -> np.ndarray:
+        """Sirove vrijednosti metrike iz prstena (prazno ako se ne čuvaju)"""
+        if self.series is None:
+            return np.zeros(0)
+        return self.series.array()[:, METRICS.index(metric)]
+    
+    # Stari nazivi lista, sada samo zadnjih `history` koraka
+    @property
+    def waiting_times(self) -> np.ndarray:
+        return self._column('waiting_time')
+    
+    @property
+    def queue_lengths(self) -> np.ndarray:
+        return self._column('queue_length')
+    
+    @property
+    def vehicle_speeds(self) -> np.ndarray:
+        return self._column('speed')
+    
+    @property
+    def vehicle_counts(self) -> np.ndarray:
+        return self._column('vehicle_count')
+    
+    @property
+    def stops_count(self) -> np.ndarray:
+        return self._column('stops')
 
-def run_standard_simulation(net_file: str, trips_file: str, steps: int = 1000) -> SimulationStats:
+def run_standard_simulation(net_file: str, trips_file: str, steps: int = 1000,
+                            metrics_dir: Optional[str] = None,
+                            backend: Optional[str] = None) -> SimulationStats:
     """
     Pokreće standardnu simulaciju bez RL-a.
     
@@ -25,12 +118,14 @@ def run_standard_simulation(net_file: str, trips_file: str, steps: int = 1000) -
         net_file: Putanja do SUMO mrežne datoteke
         trips_file: Putanja do datoteke s rutama vozila
         steps: Broj koraka simulacije
+        metrics_dir: Direktorij za metrike po koraku (None = bez zapisivanja)
+        backend: Pozadina simulatora (vidi utils.backend.BACKENDS)
     
     Returns:
         SimulationStats objekt s prikupljenim statistikama
     """
     # Inicijalizacija simulacije
-    traci = initialize_simulation(net_file, trips_file)
+    traci = initialize_simulation(net_file, trips_file, backend=backend)
     
     # Učitavanje ruta
     num_vehicles = load_trips(trips_file)
@@ -38,41 +133,16 @@ def run_standard_simulation(net_file: str, trips_file: str, steps: int = 1000) -
     
     # Inicijalizacija statistike
     stats = SimulationStats()
+    observer = SubscriptionObserver(connection=traci)
+    sink = MetricsSink(metrics_dir, run_id=f"standard-{time.strftime('%Y%m%d-%H%M%S')}") if metrics_dir else None
     
     # Glavna petlja simulacije
     for step in range(steps):
-        # Prikupljanje podataka o vozilima
-        vehicle_data = get_vehicle_data()
-        
-        # Prikupljanje statistike
-        current_stats = {
-            'waiting_time': 0,
-            'queue_length': 0,
-            'speed': 0,
-            'stops': 0
-        }
-        
-        for vehicle_id, data in vehicle_data.items():
-            # Vrijeme čekanja
-            current_stats['waiting_time'] += data.get('waiting_time', 0)
-            
-            # Duljina reda (ako je vozilo zaustavljeno)
-            if data.get('speed', 0) < 0.1:
-                current_stats['queue_length'] += 1
-            
-            # Brzina
-            current_stats['speed'] += data.get('speed', 0)
-            
-            # Broj zaustavljanja
-            current_stats['stops'] += data.get('stops', 0)
-        
-        # Ažuriranje statistike
-        if vehicle_data:
-            stats.waiting_times.append(current_stats['waiting_time'] / len(vehicle_data))
-            stats.queue_lengths.append(current_stats['queue_length'])
-            stats.vehicle_speeds.append(current_stats['speed'] / len(vehicle_data))
-            stats.vehicle_counts.append(len(vehicle_data))
-            stats.stops_count.append(current_stats['stops'])
+        # Snimka koraka i prikupljanje statistike
+        snapshot = observer.snapshot()
+        stats.record_snapshot(snapshot)
+        if sink is not None:
+            sink.log_step(0, snapshot)
         
         # Napredovanje simulacije
         traci.simulationStep()
@@ -80,10 +150,16 @@ def run_standard_simulation(net_file: str, trips_file: str, steps: int = 1000) -
         # Ispisivanje napretka
         if (step + 1) % 100 == 0:
             print(f"Korak {step + 1}/{steps}, "
-                  f"Broj vozila: {len(vehicle_data)}, "
-                  f"Prosječno vrijeme čekanja: {stats.waiting_times[-1]:.2f}s")
+                  f"Broj vozila: {snapshot.vehicle_count}, "
+                  f"Prosječno vrijeme čekanja: {stats.overall['waiting_time'].last:.2f}s")
     
     # Zatvaranje simulacije
     close_simulation()
+    stats.close()
+    if sink is not None:
+        sink.log_episode(0, mean_waiting_time=stats.overall['waiting_time'].mean,
+                         mean_queue=stats.overall['queue_length'].mean)
+        sink.close()
+        print(f"Metrike spremljene u {sink.run_dir}")
     
     return stats 
\ No newline at end of file
@@ -0,0 +1,354 @@
+import multiprocessing as mp
+import os
+import traceback
+import numpy as np
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+from ..utils.observation import SubscriptionObserver
+from ..utils.topology import load_topology
+from ..utils.reset import EpisodeResetManager
+from .qlearning import TrafficLightQLearning, next_decision_interval
+from .rewards import RewardEngine
+from .checkpoint import save_checkpoint, load_checkpoint
+from .standard_simulation import SimulationStats, METRICS
+from .runner import checkpoint_due
+
+def _shared_layout(n_envs: int, n_agents: int, n_features: int) -> List[Tuple[str, np.dtype, tuple]]:
+    """Polja u zajedničkoj memoriji: (naziv, tip, oblik)"""
+    return [
+        ('features', np.float64, (n_envs, n_agents, n_features)),
+        ('rewards', np.float64, (n_envs, n_agents)),
+        ('actions', np.int64, (n_envs, n_agents)),
+        ('metrics', np.float64, (n_envs, len(METRICS))),
+        ('time', np.float64, (n_envs,)),
+        ('done', np.bool_, (n_envs,))
+    ]
+
+def _shared_size(layout) -> int:
+    # Svako polje počinje na granici od 8 bajtova
+    return sum(-(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8 for _, dtype, shape in layout)
+
+def _shared_views(buffer, layout) -> Dict[str, np.ndarray]:
+    """NumPy pogledi na zajedničku memoriju (bez kopiranja)"""
+    views = {}
+    offset = 0
+    for name, dtype, shape in layout:
+        count = int(np.prod(shape))
+        views[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += -(-count * np.dtype(dtype).itemsize // 8) * 8
+    return views
+
+def _worker(index: int, conn, buffer, layout, tl_ids: List[str], net_file: str, trips_file: str,
+            steps: int, reset_mode: str, backend: Optional[str], port: Optional[int],
+            decision_interval: int, min_green: int, reward_config: Optional[str]) -> None:
+    """
+    Proces jednog okruženja: vlastiti SUMO (oznaka, port i datoteka stanja),
+    agenti samo za značajke, nagrade i postavljanje faza. Značajke,
+    nagrade, izvršene akcije i metrike pišu se u zajedničku memoriju, a
+    kroz cijev idu samo kratke naredbe i potvrde.
+    """
+    resets = None
+    try:
+        arrays = _shared_views(buffer, layout)
+        resets = EpisodeResetManager(net_file, trips_file, mode=reset_mode,
+                                     label=f"vec_{index}_{os.getpid()}", backend=backend, port=port)
+        connection = resets.start()
+        topology = load_topology(net_file, connection)
+        observer = SubscriptionObserver(connection=connection)
+        reward_engine = RewardEngine.from_config(reward_config) if reward_config else None
+        agents = [
+            TrafficLightQLearning(tl_id, topology.phases(tl_id), topology.lanes(tl_id),
+                                  decision_interval=decision_interval, min_green=min_green,
+                                  observer=observer, reward_engine=reward_engine)
+            for tl_id in tl_ids
+        ]
+        snapshot = None
+        end_time = 0.0
+
+        def publish(rewards: bool) -> None:
+            for a, agent in enumerate(agents):
+                features = agent.features(snapshot)
+                arrays['features'][index, a, :len(features)] = features
+                if rewards:
+                    arrays['rewards'][index, a] = agent.get_reward(snapshot)
+            arrays['metrics'][index] = snapshot.vehicle_data().aggregates()
+            arrays['time'][index] = snapshot.time
+            arrays['done'][index] = snapshot.time >= end_time
+
+        conn.send(('ready', None))
+        while True:
+            command = conn.recv()
+            if command == 'reset':
+                resets.reset(observer)
+                connection = resets.connection
+                for agent in agents:
+                    agent.start_episode()
+                snapshot = observer.snapshot()
+                end_time = snapshot.time + steps
+                publish(rewards=False)
+            elif command == 'step':
+                actions = arrays['actions'][index]
+                for a, agent in enumerate(agents):
+                    actions[a] = agent.apply_action(int(actions[a]), connection)
+                interval = next_decision_interval(agents, decision_interval)
+                interval = max(1, min(interval, int(end_time - snapshot.time)))
+                connection.simulationStep(snapshot.time + interval)
+                snapshot = observer.snapshot()
+                for agent in agents:
+                    agent.advance(interval)
+                publish(rewards=True)
+            elif command == 'close':
+                break
+            conn.send((command, None))
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        if resets is not None:
+            resets.close()
+        conn.close()
+
+class VecEnv:
+    """
+    N simulacija u zasebnim procesima za prikupljanje iskustava.
+
+    Svaki proces ima vlastitu TraCI konekciju (oznaka i po potrebi port)
+    i vlastito spremljeno početno stanje. Značajke stanja, nagrade,
+    izvršene akcije i metrike svih okruženja su polja [okruženja,
+    semafori, ...] u zajedničkoj memoriji, pa se prijelazi ne šalju kao
+    serijalizirani rječnici; kroz cijevi idu samo naredbe. Okruženja se
+    mogu koračati u koracima (svi pa čekanje svih) ili asinkrono
+    (obrađuje se ono koje prvo završi).
+
+    Primjer:
+        envs = VecEnv(4, net_file, trips_file)
+        agents = envs.make_agents()
+        for e in range(envs.n_envs):
+            envs.reset_async(e)
+        for e, command in envs.wait():
+            states = envs.states(e, agents)
+            ...
+        envs.close()
+    """
+
+    def __init__(self, n_envs: int, net_file: str, trips_file: str, steps: int = 1000,
+                 reset_mode: str = 'auto', backend: Optional[str] = None,
+                 decision_interval: int = 1, min_green: int = 0,
+                 reward_config: Optional[str] = None, base_port: Optional[int] = None):
+        """
+        Args:
+            n_envs: Broj okruženja (procesa)
+            net_file: Putanja do SUMO mrežne datoteke
+            trips_file: Putanja do datoteke s rutama vozila
+            steps: Trajanje epizode u sekundama simulacije
+            reset_mode: Način resetiranja između epizoda ('load_state', 'restart', 'auto')
+            backend: Pozadina simulatora (vidi utils.backend.BACKENDS)
+            decision_interval: Sekunde simulacije između odluka agenata
+            min_green: Minimalno trajanje faze u sekundama
+            reward_config: JSON s težinama članova nagrade (None = zadane težine)
+            base_port: Port prvog okruženja (ostala redom base_port + i; None = slobodni portovi)
+        """
+        self.n_envs = n_envs
+        self.topology = load_topology(net_file)
+        self.tl_ids = [tl_id for tl_id in self.topology.traffic_lights if self.topology.lanes(tl_id)]
+        self.n_features = [4 * len(self.topology.lanes(tl_id)) + 1 for tl_id in self.tl_ids]
+        self.min_green = min_green
+        self.decision_interval = decision_interval
+
+        layout = _shared_layout(n_envs, len(self.tl_ids), max(self.n_features, default=1))
+        context = mp.get_context()
+        self._buffer = context.RawArray('b', _shared_size(layout))
+        arrays = _shared_views(self._buffer, layout)
+        self.features = arrays['features']
+        self.rewards = arrays['rewards']
+        self.actions = arrays['actions']
+        self.metrics = arrays['metrics']
+        self.time = arrays['time']
+        self.done = arrays['done']
+
+        self._conns = []
+        self._processes = []
+        self._pending: Dict[int, str] = {}
+        for index in range(n_envs):
+            parent, child = context.Pipe()
+            port = base_port + index if base_port is not None else None
+            process = context.Process(
+                target=_worker, name=f"vec_env_{index}", daemon=True,
+                args=(index, child, self._buffer, layout, self.tl_ids, net_file, trips_file, steps,
+                      reset_mode, backend, port, decision_interval, min_green, reward_config))
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+            self._pending[index] = 'start'
+        self.wait()
+
+    def make_agents(self, **kwargs) -> Dict[str, TrafficLightQLearning]:
+        """Zajednički agenti (Q-tablice) učenika za sve semafore okruženja"""
+        return {
+            tl_id: TrafficLightQLearning(tl_id, self.topology.phases(tl_id), self.topology.lanes(tl_id),
+                                         decision_interval=self.decision_interval,
+                                         min_green=self.min_green, **kwargs)
+            for tl_id in self.tl_ids
+        }
+
+    def states(self, env: int, agents: Dict[str, TrafficLightQLearning]) -> List:
+        """Stanja svih semafora okruženja iz značajki u zajedničkoj memoriji"""
+        return [agents[tl_id].state_from_features(self.features[env, a, :n])
+                for a, (tl_id, n) in enumerate(zip(self.tl_ids, self.n_features))]
+
+    @property
+    def pending(self) -> List[int]:
+        """Okruženja koja još nisu odgovorila na zadnju naredbu"""
+        return list(self._pending)
+
+    def _send(self, env: int, command: str) -> None:
+        if env in self._pending:
+            raise RuntimeError(f"Okruženje {env} još izvršava naredbu {self._pending[env]}")
+        self._conns[env].send(command)
+        self._pending[env] = command
+
+    def reset_async(self, env: int) -> None:
+        """Pokreće resetiranje okruženja (početne značajke se pojave nakon wait)"""
+        self._send(env, 'reset')
+
+    def step_async(self, env: int) -> None:
+        """Pokreće korak okruženja s akcijama iz self.actions[env]"""
+        self._send(env, 'step')
+
+    def wait(self, lockstep: bool = True) -> List[Tuple[int, str]]:
+        """
+        Čeka odgovore okruženja.
+
+        Args:
+            lockstep: Čeka sva okruženja (u koracima); inače vraća čim barem jedno odgovori
+
+        Returns:
+            (okruženje, naredba) za svako okruženje koje je odgovorilo
+        """
+        done = []
+        while self._pending and (lockstep or not done):
+            conns = {self._conns[env]: env for env in self._pending}
+            for conn in wait(list(conns)):
+                env = conns[conn]
+                try:
+                    status, message = conn.recv()
+                except EOFError:
+                    status, message = 'error', f"proces {self._processes[env].name} je završio"
+                if status == 'error':
+                    self.close()
+                    raise RuntimeError(f"Greška u okruženju {env}:\n{message}")
+                done.append((env, self._pending.pop(env)))
+        return done
+
+    def close(self) -> None:
+        """Zatvara simulacije i zaustavlja procese"""
+        for env, conn in enumerate(self._conns):
+            if not self._processes[env].is_alive():
+                continue
+            try:
+                # Odgovor na naredbu koja je još u tijeku se odbacuje
+                if env in self._pending and conn.poll(10):
+                    conn.recv()
+                conn.send('close')
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._processes = []
+        self._pending = {}
+
+def run_vec_training(net_file: str, trips_file: str, n_envs: int = 4, episodes: int = 10,
+                     steps: int = 1000, asynchronous: bool = False, reset_mode: str = 'auto',
+                     decision_interval: int = 1, min_green: int = 0,
+                     reward_config: Optional[str] = None, backend: Optional[str] = None,
+                     base_port: Optional[int] = None, warm_start: Optional[str] = None,
+                     checkpoint_dir: Optional[str] = None, checkpoint_every: int = 10) -> SimulationStats:
+    """
+    Q-learning s N paralelnih okruženja i jednim učenikom.
+
+    Učenik drži jednu Q-tablicu po semaforu (TrafficLightQLearning) za
+    sva okruženja: bira akcije iz stanja u zajedničkoj memoriji, a
+    prijelaze svih okruženja zapisuje u iste spremnike i uči iz njih.
+
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        trips_file: Putanja do datoteke s rutama vozila
+        n_envs: Broj paralelnih okruženja
+        episodes: Broj epizoda po okruženju
+        steps: Broj sekundi simulacije po epizodi
+        asynchronous: Okruženja se obrađuju čim odgovore, bez čekanja ostalih
+        reset_mode: Način resetiranja između epizoda ('load_state', 'restart', 'auto')
+        decision_interval: Sekunde simulacije između odluka agenata
+        min_green: Minimalno trajanje faze u sekundama
+        reward_config: JSON s težinama članova nagrade (None = zadane težine)
+        backend: Pozadina simulatora (vidi utils.backend.BACKENDS)
+        base_port: Port prvog okruženja (None = slobodni portovi)
+        warm_start: Checkpoint iz kojeg se nastavlja učenje
+        checkpoint_dir: Direktorij u koji se periodički sprema checkpoint
+        checkpoint_every: Broj završenih epizoda (svih okruženja) između dva checkpointa (i nakon zadnje)
+
+    Returns:
+        SimulationStats objekt s prikupljenim statistikama
+    """
+    envs = VecEnv(n_envs, net_file, trips_file, steps=steps, reset_mode=reset_mode, backend=backend,
+                  decision_interval=decision_interval, min_green=min_green,
+                  reward_config=reward_config, base_port=base_port)
+    print(f"Pokrenuto {n_envs} okruženja, {len(envs.tl_ids)} semafora "
+          f"({'asinkrono' if asynchronous else 'u koracima'})")
+    agents = envs.make_agents()
+    if warm_start:
+        done = load_checkpoint(warm_start, agents=agents)
+        print(f"Učitan checkpoint {warm_start} ({done} epizoda učenja)")
+
+    stats = SimulationStats()
+    completed = np.zeros(n_envs, dtype=np.int64)
+    total_reward = np.zeros(n_envs, dtype=np.float64)
+    states: List[List] = [[] for _ in range(n_envs)]
+    finished = 0
+    try:
+        for env in range(n_envs):
+            envs.reset_async(env)
+        while envs.pending:
+            for env, command in envs.wait(lockstep=not asynchronous):
+                if command == 'reset':
+                    if env == 0:
+                        stats.start_episode()
+                    states[env] = envs.states(env, agents)
+                    total_reward[env] = 0.0
+                else:
+                    # Prijelazi svih semafora okruženja u zajedničke spremnike
+                    new_states = envs.states(env, agents)
+                    for a, agent in enumerate(agents.values()):
+                        agent.record(states[env][a], int(envs.actions[env, a]), float(envs.rewards[env, a]),
+                                     new_states[a])
+                        agent.learn()
+                    states[env] = new_states
+                    total_reward[env] += envs.rewards[env].sum()
+
+                    if envs.done[env]:
+                        completed[env] += 1
+                        finished += 1
+                        print(f"Okruženje {env}: epizoda {completed[env]}/{episodes} završena, "
+                              f"ukupna nagrada: {total_reward[env]:.2f}")
+                        if checkpoint_dir and checkpoint_due(finished, checkpoint_every, n_envs * episodes):
+                            save_checkpoint(checkpoint_dir, agents=agents, episode=finished)
+                        if completed[env] < episodes:
+                            envs.reset_async(env)
+                        continue
+
+                # Statistika koraka i odabir sljedećih akcija
+                if envs.metrics[env, METRICS.index('vehicle_count')] > 0:
+                    stats.record(envs.metrics[env])
+                for a, agent in enumerate(agents.values()):
+                    envs.actions[env, a] = agent.choose_action(states[env][a])
+                envs.step_async(env)
+    finally:
+        envs.close()
+
+    stats.close()
+    return stats
@@ -0,0 +1,196 @@
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+from .grid_search import run_simulation_with_params, iter_parallel_grid_search, print_result
+
+# Prostor pretraživanja: parametar -> (razdioba, donja granica, gornja granica)
+# 'uniform'      - jednoliko u [low, high]
+# 'log_uniform'  - jednoliko u log prostoru [low, high]
+# 'log_decay'    - 1 - x, gdje je x log-jednoliko u [low, high] (za epsilon_decay blizu 1)
+DEFAULT_SPACE = {
+    'alpha': ('log_uniform', 0.01, 0.5),
+    'gamma': ('uniform', 0.8, 0.99),
+    'epsilon': ('log_uniform', 0.01, 0.5),
+    'epsilon_decay': ('log_decay', 1e-4, 5e-2)
+}
+
+def sample_configurations(n: int, space: Optional[Dict[str, Tuple]] = None,
+                          seed: Optional[int] = None) -> List[Dict[str, float]]:
+    """
+    Nasumično uzorkuje kombinacije parametara iz prostora pretraživanja.
+
+    Args:
+        n: Broj kombinacija
+        space: Prostor pretraživanja (default: DEFAULT_SPACE)
+        seed: Sjeme generatora slučajnih brojeva
+
+    Returns:
+        Lista rječnika s parametrima
+    """
+    space = space or DEFAULT_SPACE
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, (kind, low, high) in space.items():
+        if kind == 'uniform':
+            columns[name] = rng.uniform(low, high, size=n)
+        elif kind == 'log_uniform':
+            columns[name] = np.exp(rng.uniform(np.log(low), np.log(high), size=n))
+        elif kind == 'log_decay':
+            columns[name] = 1.0 - np.exp(rng.uniform(np.log(low), np.log(high), size=n))
+        else:
+            raise ValueError(f"Nepoznata razdioba za {name}: {kind}")
+    return [{name: float(values[i]) for name, values in columns.items()} for i in range(n)]
+
+# Argumenti pokretanja koje successive halving dodaje kombinaciji (nisu hiperparametri)
+_RUN_KEYS = ('checkpoint', 'warm_start', 'resume')
+
+def _evaluate(net_file: str, trips_file: str, configs: List[Dict[str, float]],
+              episodes: int, steps: int, workers: int,
+              run_fn: Callable) -> List[Tuple[Dict[str, float], float, Dict[str, float]]]:
+    """Pokreće sve kombinacije s istim budžetom epizoda (redom ili paralelno)"""
+    if workers != 1:
+        return list(iter_parallel_grid_search(net_file, trips_file, configs, workers,
+                                              episodes=episodes, steps=steps, run_fn=run_fn))
+    results = []
+    for params in configs:
+        try:
+            avg_reward, stats = run_fn(net_file, trips_file, **params, episodes=episodes, steps=steps)
+            results.append((params, avg_reward, stats))
+        except Exception as e:
+            print(f"Greška pri testiranju parametara {params}: {e}")
+    return results
+
+def _run_config(params: Dict[str, float], checkpoint: str, resume: bool) -> Dict:
+    """Kombinacija s checkpointom runde (nastavlja se iz istog direktorija)"""
+    run = {**params, 'checkpoint': checkpoint}
+    if resume:
+        run.update(warm_start=checkpoint, resume=True)
+    return run
+
+def _strip_run(run: Dict) -> Dict[str, float]:
+    """Hiperparametri kombinacije bez argumenata pokretanja"""
+    return {key: value for key, value in run.items() if key not in _RUN_KEYS}
+
+def successive_halving(net_file: str, trips_file: str,
+                       configs: Optional[List[Dict[str, float]]] = None,
+                       n_configs: int = 27, min_episodes: int = 1, max_episodes: int = 9,
+                       eta: int = 3, steps: int = 100, workers: int = 1,
+                       run_fn: Callable = run_simulation_with_params,
+                       seed: Optional[int] = None) -> Dict[str, float]:
+    """
+    Successive halving: sve kombinacije dobiju mali budžet, najboljih 1/eta
+    nastavlja s eta puta većim budžetom, sve dok se ne dosegne max_episodes.
+
+    Agenti se na kraju svake runde spremaju u checkpoint kombinacije, pa
+    preživjele kombinacije nastavljaju učenje (warm_start) i u sljedećoj
+    rundi odrađuju samo razliku do novog budžeta. run_fn mora primati
+    argumente checkpoint, warm_start i resume (kao run_simulation_with_params).
+
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        trips_file: Putanja do datoteke s rutama vozila
+        configs: Kombinacije parametara (ako nisu zadane, uzorkuje se n_configs)
+        n_configs: Broj nasumičnih kombinacija
+        min_episodes: Budžet epizoda u prvoj rundi
+        max_episodes: Najveći budžet epizoda
+        eta: Faktor smanjenja broja kombinacija i povećanja budžeta
+        steps: Broj koraka po epizodi
+        workers: Broj paralelnih procesa (1 = redom)
+        run_fn: Funkcija koja pokreće simulaciju (kao run_simulation_with_params)
+        seed: Sjeme za uzorkovanje kombinacija
+
+    Returns:
+        Najbolji parametri s nagradom, statistikom i budžetom zadnje runde
+    """
+    configs = configs if configs is not None else sample_configurations(n_configs, seed=seed)
+    # Checkpoint po kombinaciji u privremenom direktoriju ovog pokretanja
+    checkpoint_dir = tempfile.mkdtemp(prefix="halving_")
+    survivors = [_run_config(params, os.path.join(checkpoint_dir, f"config_{i}"), resume=False)
+                 for i, params in enumerate(configs)]
+    episodes = min_episodes
+    completed = 0
+    best_params = None
+
+    try:
+        while survivors:
+            print(f"\nRunda: {len(survivors)} kombinacija, {episodes} epizoda po kombinaciji "
+                  f"({episodes - completed} novih)")
+            results = _evaluate(net_file, trips_file, survivors, episodes - completed,
+                                steps, workers, run_fn)
+            if not results:
+                break
+            results.sort(key=lambda result: result[1], reverse=True)
+
+            run, avg_reward, stats = results[0]
+            params = _strip_run(run)
+            best_params = {**params, 'reward': avg_reward, **stats, 'episodes': episodes}
+            print(f"Najbolji u rundi: {params}")
+            print_result(avg_reward, stats)
+
+            if episodes >= max_episodes:
+                break
+
+            # Najboljih 1/eta nastavlja iz svog checkpointa s većim budžetom
+            keep = max(1, len(results) // eta)
+            survivors = [_run_config(_strip_run(run), run['checkpoint'], resume=True)
+                         for run, _, _ in results[:keep]]
+            completed = episodes
+            episodes = min(episodes * eta, max_episodes)
+    finally:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    return best_params
+
+def hyperband(net_file: str, trips_file: str, max_episodes: int = 9, eta: int = 3,
+              steps: int = 100, workers: int = 1,
+              run_fn: Callable = run_simulation_with_params,
+              seed: Optional[int] = None) -> Dict[str, float]:
+    """
+    Hyperband: više successive halving zagrada s različitim omjerom broja
+    kombinacija i početnog budžeta. Agresivne zagrade isprobaju mnogo
+    kombinacija s malo epizoda, a konzervativne malo kombinacija s punim budžetom.
+    """
+    s_max = int(math.floor(math.log(max_episodes, eta) + 1e-9))
+    best_params = None
+
+    for s in range(s_max, -1, -1):
+        n_configs = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        min_episodes = max(1, int(max_episodes * eta ** -s))
+        print(f"\nHyperband zagrada s={s}: {n_configs} kombinacija, od {min_episodes} epizoda")
+
+        result = successive_halving(
+            net_file, trips_file,
+            n_configs=n_configs,
+            min_episodes=min_episodes,
+            max_episodes=max_episodes,
+            eta=eta,
+            steps=steps,
+            workers=workers,
+            run_fn=run_fn,
+            seed=None if seed is None else seed + s
+        )
+        # Uspoređuju se samo rezultati s punim budžetom
+        if result and result['episodes'] >= max_episodes:
+            if best_params is None or result['reward'] > best_params['reward']:
+                best_params = result
+                print("Novi najbolji rezultat!")
+
+    return best_params
+
+def main():
+    best_params = hyperband(
+        net_file="Input/osm.net.xml",
+        trips_file="Input/osm.passenger.trips.xml",
+        max_episodes=9,
+        steps=100
+    )
+
+    print("\nNajbolji parametri:")
+    for param, value in best_params.items():
+        print(f"{param}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import traci
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+from .fake_traci import FakeTraci
+from .topology import TopologyIndex
+from .queue_sim import QueueSimulator
+
+# Pozadine simulatora:
+# 'traci'   - SUMO kao zaseban proces, svaki poziv ide preko TCP socketa
+# 'libsumo' - SUMO unutar istog procesa (isto sučelje, bez socketa)
+# 'fake'    - deterministička Python zamjena (FakeTraci) za testove bez SUMO-a
+# 'queue'   - vektorizirani model reda (QueueSimulator) za brzo predučenje bez SUMO-a
+BACKENDS = ('traci', 'libsumo', 'fake', 'queue')
+
+# Pozadina koja se koristi ako nije zadana (može se postaviti varijablom okoline)
+DEFAULT_BACKEND = os.environ.get('SUMO_BACKEND', 'traci')
+
+class SimulatorBackend:
+    """
+    Pozadina simulatora: pokreće i zatvara simulaciju.
+
+    start vraća konekciju sa sučeljem traci modula (simulationStep,
+    lane/vehicle/trafficlight upiti i pretplate, simulation.saveState /
+    loadState), pa petlje, opažač i agenti rade nepromijenjeno bez
+    obzira na odabranu pozadinu.
+    """
+
+    name = ''
+    # Iznimka koju konekcija baca kad naredba ne uspije
+    error = traci.TraCIException
+
+    def __init__(self):
+        self.connection = None
+
+    def start(self, sumo_cmd: List[str], net_file: str, trips_file: str,
+              label: Optional[str] = None, port: Optional[int] = None):
+        """Pokreće simulaciju i vraća konekciju"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Zatvara simulaciju"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+class TraciBackend(SimulatorBackend):
+    """SUMO kao zaseban proces, TraCI preko socketa"""
+
+    name = 'traci'
+
+    def start(self, sumo_cmd, net_file, trips_file, label=None, port=None):
+        self.label = label or "default"
+        # traci.start prebacuje na novu konekciju, pa je koriste i funkcije iz sumo_utils
+        traci.start(sumo_cmd, port=port, label=self.label)
+        self.connection = traci
+        return self.connection
+
+    def close(self) -> None:
+        if self.connection is not None:
+            traci.switch(self.label)
+            traci.close()
+            self.connection = None
+
+class LibsumoBackend(SimulatorBackend):
+    """
+    SUMO unutar procesa preko libsumo (isto sučelje kao traci, bez
+    socketa). U jednom procesu može raditi samo jedna simulacija, pa se
+    label i port zanemaruju; paralelna pokretanja su ionako u zasebnim
+    procesima.
+    """
+
+    name = 'libsumo'
+
+    def start(self, sumo_cmd, net_file, trips_file, label=None, port=None):
+        try:
+            import libsumo
+        except ImportError as e:
+            raise RuntimeError("Pozadina 'libsumo' zahtijeva paket libsumo (pip install libsumo)") from e
+        libsumo.start(sumo_cmd)
+        self.error = libsumo.TraCIException
+        self.connection = libsumo
+        return self.connection
+
+class FakeBackend(SimulatorBackend):
+    """
+    Deterministička zamjena za testove: FakeTraci s trakama i semaforima
+    iz mrežne datoteke (bez vozila; dodaju se s add_vehicle).
+    """
+
+    name = 'fake'
+
+    def start(self, sumo_cmd, net_file, trips_file, label=None, port=None):
+        lanes: List[str] = []
+        traffic_lights: Dict[str, List[str]] = {}
+        if os.path.exists(net_file):
+            lanes = [lane.get('id') for lane in ET.parse(net_file).getroot().iter('lane')]
+            topology = TopologyIndex.from_net_file(net_file)
+            traffic_lights = {tl_id: topology.junctions[tl_id].link_lanes
+                              for tl_id in topology.traffic_lights}
+        self.connection = FakeTraci(lanes=lanes, traffic_lights=traffic_lights)
+        return self.connection
+
+class QueueBackend(SimulatorBackend):
+    """
+    Model točkastog reda (QueueSimulator): mreža i programi semafora iz
+    iste mrežne datoteke, potražnja iz trips datoteke. Služi za brzo
+    predučenje; checkpoint se zatim dotrenira u SUMO-u (warm_start).
+    """
+
+    name = 'queue'
+
+    def start(self, sumo_cmd, net_file, trips_file, label=None, port=None):
+        self.connection = QueueSimulator(net_file, trips_file)
+        return self.connection
+
+_BACKEND_CLASSES = {
+    'traci': TraciBackend,
+    'libsumo': LibsumoBackend,
+    'fake': FakeBackend,
+    'queue': QueueBackend
+}
+
+def create_backend(name: Optional[str] = None) -> SimulatorBackend:
+    """
+    Stvara pozadinu simulatora.
+
+    Args:
+        name: Naziv pozadine (vidi BACKENDS; default: DEFAULT_BACKEND)
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in _BACKEND_CLASSES:
+        raise ValueError(f"Nepoznata pozadina simulatora: {name}")
+    return _BACKEND_CLASSES[name]()
@@ -1,58 +1,99 @@
+import time
 import numpy as np
 import matplotlib.pyplot as plt
-from typing import Dict, List
+from typing import Dict, List, Optional
 from ..simulation.standard_simulation import run_standard_simulation, SimulationStats
 from ..simulation.qlearning import TrafficLightQLearning
+from ..simulation.multi_agent import MultiIntersectionQLearning
+from ..simulation.dqn import DeepQLearningAgent
+from ..simulation.shared_policy import SharedPolicyQLearning
+from ..simulation.discretizer import calibrate_agents
+from ..simulation.rewards import RewardEngine
+from ..simulation.checkpoint import load_checkpoint
+from ..simulation.evaluation import run_evaluation
+from ..simulation.runner import run_episodes
 from .sumo_utils import (
-    initialize_simulation,
     load_trips,
-    get_traffic_lights,
-    get_traffic_light_phases,
-    get_controlled_lanes,
-    get_waiting_vehicles,
-    get_vehicle_data,
-    save_network_state,
-    close_simulation,
-    load_network_state
+    get_waiting_vehicles
 )
+from .observation import SubscriptionObserver
+from .topology import load_topology
+from .reset import EpisodeResetManager
+from .metrics_sink import MetricsSink, MetricsReader
 
 def run_simulation(simulation_type: str, net_file: str, trips_file: str, 
                   episodes: int = 10, steps: int = 100,
-                  qlearning_params: dict = None) -> SimulationStats:
+                  qlearning_params: dict = None, reset_mode: str = 'auto',
+                  decision_interval: int = 1, min_green: int = 0,
+                  metrics_dir: Optional[str] = None, warm_start: Optional[str] = None,
+                  checkpoint_dir: Optional[str] = None, checkpoint_every: int = 10,
+                  discretize: bool = False, calibration_steps: int = 300,
+                  reward_config: Optional[str] = None, pipelined: bool = False,
+                  backend: Optional[str] = None) -> SimulationStats:
     """
     Pokreće simulaciju odabranog tipa.
     
     Args:
-        simulation_type: Tip simulacije ('standard', 'qlearning')
+        simulation_type: Tip simulacije ('standard', 'qlearning', 'qlearning_multi',
+            'qlearning_shared', 'deep_qlearning', 'qlearning_eval')
+            'qlearning_multi' je isti Q-learning, ali svi semafori uče odjednom
+            preko MultiIntersectionQLearning
+            'qlearning_shared' je jedna zajednička DQN politika za sve semafore (SharedPolicyQLearning)
+            'deep_qlearning' koristi DeepQLearningAgent (NumPy DQN) u istoj petlji
+            'qlearning_eval' je evaluacija pohlepne politike iz checkpointa (warm_start), bez učenja
         net_file: Putanja do SUMO mrežne datoteke
         trips_file: Putanja do datoteke s rutama vozila
         episodes: Broj epizoda (za RL simulacije)
         steps: Broj koraka po epizodi
         qlearning_params: Parametri za Q-learning (ako je simulation_type='qlearning')
+        reset_mode: Način resetiranja između epizoda ('load_state', 'restart', 'auto')
+        decision_interval: Sekunde simulacije između odluka agenata
+        min_green: Minimalno trajanje faze u sekundama
+        metrics_dir: Direktorij za metrike po koraku, semaforu i epizodi (None = bez zapisivanja)
+        warm_start: Checkpoint iz kojeg se nastavlja učenje
+        checkpoint_dir: Direktorij u koji se periodički sprema checkpoint
+        checkpoint_every: Broj epizoda između dva checkpointa
+        discretize: Ograničeni indeks stanja (StateDiscretizer) i gusta Q-tablica za 'qlearning'
+        calibration_steps: Trajanje kalibracijskog prolaza za granice razreda u sekundama
+        reward_config: JSON s težinama članova nagrade (None = zadane težine)
+        pipelined: Ažuriranje iz spremnika na pozadinskoj dretvi dok SUMO računa sljedeći korak
+        backend: Pozadina simulatora ('traci', 'libsumo', 'fake', 'queue'; default: SUMO_BACKEND ili 'traci')
     
     Returns:
         SimulationStats objekt s prikupljenim statistikama
     """
     if simulation_type == 'standard':
-        return run_standard_simulation(net_file, trips_file, steps)
-    elif simulation_type == 'qlearning':
-        # Inicijalizacija SUMO simulacije
-        traci = initialize_simulation(net_file, trips_file)
+        return run_standard_simulation(net_file, trips_file, steps, metrics_dir=metrics_dir,
+                                       backend=backend)
+    elif simulation_type == 'qlearning_eval':
+        if not warm_start:
+            raise ValueError("Evaluacija zahtijeva checkpoint (warm_start)")
+        return run_evaluation(net_file, trips_file, warm_start, episodes, steps,
+                              decision_interval=decision_interval, min_green=min_green,
+                              reset_mode=reset_mode, metrics_dir=metrics_dir, backend=backend)
+    elif simulation_type in ('qlearning', 'qlearning_multi', 'qlearning_shared', 'deep_qlearning'):
+        # Inicijalizacija SUMO simulacije i spremanje početnog stanja
+        resets = EpisodeResetManager(net_file, trips_file, mode=reset_mode, backend=backend)
+        traci = resets.start()
         
         # Učitavanje ruta vozila
         num_vehicles = load_trips(trips_file)
         print(f"Učitano {num_vehicles} vozila iz {trips_file}")
         
-        # Spremanje početnog stanja
-        save_network_state("Input/initial_state.xml")
-        
         # Inicijalizacija agenata za semafore
-        traffic_lights = get_traffic_lights()
+        # Statička topologija mreže (jedinstvene trake i faze po semaforu)
+        topology = load_topology(net_file, traci)
+        traffic_lights = topology.traffic_lights
         agents = {}
         
+        # Zajednički opažač: jedna snimka po koraku za sve agente i statistiku
+        observer = SubscriptionObserver(connection=traci)
+        agent_class = DeepQLearningAgent if simulation_type == 'deep_qlearning' else TrafficLightQLearning
+        reward_engine = RewardEngine.from_config(reward_config) if reward_config else None
+        
         for tl_id in traffic_lights:
-            phases = get_traffic_light_phases(tl_id)
-            controlled_lanes = get_controlled_lanes(tl_id)
+            phases = topology.phases(tl_id)
+            controlled_lanes = topology.lanes(tl_id)
             
             if not controlled_lanes:
                 print(f"Upozorenje: Semafor {tl_id} nema kontroliranih traka")
@@ -60,102 +101,65 @@ def run_simulation(simulation_type: str, net_file: str, trips_file: str,
                 
             # Koristi optimalne parametre ako su dostupni
             if qlearning_params:
-                agents[tl_id] = TrafficLightQLearning(
+                agents[tl_id] = agent_class(
                     tl_id=tl_id,
                     phases=phases,
                     controlled_lanes=controlled_lanes,
+                    decision_interval=decision_interval,
+                    min_green=min_green,
+                    observer=observer,
+                    reward_engine=reward_engine,
                     **qlearning_params
                 )
             else:
-                agents[tl_id] = TrafficLightQLearning(
+                agents[tl_id] = agent_class(
                     tl_id=tl_id,
                     phases=phases,
-                    controlled_lanes=controlled_lanes
+                    controlled_lanes=controlled_lanes,
+                    decision_interval=decision_interval,
+                    min_green=min_green,
+                    observer=observer,
+                    reward_engine=reward_engine
                 )
             print(f"Agent inicijaliziran za semafor {tl_id} s {len(phases)} faza")
         
-        # Inicijalizacija statistike
-        stats = SimulationStats()
+        # Vektorizirani odabir akcija i ažuriranje za sve semafore
+        if simulation_type == 'qlearning_multi':
+            multi = MultiIntersectionQLearning(agents)
+        elif simulation_type == 'qlearning_shared':
+            multi = SharedPolicyQLearning(agents)
+        else:
+            multi = None
         
-        # Glavna petlja učenja
-        for episode in range(episodes):
-            print(f"\nEpizoda {episode + 1}/{episodes}")
-            
-            # Resetiranje simulacije
-            load_network_state("Input/initial_state.xml")
-            
-            # Inicijalizacija stanja za epizodu
-            states = {tl_id: agent.get_state() for tl_id, agent in agents.items()}
-            total_reward = 0
-            
-            for step in range(steps):
-                # Prikupljanje podataka o vozilima
-                vehicle_data = get_vehicle_data()
-                
-                # Prikupljanje statistike
-                current_stats = {
-                    'waiting_time': 0,
-                    'queue_length': 0,
-                    'speed': 0,
-                    'stops': 0
-                }
-                
-                for vehicle_id, data in vehicle_data.items():
-                    current_stats['waiting_time'] += data.get('waiting_time', 0)
-                    if data.get('speed', 0) < 0.1:
-                        current_stats['queue_length'] += 1
-                    current_stats['speed'] += data.get('speed', 0)
-                    current_stats['stops'] += data.get('stops', 0)
-                
-                if vehicle_data:
-                    stats.waiting_times.append(current_stats['waiting_time'] / len(vehicle_data))
-                    stats.queue_lengths.append(current_stats['queue_length'])
-                    stats.vehicle_speeds.append(current_stats['speed'] / len(vehicle_data))
-                    stats.vehicle_counts.append(len(vehicle_data))
-                    stats.stops_count.append(current_stats['stops'])
-                
-                # Ažuriranje Q-tablice za svaki semafor
-                for tl_id, agent in agents.items():
-                    # Odabir akcije
-                    action = agent.choose_action(states[tl_id])
-                    
-                    # Izvršavanje akcije
-                    traci.trafficlight.setPhase(tl_id, action)
-                    
-                    # Dobivanje novog stanja i nagrade
-                    new_state = agent.get_state()
-                    reward = agent.get_reward()
-                    
-                    # Ažuriranje Q-tablice
-                    agent.update_q_table(states[tl_id], action, reward, new_state)
-                    
-                    # Ažuriranje stanja
-                    states[tl_id] = new_state
-                    total_reward += reward
-                
-                # Napredovanje simulacije
-                traci.simulationStep()
-                
-                # Ispisivanje napretka
-                if (step + 1) % 10 == 0:  # Ispis svakih 10 koraka
-                    print(f"Korak {step + 1}/{steps}, "
-                          f"Broj vozila: {len(vehicle_data)}, "
-                          f"Ukupna nagrada: {total_reward:.2f}")
-            
-            # Ispisivanje statistike za epizodu
-            print(f"Epizoda {episode + 1} završena. "
-                  f"Ukupna nagrada: {total_reward:.2f}, "
-                  f"Broj vozila: {len(vehicle_data)}")
+        # Diskretizacija stanja: granice razreda iz kalibracijskog prolaza, gusta Q-tablica
+        if discretize and simulation_type == 'qlearning':
+            calibrate_agents(agents, traci, steps=calibration_steps)
+            resets.invalidate()
         
-        # Zatvaranje simulacije
-        close_simulation()
+        # Nastavak učenja iz spremljenog checkpointa
+        done = 0
+        if warm_start:
+            done = load_checkpoint(warm_start, agents=agents, multi=multi)
+            print(f"Učitan checkpoint {warm_start} ({done} epizoda učenja)")
+        
+        # Inicijalizacija statistike i zapisivanja metrika
+        stats = SimulationStats()
+        sink = MetricsSink(metrics_dir, run_id=f"{simulation_type}-{time.strftime('%Y%m%d-%H%M%S')}",
+                           tl_ids=list(agents)) if metrics_dir else None
+        
+        # Glavna petlja učenja (zatvara simulaciju, statistiku i metrike)
+        run_episodes(resets, observer, agents, stats, episodes, steps,
+                     multi=multi, decision_interval=decision_interval, sink=sink,
+                     pipelined=pipelined, checkpoint_dir=checkpoint_dir,
+                     checkpoint_every=checkpoint_every, completed=done)
         
         return stats
     else:
         raise ValueError(f"Nepoznat tip simulacije: {simulation_type}")
 
 def compare_simulations(simulation_types: List[str], net_file: str, trips_file: str,
-                       episodes: int = 10, steps: int = 100, qlearning_params: dict = None) -> Dict[str, Dict[str, float]]:
+                       episodes: int = 10, steps: int = 100, qlearning_params: dict = None,
+                       metrics_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
     """
     Uspoređuje različite tipove simulacija.
     
@@ -166,6 +170,7 @@ def compare_simulations(simulation_types: List[str], net_file: str, trips_file:
         episodes: Broj epizoda (za RL simulacije)
         steps: Broj koraka po epizodi
         qlearning_params: Optimalni parametri iz grid searcha
+        metrics_dir: Direktorij za metrike (kasnije učitljive preko comparison_from_metrics)
     
     Returns:
         Rječnik s usporednim statistikama
@@ -175,18 +180,36 @@ def compare_simulations(simulation_types: List[str], net_file: str, trips_file:
     for sim_type in simulation_types:
         print(f"\nPokretanje {sim_type} simulacije...")
         if sim_type == 'qlearning' and qlearning_params:
-            stats = run_simulation(sim_type, net_file, trips_file, episodes, steps, qlearning_params)
+            stats = run_simulation(sim_type, net_file, trips_file, episodes, steps, qlearning_params,
+                                   metrics_dir=metrics_dir)
         else:
-            stats = run_simulation(sim_type, net_file, trips_file, episodes, steps)
+            stats = run_simulation(sim_type, net_file, trips_file, episodes, steps, metrics_dir=metrics_dir)
         
+        # Online agregati, bez držanja svih koraka u memoriji
+        comparison[sim_type] = stats.summary()
+    
+    return comparison
+
+def comparison_from_metrics(run_dirs: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """
+    Računa usporedbu iz spremljenih metrika, bez ponovnog pokretanja SUMO-a.
+    
+    Args:
+        run_dirs: Tip simulacije -> direktorij pokretanja (MetricsSink.run_dir)
+    
+    Returns:
+        Rječnik u istom obliku kao compare_simulations (za plot_comparison)
+    """
+    comparison = {}
+    for sim_type, run_dir in run_dirs.items():
+        steps = MetricsReader(run_dir).table('steps')
         comparison[sim_type] = {
-            'avg_waiting_time': np.mean(stats.waiting_times),
-            'avg_queue_length': np.mean(stats.queue_lengths),
-            'avg_speed': np.mean(stats.vehicle_speeds),
-            'avg_vehicles': np.mean(stats.vehicle_counts),
-            'total_stops': np.sum(stats.stops_count)
+            'avg_waiting_time': float(np.mean(steps['waiting_time'])),
+            'avg_queue_length': float(np.mean(steps['queue'])),
+            'avg_speed': float(np.mean(steps['speed'])),
+            'avg_vehicles': float(np.mean(steps['vehicles'])),
+            'total_stops': float(np.sum(steps['stops'], dtype=np.int64))
         }
-    
     return comparison
 
 def plot_comparison(comparison: Dict[str, Dict[str, float]]):
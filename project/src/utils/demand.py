@@ -0,0 +1,143 @@
+import os
+import numpy as np
+import xml.etree.ElementTree as ET
+from typing import Optional
+from .trips import TRIP_TAGS, load_trips_index
+
+# Definicije koje se prepisuju u izrezanu datoteku (tipovi vozila i imenovane rute)
+PASSTHROUGH_TAGS = ('vType', 'vTypeDistribution', 'route', 'routeDistribution')
+
+def _depart(elem) -> Optional[float]:
+    try:
+        return float(elem.get('depart', 0))
+    except ValueError:
+        return None
+
+def slice_trips(trips_file: str, output_file: str, begin: float, end: float,
+                scale: float = 1.0, seed: int = 0, shift: bool = True) -> int:
+    """
+    Izrezuje vozila s polaskom u [begin, end) u novu datoteku ruta,
+    jednim prolazom kroz XML (iterparse, obrađeni elementi se brišu).
+
+    Potražnja se skalira po vozilu: scale < 1 zadržava vozilo s
+    vjerojatnošću scale, a scale > 1 daje floor(scale) kopija i još jednu
+    s vjerojatnošću ostatka (kopije imaju ID oblika "veh#k"). Uzorkovanje
+    ovisi samo o seed-u i prozoru, pa je isti izrez uvijek jednak.
+
+    Args:
+        trips_file: Putanja do datoteke s rutama vozila
+        output_file: Putanja izrezane datoteke
+        begin: Početak prozora u sekundama
+        end: Kraj prozora u sekundama
+        scale: Faktor potražnje (npr. 0.5, 2, 4)
+        seed: Sjeme uzorkovanja
+        shift: Vremena polaska se pomiču tako da prozor počinje u 0
+
+    Returns:
+        Broj zapisanih vozila
+    """
+    rng = np.random.default_rng([seed, int(begin), int(end), int(round(scale * 1000))])
+    whole, fraction = int(scale), scale - int(scale)
+    written = 0
+    depth = 0
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<routes>\n')
+        context = ET.iterparse(trips_file, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            # Ugniježđeni elementi (npr. route unutar vehicle) zapisuju se s roditeljem
+            if depth:
+                continue
+            if elem.tag in TRIP_TAGS:
+                depart = _depart(elem)
+                if depart is not None and begin <= depart < end:
+                    copies = whole + int(rng.random() < fraction)
+                    if shift:
+                        elem.set('depart', f"{depart - begin:.2f}")
+                    veh_id = elem.get('id')
+                    for k in range(copies):
+                        if k:
+                            elem.set('id', f"{veh_id}#{k}")
+                        elem.tail = None
+                        out.write(f"    {ET.tostring(elem, encoding='unicode')}\n")
+                        written += 1
+            elif elem.tag in PASSTHROUGH_TAGS:
+                elem.tail = None
+                out.write(f"    {ET.tostring(elem, encoding='unicode')}\n")
+            root.clear()
+        out.write('</routes>\n')
+    os.replace(tmp_file, output_file)
+    return written
+
+class DemandSampler:
+    """
+    Vremenski prozori potražnje za epizode.
+
+    Iz indeksa trips datoteke (histogram vremena polaska) bira prozore
+    proporcionalno broju polazaka u njima i za svaki izrađuje kompaktnu
+    datoteku ruta (slice_trips) sa skaliranom potražnjom. Izrezi se čuvaju
+    u output_dir i ponovno koriste dok je trips datoteka nepromijenjena.
+
+    Primjer:
+        sampler = DemandSampler("Input/osm.passenger.trips.xml", window=600, scale=2.0)
+        resets.set_trips_file(sampler.sample())
+    """
+
+    def __init__(self, trips_file: str, window: float, scale: float = 1.0, seed: int = 0,
+                 output_dir: Optional[str] = None):
+        """
+        Args:
+            trips_file: Putanja do datoteke s rutama vozila
+            window: Trajanje prozora u sekundama
+            scale: Faktor potražnje (1 = stvarna potražnja)
+            seed: Sjeme za odabir prozora i uzorkovanje vozila
+            output_dir: Direktorij izreza (default: demand_slices pokraj trips datoteke)
+        """
+        self.trips_file = trips_file
+        self.window = window
+        self.scale = scale
+        self.seed = seed
+        self.output_dir = output_dir or os.path.join(os.path.dirname(os.path.abspath(trips_file)), "demand_slices")
+        self.index = load_trips_index(trips_file)
+        self.rng = np.random.default_rng(seed)
+
+        # Mogući počeci prozora (po razredima histograma) i broj polazaka u svakom
+        counts = self.index.histogram()
+        bins = max(1, int(np.ceil(window / self.index.bin_size)))
+        if len(counts):
+            first = int(np.flatnonzero(counts)[0]) if counts.any() else 0
+            sums = np.convolve(counts, np.ones(bins, dtype=np.int64))[bins - 1:]
+            self.begins = np.arange(first, max(first + 1, len(counts) - bins + 1)) * self.index.bin_size
+            self.weights = sums[self.begins // self.index.bin_size].astype(np.float64)
+        else:
+            self.begins = np.zeros(1, dtype=np.int64)
+            self.weights = np.zeros(1, dtype=np.float64)
+
+    @property
+    def start(self) -> float:
+        """Početak prvog prozora s polascima"""
+        return float(self.begins[0])
+
+    def slice(self, begin: float) -> str:
+        """Datoteka ruta za prozor koji počinje u begin (izrađuje se samo ako ne postoji)"""
+        stem = os.path.basename(self.trips_file).split('.xml')[0]
+        path = os.path.join(self.output_dir, f"{stem}.{int(begin)}-{int(begin + self.window)}"
+                                             f".x{self.scale:g}.s{self.seed}.xml")
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(self.trips_file):
+            return path
+        os.makedirs(self.output_dir, exist_ok=True)
+        count = slice_trips(self.trips_file, path, begin, begin + self.window, self.scale, self.seed)
+        print(f"Izrezano {count} vozila ({int(begin)}-{int(begin + self.window)} s, "
+              f"faktor {self.scale:g}) u {path}")
+        return path
+
+    def sample(self) -> str:
+        """Datoteka ruta za nasumični prozor (vjerojatnost proporcionalna broju polazaka)"""
+        total = self.weights.sum()
+        p = self.weights / total if total > 0 else None
+        return self.slice(float(self.rng.choice(self.begins, p=p)))
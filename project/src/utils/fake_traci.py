@@ -0,0 +1,262 @@
+"""
+Lažna (fake) TraCI konekcija za testiranje bez SUMO-a.
+
+Oponaša dio TraCI sučelja koji projekt koristi i broji svaki poziv
+u `calls`, tako da se može provjeriti koliko TraCI round-tripova
+pojedini dio koda radi po koraku simulacije. Čitanje rezultata
+pretplata (getSubscriptionResults / getAllSubscriptionResults) je
+lokalno kao i u pravom klijentu, pa se broji zasebno u `local_calls`.
+"""
+import copy
+import traci.constants as tc
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from .traci_domain import Domain
+
+class FakeVehicle:
+    def __init__(self, veh_id: str, lane: str, speed: float = 0.0,
+                 waiting_time: float = 0.0, stop_state: int = 0):
+        self.id = veh_id
+        self.lane = lane
+        self.speed = speed
+        self.waiting_time = waiting_time
+        self.stop_state = stop_state
+
+class _LaneDomain(Domain):
+    name = 'lane'
+
+    def _vehicles(self, lane_id: str) -> List[FakeVehicle]:
+        return [v for v in self._sim.vehicles.values() if v.lane == lane_id]
+
+    def _value(self, lane_id: str, var_id: int):
+        vehicles = self._vehicles(lane_id)
+        if var_id == tc.LAST_STEP_VEHICLE_ID_LIST:
+            return tuple(v.id for v in vehicles)
+        if var_id == tc.LAST_STEP_VEHICLE_HALTING_NUMBER:
+            return sum(1 for v in vehicles if v.speed < 0.1)
+        if var_id == tc.LAST_STEP_MEAN_SPEED:
+            if not vehicles:
+                return self._sim.lane_max_speed
+            return sum(v.speed for v in vehicles) / len(vehicles)
+        if var_id == tc.LAST_STEP_VEHICLE_NUMBER:
+            return len(vehicles)
+        raise KeyError(var_id)
+
+    def getIDList(self):
+        self._call('getIDList')
+        return tuple(self._sim.lanes)
+
+    def getLastStepVehicleIDs(self, lane_id: str):
+        self._call('getLastStepVehicleIDs')
+        return self._value(lane_id, tc.LAST_STEP_VEHICLE_ID_LIST)
+
+    def getLastStepHaltingNumber(self, lane_id: str) -> int:
+        self._call('getLastStepHaltingNumber')
+        return self._value(lane_id, tc.LAST_STEP_VEHICLE_HALTING_NUMBER)
+
+    def getLastStepMeanSpeed(self, lane_id: str) -> float:
+        self._call('getLastStepMeanSpeed')
+        return self._value(lane_id, tc.LAST_STEP_MEAN_SPEED)
+
+    def getLastStepVehicleNumber(self, lane_id: str) -> int:
+        self._call('getLastStepVehicleNumber')
+        return self._value(lane_id, tc.LAST_STEP_VEHICLE_NUMBER)
+
+class _VehicleDomain(Domain):
+    name = 'vehicle'
+
+    def _exists(self, veh_id: str) -> bool:
+        return veh_id in self._sim.vehicles
+
+    def _value(self, veh_id: str, var_id: int):
+        vehicle = self._sim.vehicles[veh_id]
+        if var_id == tc.VAR_SPEED:
+            return vehicle.speed
+        if var_id == tc.VAR_WAITING_TIME:
+            return vehicle.waiting_time
+        if var_id == tc.VAR_STOPSTATE:
+            return vehicle.stop_state
+        if var_id == tc.VAR_LANE_ID:
+            return vehicle.lane
+        raise KeyError(var_id)
+
+    def getIDList(self):
+        self._call('getIDList')
+        return tuple(self._sim.vehicles)
+
+    def getIDCount(self) -> int:
+        self._call('getIDCount')
+        return len(self._sim.vehicles)
+
+    def getSpeed(self, veh_id: str) -> float:
+        self._call('getSpeed')
+        return self._value(veh_id, tc.VAR_SPEED)
+
+    def getWaitingTime(self, veh_id: str) -> float:
+        self._call('getWaitingTime')
+        return self._value(veh_id, tc.VAR_WAITING_TIME)
+
+    def getStopState(self, veh_id: str) -> int:
+        self._call('getStopState')
+        return self._value(veh_id, tc.VAR_STOPSTATE)
+
+    def getLaneID(self, veh_id: str) -> str:
+        self._call('getLaneID')
+        return self._value(veh_id, tc.VAR_LANE_ID)
+
+class _SimulationDomain(Domain):
+    name = 'simulation'
+
+    def _value(self, object_id: str, var_id: int):
+        if var_id == tc.VAR_TIME:
+            return self._sim.time
+        if var_id == tc.VAR_DEPARTED_VEHICLES_IDS:
+            return tuple(self._sim.departed)
+        if var_id == tc.VAR_ARRIVED_VEHICLES_IDS:
+            return tuple(self._sim.arrived)
+        raise KeyError(var_id)
+
+    # Simulacija nema ID objekta, pa su potpisi kao u pravom klijentu
+    def subscribe(self, var_ids=(tc.VAR_TIME,), begin=None, end=None) -> None:
+        super().subscribe('', var_ids)
+
+    def getSubscriptionResults(self, object_id: str = '') -> Dict[int, object]:
+        return super().getSubscriptionResults(object_id)
+
+    def getTime(self) -> float:
+        self._call('getTime')
+        return self._sim.time
+
+    def saveState(self, filename: str) -> None:
+        self._call('saveState')
+        self._sim.saved_states[filename] = self._sim._state()
+
+    def loadState(self, filename: str) -> None:
+        self._call('loadState')
+        self._sim._restore(self._sim.saved_states[filename])
+
+class _TrafficLightDomain(Domain):
+    name = 'trafficlight'
+
+    def _value(self, tl_id: str, var_id: int):
+        if var_id == tc.TL_CURRENT_PHASE:
+            return self._sim.tl_phase[tl_id]
+        raise KeyError(var_id)
+
+    def getIDList(self):
+        self._call('getIDList')
+        return tuple(self._sim.traffic_lights)
+
+    def getControlledLanes(self, tl_id: str):
+        self._call('getControlledLanes')
+        return tuple(self._sim.traffic_lights[tl_id])
+
+    def getControlledLinks(self, tl_id: str):
+        self._call('getControlledLinks')
+        return [[(lane, '', '')] for lane in self._sim.traffic_lights[tl_id]]
+
+    def getAllProgramLogics(self, tl_id: str):
+        self._call('getAllProgramLogics')
+        # Faza i daje zeleno svakoj n_phases-toj vezi počevši od i
+        n_links = len(self._sim.traffic_lights[tl_id])
+        phases = [
+            SimpleNamespace(state=''.join('G' if link % self._sim.n_phases == i else 'r'
+                                          for link in range(n_links)))
+            for i in range(self._sim.n_phases)
+        ]
+        return [SimpleNamespace(programID='0', phases=phases)]
+
+    def getPhase(self, tl_id: str) -> int:
+        self._call('getPhase')
+        return self._sim.tl_phase[tl_id]
+
+    def setPhase(self, tl_id: str, phase: int) -> None:
+        self._call('setPhase')
+        self._sim.tl_phase[tl_id] = phase
+
+class FakeTraci:
+    """
+    Deterministička zamjena za `traci` modul.
+
+    Primjer:
+        fake = FakeTraci(lanes=['a_0', 'b_0'], traffic_lights={'J1': ['a_0', 'b_0']})
+        fake.add_vehicle('v1', 'a_0', speed=0.0, waiting_time=12.0)
+        observer = SubscriptionObserver(['a_0', 'b_0'], connection=fake)
+    """
+
+    def __init__(self, lanes: Optional[List[str]] = None,
+                 traffic_lights: Optional[Dict[str, List[str]]] = None,
+                 lane_max_speed: float = 13.89, n_phases: int = 4):
+        self.lanes = list(lanes or [])
+        self.n_phases = n_phases
+        self.traffic_lights = dict(traffic_lights or {})
+        self.tl_phase = {tl_id: 0 for tl_id in self.traffic_lights}
+        self.lane_max_speed = lane_max_speed
+        self.vehicles: Dict[str, FakeVehicle] = {}
+        self.departed: List[str] = []
+        self._pending_departures: List[str] = []
+        self.arrived: List[str] = []
+        self._pending_arrivals: List[str] = []
+        self.time = 0.0
+        self.saved_states: Dict[str, tuple] = {}
+        self.calls = Counter()
+        self.local_calls = Counter()
+
+        self.lane = _LaneDomain(self)
+        self.vehicle = _VehicleDomain(self)
+        self.simulation = _SimulationDomain(self)
+        self.trafficlight = _TrafficLightDomain(self)
+        self._domains = [self.lane, self.vehicle, self.simulation, self.trafficlight]
+
+    def add_vehicle(self, veh_id: str, lane: str, speed: float = 0.0,
+                    waiting_time: float = 0.0, stop_state: int = 0) -> FakeVehicle:
+        """Dodaje vozilo na traku (rezultati pretplata vide ga nakon sljedećeg koraka)"""
+        vehicle = FakeVehicle(veh_id, lane, speed, waiting_time, stop_state)
+        self.vehicles[veh_id] = vehicle
+        self._pending_departures.append(veh_id)
+        return vehicle
+
+    def remove_vehicle(self, veh_id: str) -> None:
+        """Uklanja vozilo iz simulacije (u arrived popisu nakon sljedećeg koraka)"""
+        if self.vehicles.pop(veh_id, None) is not None:
+            self._pending_arrivals.append(veh_id)
+
+    def move_vehicle(self, veh_id: str, lane: str) -> None:
+        """Premješta vozilo na drugu traku (promjena trake ili sljedeći rub)"""
+        self.vehicles[veh_id].lane = lane
+
+    def simulationStep(self, time: float = 0.0) -> None:
+        self.calls['simulationStep'] += 1
+        self.time = max(self.time + 1.0, float(time))
+        self.departed, self._pending_departures = self._pending_departures, []
+        self.arrived, self._pending_arrivals = self._pending_arrivals, []
+        for domain in self._domains:
+            domain._refresh()
+
+    def _state(self) -> tuple:
+        vehicles = {veh_id: copy.copy(v) for veh_id, v in self.vehicles.items()}
+        return self.time, vehicles, dict(self.tl_phase)
+
+    def _restore(self, state: tuple) -> None:
+        """Kao loadState u SUMO-u: vraća stanje i briše pretplate na vozila"""
+        time, vehicles, tl_phase = state
+        self.time = time
+        self.vehicles = {veh_id: copy.copy(v) for veh_id, v in vehicles.items()}
+        self.tl_phase = dict(tl_phase)
+        self.departed, self._pending_departures = [], []
+        self.arrived, self._pending_arrivals = [], []
+        self.vehicle._subscriptions.clear()
+        for domain in self._domains:
+            domain._refresh()
+
+    def round_trips(self) -> int:
+        """Ukupan broj TraCI poziva koji bi išli preko socketa"""
+        return sum(self.calls.values())
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.local_calls.clear()
+
+    def close(self) -> None:
+        self.calls['close'] += 1
@@ -1,42 +1,65 @@
+import os
+import socket
+import uuid
+import itertools
 import numpy as np
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from ..simulation.qlearning import TrafficLightQLearning
-from .sumo_utils import (
-    initialize_simulation,
-    load_trips,
-    get_traffic_lights,
-    get_traffic_light_phases,
-    get_controlled_lanes,
-    get_vehicle_data,
-    save_network_state,
-    load_network_state,
-    close_simulation
-)
+from ..simulation.standard_simulation import SimulationStats
+from ..simulation.checkpoint import load_checkpoint
+from ..simulation.runner import run_episodes
+from .sumo_utils import load_trips
+from .observation import SubscriptionObserver
+from .topology import load_topology
+from .reset import EpisodeResetManager
 
 def run_simulation_with_params(net_file: str, trips_file: str, 
                              alpha: float, gamma: float, epsilon: float,
                              epsilon_decay: float, episodes: int = 10, 
-                             steps: int = 100) -> Tuple[float, Dict[str, float]]:
+                             steps: int = 100, label: Optional[str] = None, port: Optional[int] = None,
+                             reset_mode: str = 'auto', decision_interval: int = 1,
+                             min_green: int = 0, warm_start: Optional[str] = None,
+                             checkpoint: Optional[str] = None, resume: bool = False,
+                             backend: Optional[str] = None, pipelined: bool = False) -> Tuple[float, Dict[str, float]]:
     """
     Pokreće simulaciju s zadanim parametrima i vraća prosječnu nagradu i statistiku.
+    
+    Args:
+        label: Oznaka TraCI konekcije (za paralelna pokretanja)
+        port: TCP port za TraCI (ako nije zadan, traci bira slobodan port)
+        reset_mode: Način resetiranja između epizoda ('load_state', 'restart', 'auto');
+            početno stanje se sprema u privremeni direktorij ovog pokretanja
+        decision_interval: Sekunde simulacije između odluka agenata
+        min_green: Minimalno trajanje faze u sekundama
+        warm_start: Checkpoint iz kojeg agenti počinju (umjesto prazne Q-tablice)
+        checkpoint: Direktorij u koji se agenti spremaju nakon zadnje epizode
+        resume: warm_start je nastavak istog pokretanja (epsilon i spremnik
+            iskustava iz checkpointa umjesto zadanih parametara)
+        backend: Pozadina simulatora (vidi utils.backend.BACKENDS; default: SUMO_BACKEND)
+        pipelined: Učenje na pozadinskoj dretvi dok SUMO računa sljedeći korak
     """
-    # Inicijalizacija SUMO simulacije
-    traci = initialize_simulation(net_file, trips_file)
+    # Inicijalizacija SUMO simulacije i spremanje početnog stanja
+    resets = EpisodeResetManager(net_file, trips_file, mode=reset_mode, label=label,
+                                 backend=backend, port=port)
+    traci = resets.start()
     
     # Učitavanje ruta vozila
     num_vehicles = load_trips(trips_file)
     print(f"Učitano {num_vehicles} vozila iz {trips_file}")
     
-    # Spremanje početnog stanja
-    save_network_state("Input/initial_state.xml")
-    
     # Inicijalizacija agenata za semafore
-    traffic_lights = get_traffic_lights()
+    # Statička topologija mreže (jedinstvene trake i faze po semaforu)
+    topology = load_topology(net_file, traci)
+    traffic_lights = topology.traffic_lights
     agents = {}
     
+    # Zajednički opažač: jedna snimka po koraku za sve agente i statistiku
+    observer = SubscriptionObserver(connection=traci)
+    
     for tl_id in traffic_lights:
-        phases = get_traffic_light_phases(tl_id)
-        controlled_lanes = get_controlled_lanes(tl_id)
+        phases = topology.phases(tl_id)
+        controlled_lanes = topology.lanes(tl_id)
         
         if not controlled_lanes:
             continue
@@ -48,138 +71,191 @@ def run_simulation_with_params(net_file: str, trips_file: str,
             alpha=alpha,
             gamma=gamma,
             epsilon=epsilon,
-            epsilon_decay=epsilon_decay
+            epsilon_decay=epsilon_decay,
+            decision_interval=decision_interval,
+            min_green=min_green,
+            observer=observer
         )
     
-    # Inicijalizacija statistike
-    total_rewards = []
-    stats = {
-        'waiting_times': [],
-        'queue_lengths': [],
-        'speeds': [],
-        'vehicles': []
-    }
-    
-    # Glavna petlja učenja
-    for episode in range(episodes):
-        # Resetiranje simulacije
-        load_network_state("Input/initial_state.xml")
-        
-        # Inicijalizacija stanja za epizodu
-        states = {tl_id: agent.get_state() for tl_id, agent in agents.items()}
-        episode_reward = 0
-        
-        for step in range(steps):
-            # Prikupljanje podataka o vozilima
-            vehicle_data = get_vehicle_data()
-            
-            # Ažuriranje statistike
-            if vehicle_data:
-                waiting_time = sum(data.get('waiting_time', 0) for data in vehicle_data.values()) / len(vehicle_data)
-                queue_length = sum(1 for data in vehicle_data.values() if data.get('speed', 0) < 0.1)
-                avg_speed = sum(data.get('speed', 0) for data in vehicle_data.values()) / len(vehicle_data)
-                
-                stats['waiting_times'].append(waiting_time)
-                stats['queue_lengths'].append(queue_length)
-                stats['speeds'].append(avg_speed)
-                stats['vehicles'].append(len(vehicle_data))
-            
-            # Ažuriranje Q-tablice za svaki semafor
-            for tl_id, agent in agents.items():
-                # Odabir akcije
-                action = agent.choose_action(states[tl_id])
-                
-                # Izvršavanje akcije
-                traci.trafficlight.setPhase(tl_id, action)
-                
-                # Dobivanje novog stanja i nagrade
-                new_state = agent.get_state()
-                reward = agent.get_reward()
-                
-                # Ažuriranje Q-tablice
-                agent.update_q_table(states[tl_id], action, reward, new_state)
-                
-                # Ažuriranje stanja
-                states[tl_id] = new_state
-                episode_reward += reward
-            
-            # Napredovanje simulacije
-            traci.simulationStep()
-        
-        total_rewards.append(episode_reward)
-        
-        # Ispisivanje napretka
-        if (episode + 1) % 5 == 0:
-            print(f"Epizoda {episode + 1}/{episodes}, "
-                  f"Prosječna nagrada: {np.mean(total_rewards[-5:]):.2f}, "
-                  f"Prosječno vrijeme čekanja: {np.mean(stats['waiting_times'][-steps:]):.2f}s")
+    # Nastavak iz checkpointa; epsilon i alpha ostaju iz zadanih parametara (osim pri nastavku)
+    completed = 0
+    if warm_start:
+        completed = load_checkpoint(warm_start, agents=agents, replay=resume)
+        if not resume:
+            completed = 0
+            for agent in agents.values():
+                agent.epsilon = epsilon
     
-    # Zatvaranje simulacije
-    close_simulation()
+    # Glavna petlja učenja (zatvara simulaciju); checkpoint nakon zadnje epizode
+    stats = SimulationStats()
+    total_rewards = run_episodes(resets, observer, agents, stats, episodes, steps,
+                                 decision_interval=decision_interval, pipelined=pipelined,
+                                 checkpoint_dir=checkpoint, checkpoint_every=episodes,
+                                 completed=completed)
     
     # Računanje prosječnih vrijednosti
     avg_stats = {
-        'waiting_time': np.mean(stats['waiting_times']),
-        'queue_length': np.mean(stats['queue_lengths']),
-        'speed': np.mean(stats['speeds']),
-        'vehicles': np.mean(stats['vehicles'])
+        'waiting_time': stats.overall['waiting_time'].mean,
+        'queue_length': stats.overall['queue_length'].mean,
+        'speed': stats.overall['speed'].mean,
+        'vehicles': stats.overall['vehicle_count'].mean
     }
     
     return np.mean(total_rewards), avg_stats
 
-def grid_search(net_file: str, trips_file: str) -> Dict[str, float]:
-    """
-    Izvodi grid search za pronalaženje optimalnih parametara.
-    """
+def param_grid() -> List[Dict[str, float]]:
+    """Vraća sve kombinacije parametara za grid search"""
     # Definicija grid-a parametara
     alphas = [0.1]  # Samo jedna vrijednost za alpha
     gammas = [0.9, 0.95]  # Dvije vrijednosti za gamma
     epsilons = [0.1, 0.2]  # Dvije vrijednosti za epsilon
     epsilon_decays = [0.995]  # Samo jedna vrijednost za epsilon_decay
     
+    return [
+        {'alpha': alpha, 'gamma': gamma, 'epsilon': epsilon, 'epsilon_decay': epsilon_decay}
+        for alpha, gamma, epsilon, epsilon_decay
+        in itertools.product(alphas, gammas, epsilons, epsilon_decays)
+    ]
+
+def print_result(avg_reward: float, stats: Dict[str, float]) -> None:
+    """Ispisuje rezultat jedne kombinacije parametara"""
+    print(f"Prosječna nagrada: {avg_reward:.2f}")
+    print(f"Prosječno vrijeme čekanja: {stats['waiting_time']:.2f}s")
+    print(f"Prosječna duljina reda: {stats['queue_length']:.2f}")
+    print(f"Prosječna brzina: {stats['speed']:.2f}m/s")
+    print(f"Prosječan broj vozila: {stats['vehicles']:.2f}")
+
+def grid_search(net_file: str, trips_file: str, workers: int = 1) -> Dict[str, float]:
+    """
+    Izvodi grid search za pronalaženje optimalnih parametara.
+    
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        trips_file: Putanja do datoteke s rutama vozila
+        workers: Broj paralelnih procesa (1 = redom, jedna simulacija za drugom)
+    """
+    if workers != 1:
+        return parallel_grid_search(net_file, trips_file, workers=workers)
+    
     best_params = None
     best_reward = float('-inf')
     best_stats = None
     
     # Grid search
-    for alpha in alphas:
-        for gamma in gammas:
-            for epsilon in epsilons:
-                for epsilon_decay in epsilon_decays:
-                    print(f"\nTestiranje parametara: "
-                          f"alpha={alpha}, gamma={gamma}, "
-                          f"epsilon={epsilon}, epsilon_decay={epsilon_decay}")
-                    
-                    try:
-                        avg_reward, stats = run_simulation_with_params(
-                            net_file, trips_file,
-                            alpha, gamma, epsilon, epsilon_decay,
-                            episodes=3,  # Smanjen broj epizoda
-                            steps=100
-                        )
-                        
-                        print(f"Prosječna nagrada: {avg_reward:.2f}")
-                        print(f"Prosječno vrijeme čekanja: {stats['waiting_time']:.2f}s")
-                        print(f"Prosječna duljina reda: {stats['queue_length']:.2f}")
-                        print(f"Prosječna brzina: {stats['speed']:.2f}m/s")
-                        print(f"Prosječan broj vozila: {stats['vehicles']:.2f}")
-                        
-                        if avg_reward > best_reward:
-                            best_reward = avg_reward
-                            best_stats = stats
-                            best_params = {
-                                'alpha': alpha,
-                                'gamma': gamma,
-                                'epsilon': epsilon,
-                                'epsilon_decay': epsilon_decay,
-                                'reward': avg_reward,
-                                **stats
-                            }
-                            print("Novi najbolji rezultat!")
-                            
-                    except Exception as e:
-                        print(f"Greška pri testiranju parametara: {e}")
-                        continue
+    for params in param_grid():
+        print(f"\nTestiranje parametara: "
+              f"alpha={params['alpha']}, gamma={params['gamma']}, "
+              f"epsilon={params['epsilon']}, epsilon_decay={params['epsilon_decay']}")
+        
+        try:
+            avg_reward, stats = run_simulation_with_params(
+                net_file, trips_file,
+                **params,
+                episodes=3,  # Smanjen broj epizoda
+                steps=100
+            )
+            
+            print_result(avg_reward, stats)
+            
+            if avg_reward > best_reward:
+                best_reward = avg_reward
+                best_stats = stats
+                best_params = {
+                    **params,
+                    'reward': avg_reward,
+                    **stats
+                }
+                print("Novi najbolji rezultat!")
+                
+        except Exception as e:
+            print(f"Greška pri testiranju parametara: {e}")
+            continue
+    
+    return best_params
+
+def _free_port() -> int:
+    """Slobodan TCP port koji dodjeljuje operacijski sustav"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+def _run_isolated(net_file: str, trips_file: str, params: Dict[str, float],
+                  episodes: int, steps: int, run_fn: Callable) -> Tuple[Dict[str, float], float, Dict[str, float]]:
+    """
+    Pokreće jednu kombinaciju u radnom procesu.
+    Svaki proces ima vlastitu označenu TraCI konekciju i vlastiti port
+    (dodijeljen ovdje, kako se paralelna pokretanja SUMO-a ne bi natjecala
+    za isti), a EpisodeResetManager vlastiti privremeni direktorij za početno stanje.
+    """
+    label = f"grid_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    avg_reward, stats = run_fn(
+        net_file, trips_file,
+        **params,
+        episodes=episodes,
+        steps=steps,
+        label=label,
+        port=_free_port()
+    )
+    return params, avg_reward, stats
+
+def iter_parallel_grid_search(net_file: str, trips_file: str,
+                              param_sets: Optional[List[Dict[str, float]]] = None,
+                              workers: Optional[int] = None, episodes: int = 3, steps: int = 100,
+                              run_fn: Callable = run_simulation_with_params
+                              ) -> Iterator[Tuple[Dict[str, float], float, Dict[str, float]]]:
+    """
+    Pokreće kombinacije parametara u zasebnim procesima i vraća rezultate čim pojedino pokretanje završi.
+    
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        trips_file: Putanja do datoteke s rutama vozila
+        param_sets: Kombinacije parametara (default: param_grid())
+        workers: Broj procesa (default: broj jezgri)
+        episodes: Broj epizoda po kombinaciji
+        steps: Broj koraka po epizodi
+        run_fn: Funkcija koja pokreće simulaciju (mora biti definirana na razini modula);
+            zamjenjiva lažnim simulatorom za testiranje
+    
+    Yields:
+        (parametri, prosječna nagrada, statistika) redom kojim pokretanja završavaju
+    """
+    param_sets = param_grid() if param_sets is None else param_sets
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {
+            executor.submit(_run_isolated, net_file, trips_file, params, episodes, steps, run_fn): params
+            for params in param_sets
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"Greška pri testiranju parametara {futures[future]}: {e}")
+
+def parallel_grid_search(net_file: str, trips_file: str, workers: Optional[int] = None,
+                         param_sets: Optional[List[Dict[str, float]]] = None,
+                         run_fn: Callable = run_simulation_with_params) -> Dict[str, float]:
+    """
+    Paralelni grid search: svaka kombinacija u vlastitom procesu s vlastitom SUMO instancom.
+    """
+    best_params = None
+    best_reward = float('-inf')
+    
+    for params, avg_reward, stats in iter_parallel_grid_search(
+            net_file, trips_file, param_sets, workers,
+            episodes=3,  # Smanjen broj epizoda
+            steps=100,
+            run_fn=run_fn):
+        print(f"\nZavršeno: {params}")
+        print_result(avg_reward, stats)
+        
+        if avg_reward > best_reward:
+            best_reward = avg_reward
+            best_params = {
+                **params,
+                'reward': avg_reward,
+                **stats
+            }
+            print("Novi najbolji rezultat!")
     
     return best_params
 
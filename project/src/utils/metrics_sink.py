@@ -0,0 +1,269 @@
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from .observation import StepSnapshot
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet je opcionalan, inače se koristi .npz
+    pa = None
+    pq = None
+
+# Shema tablica: stupac -> dtype.
+# tl_id se sprema kao indeks u listu ID-ova semafora (schema.json), run_id kao naziv direktorija.
+SCHEMA = {
+    'steps': {
+        'episode': np.int32,
+        'step': np.float64,
+        'vehicles': np.int32,
+        'queue': np.int32,
+        'waiting_time': np.float32,
+        'speed': np.float32,
+        'stops': np.int32
+    },
+    'junctions': {
+        'episode': np.int32,
+        'step': np.float64,
+        'tl_id': np.int32,
+        'action': np.int16,
+        'reward': np.float32,
+        'queue': np.int32,
+        'waiting_time': np.float32
+    },
+    'episodes': {
+        'episode': np.int32,
+        'total_reward': np.float64,
+        'mean_waiting_time': np.float64,
+        'mean_queue': np.float64,
+        'reset_latency': np.float64
+    }
+}
+
+FORMATS = ('npz', 'parquet')
+
+class MetricsSink:
+    """
+    Zapisivanje metrika po koraku, po semaforu i po epizodi u stupčane blokove.
+
+    Zapisi se skupljaju u unaprijed alocirana NumPy polja po stupcima; kad
+    se blok napuni, predaje se pozadinskoj dretvi koja ga zapisuje kao
+    komprimirani .npz (ili Parquet ako je pyarrow dostupan), pa petlja
+    simulacije ne čeka na disk. Svako pokretanje ima vlastiti direktorij
+    <directory>/<run_id> sa schema.json i datotekama <tablica>-<blok>.<format>.
+    """
+
+    def __init__(self, directory: str, run_id: Optional[str] = None,
+                 tl_ids: Sequence[str] = (), chunk_size: int = 8192, format: str = 'npz'):
+        """
+        Args:
+            directory: Direktorij za sva pokretanja
+            run_id: ID pokretanja (default: vrijeme pokretanja)
+            tl_ids: ID-ovi semafora (redoslijed određuje indeks u stupcu tl_id)
+            chunk_size: Broj zapisa po bloku
+            format: 'npz' ili 'parquet'
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Nepoznat format: {format}")
+        if format == 'parquet' and pq is None:
+            print("Upozorenje: pyarrow nije instaliran, metrike se spremaju kao .npz")
+            format = 'npz'
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.run_dir = os.path.join(directory, self.run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.format = format
+        self.chunk_size = chunk_size
+        self.tl_ids = list(tl_ids)
+        self.tl_index = {tl_id: i for i, tl_id in enumerate(self.tl_ids)}
+
+        self._buffers = {table: self._new_buffer(table) for table in SCHEMA}
+        self._sizes = {table: 0 for table in SCHEMA}
+        self._chunks = {table: 0 for table in SCHEMA}
+
+        # Pozadinsko zapisivanje (ograničen red kako memorija ne bi rasla)
+        self._queue: queue.Queue = queue.Queue(maxsize=8)
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _new_buffer(self, table: str) -> Dict[str, np.ndarray]:
+        return {column: np.empty(self.chunk_size, dtype=dtype) for column, dtype in SCHEMA[table].items()}
+
+    def _append(self, table: str, n: int, **columns) -> None:
+        """Dodaje n zapisa u tablicu (skalari se ponavljaju, polja se kopiraju)"""
+        offset = 0
+        while offset < n:
+            size = self._sizes[table]
+            count = min(n - offset, self.chunk_size - size)
+            buffer = self._buffers[table]
+            for column, values in columns.items():
+                if np.ndim(values):
+                    buffer[column][size:size + count] = values[offset:offset + count]
+                else:
+                    buffer[column][size:size + count] = values
+            self._sizes[table] = size + count
+            offset += count
+            if self._sizes[table] == self.chunk_size:
+                self._submit(table)
+
+    def _submit(self, table: str) -> None:
+        """Predaje puni (ili zadnji) blok dretvi za zapisivanje"""
+        size = self._sizes[table]
+        if not size:
+            return
+        if self._error is not None:
+            raise RuntimeError("Zapisivanje metrika nije uspjelo") from self._error
+        columns = {column: values[:size] for column, values in self._buffers[table].items()}
+        path = os.path.join(self.run_dir, f"{table}-{self._chunks[table]:05d}.{self.format}")
+        self._queue.put((path, columns))
+        self._buffers[table] = self._new_buffer(table)
+        self._sizes[table] = 0
+        self._chunks[table] += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, columns = item
+                if self._error is None:
+                    self._write_chunk(path, columns)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write_chunk(self, path: str, columns: Dict[str, np.ndarray]) -> None:
+        # Pisanje u privremenu datoteku pa preimenovanje, kako čitač ne bi vidio pola bloka
+        tmp_path = f"{path}.tmp"
+        if self.format == 'parquet':
+            pq.write_table(pa.table(columns), tmp_path)
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **columns)
+        os.replace(tmp_path, path)
+
+    def log_step(self, episode: int, snapshot: StepSnapshot) -> None:
+        """Zapisuje stanje cijele mreže u jednom koraku (kao SimulationStats.record_snapshot)"""
+        if not snapshot.vehicle_count:
+            return
+        waiting_time, queue, speed, vehicles, stops = snapshot.vehicle_data().aggregates()
+        self._append('steps', 1, episode=episode, step=snapshot.time, vehicles=vehicles,
+                     queue=queue, waiting_time=waiting_time, speed=speed, stops=stops)
+
+    def log_junctions(self, episode: int, step: float, tl_ids: Sequence[str],
+                      actions: Sequence[int], rewards: Sequence[float],
+                      queues: Sequence[int], waiting_times: Sequence[float]) -> None:
+        """Zapisuje akciju, nagradu i red za više semafora u istom koraku"""
+        for tl_id in tl_ids:
+            if tl_id not in self.tl_index:
+                self.tl_index[tl_id] = len(self.tl_ids)
+                self.tl_ids.append(tl_id)
+        self._append(
+            'junctions', len(tl_ids),
+            episode=episode,
+            step=step,
+            tl_id=np.array([self.tl_index[tl_id] for tl_id in tl_ids], dtype=np.int32),
+            action=np.asarray(actions),
+            reward=np.asarray(rewards),
+            queue=np.asarray(queues),
+            waiting_time=np.asarray(waiting_times)
+        )
+
+    def log_episode(self, episode: int, total_reward: float = 0.0,
+                    mean_waiting_time: float = float('nan'), mean_queue: float = float('nan'),
+                    reset_latency: float = 0.0) -> None:
+        """Zapisuje sažetak epizode"""
+        self._append('episodes', 1, episode=episode, total_reward=total_reward,
+                     mean_waiting_time=mean_waiting_time, mean_queue=mean_queue,
+                     reset_latency=reset_latency)
+
+    def flush(self) -> None:
+        """Predaje sve djelomične blokove i čeka da budu zapisani"""
+        for table in SCHEMA:
+            self._submit(table)
+        self._queue.join()
+        if self._error is not None:
+            raise RuntimeError("Zapisivanje metrika nije uspjelo") from self._error
+
+    def close(self) -> None:
+        """Zapisuje preostale blokove i shemu te zaustavlja dretvu"""
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        schema = {
+            'run_id': self.run_id,
+            'format': self.format,
+            'tl_ids': self.tl_ids,
+            'tables': {table: {column: np.dtype(dtype).str for column, dtype in columns.items()}
+                       for table, columns in SCHEMA.items()},
+            'chunks': self._chunks
+        }
+        with open(os.path.join(self.run_dir, 'schema.json'), 'w', encoding='utf-8') as f:
+            json.dump(schema, f, indent=2)
+
+class MetricsReader:
+    """
+    Čitanje metrika jednog pokretanja bez ponovnog pokretanja SUMO-a.
+
+    Za .npz blokove se pri prvom čitanju tablice stupci spajaju u
+    nekomprimirane .npy datoteke (direktorij cache/) koje se zatim
+    otvaraju memorijski mapirano. Parquet se čita preko pyarrow memory mapa.
+    """
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        with open(os.path.join(run_dir, 'schema.json'), 'r', encoding='utf-8') as f:
+            self.schema = json.load(f)
+        self.run_id = self.schema['run_id']
+        self.tl_ids: List[str] = self.schema['tl_ids']
+
+    def _chunk_paths(self, table: str) -> List[str]:
+        extension = self.schema['format']
+        return [os.path.join(self.run_dir, f"{table}-{i:05d}.{extension}")
+                for i in range(self.schema['chunks'][table])]
+
+    def _build_cache(self, table: str, cache_dir: str) -> None:
+        """Spaja .npz blokove u jednu .npy datoteku po stupcu"""
+        os.makedirs(cache_dir, exist_ok=True)
+        paths = self._chunk_paths(table)
+        for column, dtype in self.schema['tables'][table].items():
+            parts = []
+            for path in paths:
+                with np.load(path) as chunk:
+                    parts.append(chunk[column])
+            values = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+            np.save(os.path.join(cache_dir, f"{table}.{column}.npy"), values)
+
+    def table(self, name: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Vraća tablicu kao rječnik stupaca (NumPy polja).
+
+        Args:
+            name: 'steps', 'junctions' ili 'episodes'
+            mmap: Memorijski mapirano čitanje
+        """
+        columns = self.schema['tables'][name]
+        if self.schema['format'] == 'parquet':
+            tables = [pq.read_table(path, memory_map=mmap) for path in self._chunk_paths(name)]
+            if not tables:
+                return {column: np.zeros(0, dtype=dtype) for column, dtype in columns.items()}
+            merged = pa.concat_tables(tables)
+            return {column: merged.column(column).to_numpy() for column in columns}
+
+        cache_dir = os.path.join(self.run_dir, 'cache')
+        if not all(os.path.exists(os.path.join(cache_dir, f"{name}.{column}.npy")) for column in columns):
+            self._build_cache(name, cache_dir)
+        return {
+            column: np.load(os.path.join(cache_dir, f"{name}.{column}.npy"), mmap_mode='r' if mmap else None)
+            for column in columns
+        }
+
+    def junction_names(self, tl_index: np.ndarray) -> np.ndarray:
+        """Pretvara stupac tl_id (indeksi) natrag u ID-ove semafora"""
+        return np.asarray(self.tl_ids, dtype=object)[tl_index]
@@ -0,0 +1,297 @@
+import numpy as np
+import traci
+import traci.constants as tc
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Varijable na koje se pretplaćujemo za svaku traku
+# (popis vozila po traci nije potreban: traka vozila je u VehicleLaneTable)
+LANE_VARIABLES = [
+    tc.LAST_STEP_VEHICLE_HALTING_NUMBER,
+    tc.LAST_STEP_MEAN_SPEED,
+    tc.LAST_STEP_VEHICLE_NUMBER
+]
+
+# Varijable na koje se pretplaćujemo za svako vozilo
+VEHICLE_VARIABLES = [
+    tc.VAR_SPEED,
+    tc.VAR_WAITING_TIME,
+    tc.VAR_STOPSTATE,
+    tc.VAR_LANE_ID
+]
+
+# Varijable simulacije (vrijeme te vozila koja su ušla u mrežu i izašla iz nje)
+SIMULATION_VARIABLES = [
+    tc.VAR_TIME,
+    tc.VAR_DEPARTED_VEHICLES_IDS,
+    tc.VAR_ARRIVED_VEHICLES_IDS
+]
+
+# Prag brzine ispod kojeg se vozilo smatra zaustavljenim
+STOPPED_SPEED = 0.1
+
+# Prag vremena čekanja za dodatno kažnjavanje u nagradi
+LONG_WAIT = 30.0
+
+class VehicleData(NamedTuple):
+    """
+    Podaci o vozilima kao polja (struct-of-arrays): i-ti element svakog
+    polja odnosi se na vozilo ids[i].
+    """
+    ids: List[str]
+    waiting: np.ndarray
+    speed: np.ndarray
+    stops: np.ndarray
+
+    @property
+    def count(self) -> int:
+        """Broj vozila"""
+        return len(self.ids)
+
+    def aggregates(self) -> Tuple[float, int, float, int, int]:
+        """
+        Agregati jednog koraka (redom kao METRICS u standard_simulation):
+        prosječno vrijeme čekanja, broj zaustavljenih vozila, prosječna
+        brzina, broj vozila i zbroj zaustavljanja.
+        """
+        if not self.count:
+            return 0.0, 0, 0.0, 0, 0
+        return (
+            float(self.waiting.mean()),
+            int(np.count_nonzero(self.speed < STOPPED_SPEED)),
+            float(self.speed.mean()),
+            self.count,
+            int(self.stops.sum())
+        )
+
+class VehicleLaneTable:
+    """
+    Tablica vozilo -> indeks praćene trake.
+
+    Vozila se dodaju kad uđu u mrežu (departed), a brišu kad izađu
+    (arrived). TraCI ne javlja koja su vozila promijenila traku, pa se u
+    svakom koraku pretplaćeni VAR_LANE_ID svih vozila uspoređuje sa
+    zapisanim (jedan prolaz kroz rezultate pretplata, kao i za brzinu i
+    čekanje u StepSnapshot). Indeks trake se ponovno traži i zapis
+    mijenja samo za vozila čija se traka promijenila, pa se tablica ne
+    gradi iznova iz popisa vozila po trakama.
+    """
+
+    def __init__(self, lane_index: Dict[str, int]):
+        self.lane_index = lane_index
+        # veh_id -> (ID trake, indeks praćene trake ili -1)
+        self.lanes: Dict[str, Tuple[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.lanes)
+
+    def set_lane_index(self, lane_index: Dict[str, int]) -> None:
+        """Novi raspored praćenih traka: indeksi svih vozila se ponovno traže"""
+        self.lane_index = lane_index
+        self.lanes = {veh_id: (lane, lane_index.get(lane, -1)) for veh_id, (lane, _) in self.lanes.items()}
+
+    def clear(self) -> None:
+        self.lanes.clear()
+
+    def update(self, departed, arrived, vehicle_results: Dict[str, Dict[int, object]]) -> None:
+        """
+        Primjenjuje promjene jednog koraka (prolaz kroz sva vozila u
+        vehicle_results, zapisi se mijenjaju samo za promijenjene trake).
+
+        Args:
+            departed: Vozila koja su ušla u mrežu
+            arrived: Vozila koja su izašla iz mreže
+            vehicle_results: Rezultati pretplata na vozila (s VAR_LANE_ID)
+        """
+        lanes = self.lanes
+        for veh_id in arrived:
+            lanes.pop(veh_id, None)
+        for veh_id in departed:
+            lanes.setdefault(veh_id, ('', -1))
+        lane_index = self.lane_index
+        for veh_id, values in vehicle_results.items():
+            lane = values.get(tc.VAR_LANE_ID, '')
+            entry = lanes.get(veh_id)
+            if entry is None or entry[0] != lane:
+                lanes[veh_id] = (lane, lane_index.get(lane, -1))
+
+    def vehicle_lanes(self, vehicle_ids: List[str]) -> np.ndarray:
+        """Indeksi traka za zadana vozila (-1 ako traka nije praćena)"""
+        lanes = self.lanes
+        missing = ('', -1)
+        return np.fromiter((lanes.get(veh_id, missing)[1] for veh_id in vehicle_ids),
+                           dtype=np.int64, count=len(vehicle_ids))
+
+class StepSnapshot:
+    """
+    Snimka stanja mreže u jednom koraku simulacije.
+
+    Sadrži polja po trakama i po vozilima. Gradi se jednom po koraku
+    i dijele je svi agenti i skupljač statistike.
+
+    Atributi po trakama (indeksirani s lane_index[lane]):
+        lane_vehicle_number, lane_halting, lane_mean_speed
+        lane_stopped: broj vozila s brzinom < 0.1
+        lane_waiting_sum: zbroj vremena čekanja vozila na traci
+        lane_long_waiting_sum: zbroj vremena čekanja vozila koja čekaju > 30 s
+
+    Atributi po vozilima (indeksirani s vehicle_index[veh_id]):
+        speed, waiting_time, stops, vehicle_lane (-1 ako traka nije praćena)
+    """
+
+    def __init__(self, time: Optional[float], lane_ids: List[str],
+                 lane_index: Dict[str, int], lane_results: Dict[str, Dict[int, object]],
+                 vehicle_results: Dict[str, Dict[int, object]],
+                 lane_table: Optional[VehicleLaneTable] = None):
+        self.time = time
+        self.lane_ids = lane_ids
+        self.lane_index = lane_index
+
+        # Polja po vozilima
+        self.vehicle_ids = list(vehicle_results)
+        self.vehicle_index = {veh_id: i for i, veh_id in enumerate(self.vehicle_ids)}
+        self.speed = np.fromiter(
+            (values.get(tc.VAR_SPEED, 0.0) for values in vehicle_results.values()),
+            dtype=np.float64, count=len(self.vehicle_ids))
+        self.waiting_time = np.fromiter(
+            (values.get(tc.VAR_WAITING_TIME, 0.0) for values in vehicle_results.values()),
+            dtype=np.float64, count=len(self.vehicle_ids))
+        self.stops = np.fromiter(
+            (values.get(tc.VAR_STOPSTATE, 0) for values in vehicle_results.values()),
+            dtype=np.int64, count=len(self.vehicle_ids))
+
+        # Polja po trakama
+        n_lanes = len(lane_ids)
+        self.lane_vehicle_number = np.zeros(n_lanes, dtype=np.int64)
+        self.lane_halting = np.zeros(n_lanes, dtype=np.int64)
+        self.lane_mean_speed = np.zeros(n_lanes, dtype=np.float64)
+        for lane, i in lane_index.items():
+            values = lane_results.get(lane, {})
+            self.lane_vehicle_number[i] = values.get(tc.LAST_STEP_VEHICLE_NUMBER, 0)
+            self.lane_halting[i] = values.get(tc.LAST_STEP_VEHICLE_HALTING_NUMBER, 0)
+            self.lane_mean_speed[i] = values.get(tc.LAST_STEP_MEAN_SPEED, 0.0)
+
+        # Traka svakog vozila iz tablice traka (ili iz VAR_LANE_ID ako tablice nema)
+        if lane_table is not None:
+            self.vehicle_lane = lane_table.vehicle_lanes(self.vehicle_ids)
+        else:
+            self.vehicle_lane = np.fromiter(
+                (lane_index.get(values.get(tc.VAR_LANE_ID, ''), -1) for values in vehicle_results.values()),
+                dtype=np.int64, count=len(self.vehicle_ids))
+
+        # Agregati po trakama iz podataka o vozilima
+        on_lane = self.vehicle_lane >= 0
+        lanes_of = self.vehicle_lane[on_lane]
+        speed = self.speed[on_lane]
+        waiting = self.waiting_time[on_lane]
+        self.lane_vehicle_count = np.bincount(lanes_of, minlength=n_lanes)
+        self.lane_stopped = np.bincount(lanes_of, weights=(speed < STOPPED_SPEED), minlength=n_lanes)
+        self.lane_waiting_sum = np.bincount(lanes_of, weights=waiting, minlength=n_lanes)
+        self.lane_long_waiting_sum = np.bincount(
+            lanes_of, weights=np.where(waiting > LONG_WAIT, waiting, 0.0), minlength=n_lanes)
+
+    @property
+    def vehicle_count(self) -> int:
+        """Broj vozila u mreži"""
+        return len(self.vehicle_ids)
+
+    def vehicle_data(self) -> VehicleData:
+        """Podaci o vozilima u snimci kao VehicleData (bez kopiranja polja)"""
+        return VehicleData(self.vehicle_ids, self.waiting_time, self.speed, self.stops)
+
+    def lane_indices(self, lanes: List[str]) -> np.ndarray:
+        """Vraća indekse zadanih traka u poljima snimke"""
+        return np.array([self.lane_index[lane] for lane in lanes], dtype=np.int64)
+
+class SubscriptionObserver:
+    """
+    Opažanje traka i vozila preko TraCI pretplata.
+
+    Umjesto jednog TraCI poziva po traci i po vozilu, na svaku traku se
+    pretplatimo jednom, a na svako vozilo kad uđe u mrežu. Rezultate
+    pretplata SUMO šalje zajedno s odgovorom na simulationStep(), pa je
+    njihovo čitanje lokalno i ne košta round-trip. StepSnapshot se gradi
+    najviše jednom po koraku simulacije, bez obzira na broj korisnika.
+    """
+
+    def __init__(self, lanes: List[str] = (), connection=traci):
+        """
+        Args:
+            lanes: Lista traka koje se prate (duplikati se uklanjaju)
+            connection: TraCI konekcija ili modul s istim sučeljem
+        """
+        self.connection = connection
+        self.lanes: List[str] = []
+        self.lane_index: Dict[str, int] = {}
+        self._subscribed = False
+        self._snapshot: Optional[StepSnapshot] = None
+        self.lane_table = VehicleLaneTable(self.lane_index)
+        self.add_lanes(lanes)
+
+    def add_lanes(self, lanes: List[str]) -> None:
+        """Dodaje trake za praćenje"""
+        new_lanes = [lane for lane in dict.fromkeys(lanes) if lane not in self.lane_index]
+        if not new_lanes:
+            return
+        # Nova lista kako bi agenti prepoznali promjenu rasporeda traka
+        self.lanes = self.lanes + new_lanes
+        self.lane_index = {lane: i for i, lane in enumerate(self.lanes)}
+        self.lane_table.set_lane_index(self.lane_index)
+        self._subscribed = False
+        self._snapshot = None
+
+    def subscribe(self) -> None:
+        """Pretplaćuje se na sve praćene trake, vozila u mreži i vrijeme simulacije"""
+        for lane in self.lanes:
+            self.connection.lane.subscribe(lane, LANE_VARIABLES)
+        self.connection.simulation.subscribe(SIMULATION_VARIABLES)
+
+        # Vozila koja su već u mreži (npr. nakon loadState)
+        subscribed = self.connection.vehicle.getAllSubscriptionResults()
+        for veh_id in self.connection.vehicle.getIDList():
+            if veh_id not in subscribed:
+                self.connection.vehicle.subscribe(veh_id, VEHICLE_VARIABLES)
+        self._subscribed = True
+        self._snapshot = None
+
+    def reset(self) -> None:
+        """
+        Poništava snimku nakon učitavanja stanja (loadState).
+        Ponovna pretplata vraća svježe vrijednosti bez čekanja na sljedeći korak.
+        """
+        self._subscribed = False
+        self.lane_table.clear()
+        self.refresh()
+
+    def refresh(self) -> StepSnapshot:
+        """Gradi novu snimku ako se vrijeme simulacije promijenilo"""
+        if not self._subscribed:
+            self.subscribe()
+
+        simulation_results = self.connection.simulation.getSubscriptionResults()
+        time = simulation_results.get(tc.VAR_TIME)
+        if self._snapshot is not None and time == self._snapshot.time:
+            return self._snapshot
+
+        # Pretplata na vozila koja su ušla u mrežu u zadnjem koraku
+        vehicle_results = self.connection.vehicle.getAllSubscriptionResults()
+        departed = simulation_results.get(tc.VAR_DEPARTED_VEHICLES_IDS, ())
+        for veh_id in departed:
+            if veh_id not in vehicle_results:
+                self.connection.vehicle.subscribe(veh_id, VEHICLE_VARIABLES)
+                vehicle_results[veh_id] = self.connection.vehicle.getSubscriptionResults(veh_id)
+        self.lane_table.update(departed, simulation_results.get(tc.VAR_ARRIVED_VEHICLES_IDS, ()),
+                               vehicle_results)
+
+        self._snapshot = StepSnapshot(
+            time,
+            self.lanes,
+            self.lane_index,
+            self.connection.lane.getAllSubscriptionResults(),
+            vehicle_results,
+            self.lane_table
+        )
+        return self._snapshot
+
+    def snapshot(self) -> StepSnapshot:
+        """Vraća snimku za trenutni korak simulacije"""
+        return self.refresh()
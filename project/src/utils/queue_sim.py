@@ -0,0 +1,619 @@
+"""
+Ugrađeni simulator s modelom točkastog reda (point queue) za brzo
+predučenje agenata bez SUMO-a.
+
+Trake, veze i programi semafora čitaju se iz iste mrežne datoteke kao
+i za SUMO, a potražnja iz trips datoteke (rute najkraćim putem po
+vremenu vožnje). Vozilo vozi slobodnom brzinom trake do zaustavne
+crte, gdje čeka u redu trake; prvo vozilo u redu prolazi kad njegova
+veza ima zeleno, kad je prošao razmak zasićenja (headway) i kad na
+sljedećoj traci ima mjesta. Sva vozila se obrađuju vektorski (NumPy).
+
+QueueSimulator ima isto sučelje kao traci modul (pretplate, upiti po
+trakama, vozilima i semaforima, saveState / loadState), pa opažač,
+agenti i petlje učenja rade nepromijenjeno, a naučeni checkpoint se
+zatim dotrenira u SUMO-u.
+"""
+import heapq
+import numpy as np
+import traci
+import traci.constants as tc
+import xml.etree.ElementTree as ET
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+from .traci_domain import Domain
+from .observation import STOPPED_SPEED
+
+# Stanja vozila
+PENDING, RUNNING, ARRIVED = 0, 1, 2
+
+# Oznake veze u ruti vozila: izlaz iz mreže (zadnji rub) i veza bez semafora
+EXIT_LINK = -2
+FREE_LINK = -1
+
+# Duljina vozila s razmakom u redu (kapacitet trake u vozilima)
+VEHICLE_SPACING = 7.5
+
+# Korak simulacije u sekundama
+STEP_LENGTH = 1.0
+
+# Polja stanja simulacije (saveState / loadState)
+STATE_FIELDS = ('time', 'status', 'position', 'vehicle_lane', 'distance', 'speed', 'waiting',
+                'queued_since', 'lane_release', 'tl_phase', 'tl_remaining', 'first_pending')
+
+def _copy(value):
+    return value.copy() if isinstance(value, np.ndarray) else value
+
+class QueueNetwork:
+    """
+    Mreža za model reda: trake (brzina, duljina, kapacitet), veze između
+    rubova i programi semafora iz mrežne datoteke (jedan prolaz kroz XML).
+    Unutarnje trake raskrižja se preskaču.
+    """
+
+    def __init__(self, net_file: str):
+        lane_ids: List[str] = []
+        lane_speed: List[float] = []
+        lane_length: List[float] = []
+        self.edge_lanes: Dict[str, List[int]] = {}
+        programs: Dict[str, List[Tuple[float, str]]] = {}
+        raw_connections = []
+
+        for _, elem in ET.iterparse(net_file, events=('end',)):
+            if elem.tag == 'edge':
+                if elem.get('function') != 'internal':
+                    lanes = []
+                    for lane in elem.findall('lane'):
+                        lanes.append(len(lane_ids))
+                        lane_ids.append(lane.get('id'))
+                        lane_speed.append(float(lane.get('speed', 13.89)))
+                        lane_length.append(max(float(lane.get('length', 1.0)), 0.1))
+                    self.edge_lanes[elem.get('id')] = lanes
+                elem.clear()
+            elif elem.tag == 'tlLogic':
+                # Kao getAllProgramLogics(tl_id)[0]: prvi program semafora
+                if elem.get('id') not in programs:
+                    programs[elem.get('id')] = [(float(phase.get('duration', 1)), phase.get('state', ''))
+                                                for phase in elem.findall('phase')]
+                elem.clear()
+            elif elem.tag == 'connection':
+                if not elem.get('from', '').startswith(':'):
+                    raw_connections.append((elem.get('from'), elem.get('to'), int(elem.get('fromLane', 0)),
+                                            int(elem.get('toLane', 0)), elem.get('tl'), elem.get('linkIndex')))
+                elem.clear()
+            elif elem.tag == 'junction':
+                elem.clear()
+
+        self.lane_ids = lane_ids
+        self.lane_index = {lane: i for i, lane in enumerate(lane_ids)}
+        self.lane_speed = np.array(lane_speed, dtype=np.float64)
+        self.lane_length = np.array(lane_length, dtype=np.float64)
+        self.lane_capacity = np.maximum(self.lane_length // VEHICLE_SPACING, 1).astype(np.int64)
+
+        # Programi semafora: faze svih semafora u jednom polju (pomak po semaforu)
+        self.tl_ids = list(programs)
+        self.tl_index = {tl_id: i for i, tl_id in enumerate(self.tl_ids)}
+        self.tl_phases = [programs[tl_id] for tl_id in self.tl_ids]
+        self.tl_n_phases = np.array([max(len(p), 1) for p in self.tl_phases], dtype=np.int64)
+        self.tl_phase_offset = np.concatenate(([0], np.cumsum(self.tl_n_phases)[:-1])).astype(np.int64)
+        self.phase_duration = np.array([duration for phases in self.tl_phases
+                                        for duration, _ in (phases or [(1.0, '')])], dtype=np.float64)
+
+        # Veze: (rub, sljedeći rub) -> [(traka, sljedeća traka, veza)]
+        self.connections: Dict[Tuple[str, str], List[Tuple[int, int, int]]] = {}
+        self.successors: Dict[str, List[str]] = {}
+        self.tl_links: Dict[str, Dict[int, Tuple[str, str]]] = {tl_id: {} for tl_id in self.tl_ids}
+        link_ids: Dict[Tuple[str, int], int] = {}
+        for from_edge, to_edge, from_lane, to_lane, tl_id, link_index in raw_connections:
+            if from_edge not in self.edge_lanes or to_edge not in self.edge_lanes:
+                continue
+            lanes_from, lanes_to = self.edge_lanes[from_edge], self.edge_lanes[to_edge]
+            if from_lane >= len(lanes_from) or to_lane >= len(lanes_to):
+                continue
+            link = FREE_LINK
+            if tl_id in self.tl_index and link_index is not None:
+                link = link_ids.setdefault((tl_id, int(link_index)), len(link_ids))
+                self.tl_links[tl_id][int(link_index)] = (lane_ids[lanes_from[from_lane]],
+                                                         lane_ids[lanes_to[to_lane]])
+            key = (from_edge, to_edge)
+            if key not in self.connections:
+                self.connections[key] = []
+                self.successors.setdefault(from_edge, []).append(to_edge)
+            self.connections[key].append((lanes_from[from_lane], lanes_to[to_lane], link))
+
+        # Zeleno po fazi i vezi: green_flat[link_base + faza * link_stride]
+        n_links = {tl_id: max(links) + 1 if links else 0 for tl_id, links in self.tl_links.items()}
+        green, bases = [], {}
+        for tl_id, phases in zip(self.tl_ids, self.tl_phases):
+            bases[tl_id] = sum(len(g) for g in green)
+            matrix = np.zeros((max(len(phases), 1), n_links[tl_id]), dtype=bool)
+            for p, (_, state) in enumerate(phases):
+                for i in range(min(len(state), n_links[tl_id])):
+                    matrix[p, i] = state[i] in 'GgOo'
+            green.append(matrix.ravel())
+        self.green_flat = np.concatenate(green) if green else np.zeros(0, dtype=bool)
+        n_controlled = len(link_ids)
+        self.link_tl = np.zeros(n_controlled, dtype=np.int64)
+        self.link_base = np.zeros(n_controlled, dtype=np.int64)
+        self.link_stride = np.zeros(n_controlled, dtype=np.int64)
+        for (tl_id, link_index), link in link_ids.items():
+            self.link_tl[link] = self.tl_index[tl_id]
+            self.link_base[link] = bases[tl_id] + link_index
+            self.link_stride[link] = n_links[tl_id]
+        self.n_links = n_links
+
+        self._trees: Dict[str, Dict[str, str]] = {}
+
+    def link_lanes(self, tl_id: str) -> List[str]:
+        """Ulazna traka za svaki indeks veze semafora (kao getControlledLanes)"""
+        links = self.tl_links[tl_id]
+        return [links[i][0] if i in links else '' for i in range(self.n_links[tl_id])]
+
+    def _edge_time(self, edge: str) -> float:
+        lane = self.edge_lanes[edge][0] if self.edge_lanes[edge] else None
+        return self.lane_length[lane] / max(self.lane_speed[lane], 0.1) if lane is not None else 1.0
+
+    def _shortest_paths(self, source: str) -> Dict[str, str]:
+        """Stablo najkraćih putova (po vremenu vožnje slobodnom brzinom) iz ruba"""
+        distance = {source: 0.0}
+        previous: Dict[str, str] = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, edge = heapq.heappop(heap)
+            if d > distance[edge]:
+                continue
+            for nxt in self.successors.get(edge, ()):
+                nd = d + self._edge_time(nxt)
+                if nd < distance.get(nxt, np.inf):
+                    distance[nxt] = nd
+                    previous[nxt] = edge
+                    heapq.heappush(heap, (nd, nxt))
+        return previous
+
+    def route(self, source: str, target: str) -> Optional[List[str]]:
+        """Niz rubova od source do target (None ako put ne postoji)"""
+        if source not in self.edge_lanes or target not in self.edge_lanes:
+            return None
+        if source == target:
+            return [source]
+        if source not in self._trees:
+            self._trees[source] = self._shortest_paths(source)
+        previous = self._trees[source]
+        if target not in previous:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+        return path[::-1]
+
+    def lane_path(self, edges: List[str], k: int) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        Trake i veze rute. Između dva ruba bira se k-ta od paralelnih veza
+        (vozila se raspoređuju po trakama); na zadnjem rubu vozilo izlazi.
+        """
+        lanes, links = [], []
+        for edge, nxt in zip(edges, edges[1:]):
+            options = self.connections.get((edge, nxt))
+            if not options:
+                return None
+            lane, _, link = options[k % len(options)]
+            lanes.append(lane)
+            links.append(link)
+        last = self.edge_lanes.get(edges[-1]) if edges else None
+        if not last:
+            return None
+        lanes.append(last[k % len(last)])
+        links.append(EXIT_LINK)
+        return lanes, links
+
+class _QueueLaneDomain(Domain):
+    name = 'lane'
+
+    def _value(self, lane_id: str, var_id: int):
+        sim = self._sim
+        i = sim.network.lane_index[lane_id]
+        if var_id == tc.LAST_STEP_VEHICLE_NUMBER:
+            return int(sim.lane_count[i])
+        if var_id == tc.LAST_STEP_VEHICLE_HALTING_NUMBER:
+            return int(sim.lane_halting[i])
+        if var_id == tc.LAST_STEP_MEAN_SPEED:
+            return float(sim.lane_mean_speed[i])
+        if var_id == tc.LAST_STEP_VEHICLE_ID_LIST:
+            return tuple(sim.vehicle_ids[v] for v in np.flatnonzero((sim.status == RUNNING) & (sim.vehicle_lane == i)))
+        raise KeyError(var_id)
+
+    def getIDList(self):
+        self._call('getIDList')
+        return tuple(self._sim.network.lane_ids)
+
+    def getLastStepVehicleIDs(self, lane_id: str):
+        self._call('getLastStepVehicleIDs')
+        return self._value(lane_id, tc.LAST_STEP_VEHICLE_ID_LIST)
+
+    def getLastStepHaltingNumber(self, lane_id: str) -> int:
+        self._call('getLastStepHaltingNumber')
+        return self._value(lane_id, tc.LAST_STEP_VEHICLE_HALTING_NUMBER)
+
+    def getLastStepMeanSpeed(self, lane_id: str) -> float:
+        self._call('getLastStepMeanSpeed')
+        return self._value(lane_id, tc.LAST_STEP_MEAN_SPEED)
+
+    def getLastStepVehicleNumber(self, lane_id: str) -> int:
+        self._call('getLastStepVehicleNumber')
+        return self._value(lane_id, tc.LAST_STEP_VEHICLE_NUMBER)
+
+class _QueueVehicleDomain(Domain):
+    name = 'vehicle'
+
+    def _exists(self, veh_id: str) -> bool:
+        i = self._sim.vehicle_index.get(veh_id)
+        return i is not None and self._sim.status[i] == RUNNING
+
+    def _value(self, veh_id: str, var_id: int):
+        sim = self._sim
+        i = sim.vehicle_index[veh_id]
+        if var_id == tc.VAR_SPEED:
+            return float(sim.speed[i])
+        if var_id == tc.VAR_WAITING_TIME:
+            return float(sim.waiting[i])
+        if var_id == tc.VAR_STOPSTATE:
+            return 0
+        if var_id == tc.VAR_LANE_ID:
+            return sim.network.lane_ids[sim.vehicle_lane[i]] if sim.vehicle_lane[i] >= 0 else ''
+        raise KeyError(var_id)
+
+    def getIDList(self):
+        self._call('getIDList')
+        return tuple(self._sim.vehicle_ids[i] for i in np.flatnonzero(self._sim.status == RUNNING))
+
+    def getIDCount(self) -> int:
+        self._call('getIDCount')
+        return int(np.count_nonzero(self._sim.status == RUNNING))
+
+    def getSpeed(self, veh_id: str) -> float:
+        self._call('getSpeed')
+        return self._value(veh_id, tc.VAR_SPEED)
+
+    def getWaitingTime(self, veh_id: str) -> float:
+        self._call('getWaitingTime')
+        return self._value(veh_id, tc.VAR_WAITING_TIME)
+
+    def getStopState(self, veh_id: str) -> int:
+        self._call('getStopState')
+        return self._value(veh_id, tc.VAR_STOPSTATE)
+
+    def getLaneID(self, veh_id: str) -> str:
+        self._call('getLaneID')
+        return self._value(veh_id, tc.VAR_LANE_ID)
+
+class _QueueSimulationDomain(Domain):
+    name = 'simulation'
+
+    def _value(self, object_id: str, var_id: int):
+        if var_id == tc.VAR_TIME:
+            return self._sim.time
+        if var_id == tc.VAR_DEPARTED_VEHICLES_IDS:
+            return tuple(self._sim.departed)
+        if var_id == tc.VAR_ARRIVED_VEHICLES_IDS:
+            return tuple(self._sim.arrived)
+        raise KeyError(var_id)
+
+    def subscribe(self, var_ids=(tc.VAR_TIME,), begin=None, end=None) -> None:
+        super().subscribe('', var_ids)
+
+    def getSubscriptionResults(self, object_id: str = '') -> Dict[int, object]:
+        return super().getSubscriptionResults(object_id)
+
+    def getTime(self) -> float:
+        self._call('getTime')
+        return self._sim.time
+
+    def getMinExpectedNumber(self) -> int:
+        self._call('getMinExpectedNumber')
+        return int(np.count_nonzero(self._sim.status != ARRIVED))
+
+    def saveState(self, filename: str) -> None:
+        self._call('saveState')
+        self._sim.saved_states[filename] = self._sim._state()
+
+    def loadState(self, filename: str) -> None:
+        self._call('loadState')
+        self._sim._restore(self._sim.saved_states[filename])
+
+class _QueueTrafficLightDomain(Domain):
+    name = 'trafficlight'
+
+    def _index(self, tl_id: str) -> int:
+        if tl_id not in self._sim.network.tl_index:
+            raise traci.TraCIException(f"Traffic light '{tl_id}' is not known")
+        return self._sim.network.tl_index[tl_id]
+
+    def _state(self, t: int) -> str:
+        phases = self._sim.network.tl_phases[t]
+        return phases[self._sim.tl_phase[t]][1] if phases else ''
+
+    def _value(self, tl_id: str, var_id: int):
+        t = self._index(tl_id)
+        if var_id == tc.TL_CURRENT_PHASE:
+            return int(self._sim.tl_phase[t])
+        if var_id == tc.TL_RED_YELLOW_GREEN_STATE:
+            return self._state(t)
+        raise KeyError(var_id)
+
+    def getIDList(self):
+        self._call('getIDList')
+        return tuple(self._sim.network.tl_ids)
+
+    def getControlledLanes(self, tl_id: str):
+        self._call('getControlledLanes')
+        self._index(tl_id)
+        return tuple(self._sim.network.link_lanes(tl_id))
+
+    def getControlledLinks(self, tl_id: str):
+        self._call('getControlledLinks')
+        self._index(tl_id)
+        links = self._sim.network.tl_links[tl_id]
+        return [[(links[i][0], links[i][1], '')] if i in links else []
+                for i in range(self._sim.network.n_links[tl_id])]
+
+    def getAllProgramLogics(self, tl_id: str):
+        self._call('getAllProgramLogics')
+        phases = [SimpleNamespace(duration=duration, state=state, minDur=duration, maxDur=duration)
+                  for duration, state in self._sim.network.tl_phases[self._index(tl_id)]]
+        return [SimpleNamespace(programID='0', type=0, currentPhaseIndex=0, phases=phases)]
+
+    def getPhase(self, tl_id: str) -> int:
+        self._call('getPhase')
+        return int(self._sim.tl_phase[self._index(tl_id)])
+
+    def getRedYellowGreenState(self, tl_id: str) -> str:
+        self._call('getRedYellowGreenState')
+        return self._state(self._index(tl_id))
+
+    def setPhase(self, tl_id: str, phase: int) -> None:
+        """Kao u SUMO-u: faza počinje ispočetka i traje svoje trajanje iz programa"""
+        self._call('setPhase')
+        sim, t = self._sim, self._index(tl_id)
+        if not 0 <= phase < sim.network.tl_n_phases[t]:
+            raise traci.TraCIException(f"The phase index {phase} is not in the allowed range")
+        sim.tl_phase[t] = phase
+        sim.tl_remaining[t] = sim.network.phase_duration[sim.network.tl_phase_offset[t] + phase]
+
+class QueueSimulator:
+    """
+    Vektorizirani simulator s modelom točkastog reda i sučeljem traci modula.
+
+    Primjer:
+        sim = QueueSimulator("Input/osm.net.xml", "Input/osm.passenger.trips.xml")
+        observer = SubscriptionObserver(lanes, connection=sim)
+        sim.simulationStep()
+    """
+
+    def __init__(self, net_file: str, trips_file: str, headway: float = 2.0):
+        """
+        Args:
+            net_file: Putanja do SUMO mrežne datoteke
+            trips_file: Putanja do datoteke s rutama vozila (trip ili vehicle s route edges)
+            headway: Razmak zasićenja u sekundama (najviše jedno vozilo po traci u tom vremenu)
+        """
+        self.network = QueueNetwork(net_file)
+        self.headway = headway
+        self._load_demand(trips_file)
+
+        n_lanes = len(self.network.lane_ids)
+        self.lane_count = np.zeros(n_lanes, dtype=np.int64)
+        self.lane_halting = np.zeros(n_lanes, dtype=np.int64)
+        self.lane_mean_speed = self.network.lane_speed.copy()
+        self.saved_states: Dict[str, dict] = {}
+        self.calls = Counter()
+        self.local_calls = Counter()
+
+        self.lane = _QueueLaneDomain(self)
+        self.vehicle = _QueueVehicleDomain(self)
+        self.simulation = _QueueSimulationDomain(self)
+        self.trafficlight = _QueueTrafficLightDomain(self)
+        self._domains = [self.lane, self.vehicle, self.simulation, self.trafficlight]
+        self._restore(self._initial_state())
+
+    def _load_demand(self, trips_file: str) -> None:
+        """Učitava vozila (redom polaska) i njihove rute kao ravna polja traka i veza"""
+        demand = []
+        skipped = 0
+        for _, elem in ET.iterparse(trips_file, events=('end',)):
+            if elem.tag not in ('trip', 'vehicle'):
+                continue
+            try:
+                depart = float(elem.get('depart', 0))
+            except ValueError:
+                depart = None
+            if elem.tag == 'trip':
+                edges = self.network.route(elem.get('from'), elem.get('to'))
+            else:
+                route = elem.find('route')
+                edges = route.get('edges', '').split() if route is not None else None
+            path = self.network.lane_path(edges, len(demand)) if edges and depart is not None else None
+            if path is None:
+                skipped += 1
+            else:
+                demand.append((depart, elem.get('id'), path))
+            elem.clear()
+        if skipped:
+            print(f"Upozorenje: {skipped} vozila bez rute u modelu reda se preskače")
+
+        demand.sort(key=lambda item: item[0])
+        self.vehicle_ids = [veh_id for _, veh_id, _ in demand]
+        self.vehicle_index = {veh_id: i for i, veh_id in enumerate(self.vehicle_ids)}
+        self.depart = np.array([depart for depart, _, _ in demand], dtype=np.float64)
+        lengths = np.array([len(path[0]) for _, _, path in demand], dtype=np.int64)
+        self.route_offset = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        self.route_lanes = np.array([lane for _, _, path in demand for lane in path[0]], dtype=np.int64)
+        self.route_links = np.array([link for _, _, path in demand for link in path[1]], dtype=np.int64)
+
+    def _initial_state(self) -> dict:
+        n = len(self.vehicle_ids)
+        n_tl = len(self.network.tl_ids)
+        phase = np.zeros(n_tl, dtype=np.int64)
+        return {
+            'time': 0.0,
+            'status': np.full(n, PENDING, dtype=np.int8),
+            'position': np.full(n, -1, dtype=np.int64),
+            'vehicle_lane': np.full(n, -1, dtype=np.int64),
+            'distance': np.zeros(n, dtype=np.float64),
+            'speed': np.zeros(n, dtype=np.float64),
+            'waiting': np.zeros(n, dtype=np.float64),
+            'queued_since': np.full(n, np.inf, dtype=np.float64),
+            'lane_release': np.zeros(len(self.network.lane_ids), dtype=np.float64),
+            'tl_phase': phase,
+            'tl_remaining': self.network.phase_duration[self.network.tl_phase_offset + phase]
+                            if n_tl else np.zeros(0, dtype=np.float64),
+            'first_pending': 0
+        }
+
+    def _state(self) -> dict:
+        return {field: _copy(getattr(self, field)) for field in STATE_FIELDS}
+
+    def _restore(self, state: dict) -> None:
+        """Kao loadState u SUMO-u: vraća stanje i briše pretplate na vozila"""
+        for field in STATE_FIELDS:
+            setattr(self, field, _copy(state[field]))
+        self.departed: List[str] = []
+        self.arrived: List[str] = []
+        self._aggregate()
+        self.vehicle._subscriptions.clear()
+        for domain in self._domains:
+            domain._refresh()
+
+    def _lane_counts(self, running: np.ndarray) -> np.ndarray:
+        return np.bincount(self.vehicle_lane[running], minlength=len(self.network.lane_ids))
+
+    def _insert(self) -> None:
+        """Ulazak vozila čiji je polazak došao (jedno po traci po koraku, ako ima mjesta)"""
+        upto = int(np.searchsorted(self.depart, self.time, side='right'))
+        pending = self.first_pending + np.flatnonzero(self.status[self.first_pending:upto] == PENDING)
+        if not pending.size:
+            return
+        self.first_pending = int(pending[0])
+        lanes = self.route_lanes[self.route_offset[pending]]
+        _, first = np.unique(lanes, return_index=True)
+        counts = self._lane_counts(np.flatnonzero(self.status == RUNNING))
+        first = first[counts[lanes[first]] < self.network.lane_capacity[lanes[first]]]
+        inserted, lanes = pending[first], lanes[first]
+
+        self.status[inserted] = RUNNING
+        self.position[inserted] = self.route_offset[inserted]
+        self.vehicle_lane[inserted] = lanes
+        self.distance[inserted] = 0.0
+        self.speed[inserted] = self.network.lane_speed[lanes]
+        self.waiting[inserted] = 0.0
+        self.queued_since[inserted] = np.inf
+        self.departed.extend(self.vehicle_ids[i] for i in inserted)
+
+    def _discharge(self, running: np.ndarray) -> None:
+        """Prvo vozilo u redu svake trake prelazi na sljedeću traku ili izlazi iz mreže"""
+        network = self.network
+        queued = running[self.queued_since[running] < np.inf]
+        if not queued.size:
+            return
+        order = np.lexsort((self.queued_since[queued], self.vehicle_lane[queued]))
+        queued = queued[order]
+        _, first = np.unique(self.vehicle_lane[queued], return_index=True)
+        heads = queued[first]
+        lanes = self.vehicle_lane[heads]
+        links = self.route_links[self.position[heads]]
+
+        green = np.ones(len(heads), dtype=bool)
+        controlled = links >= 0
+        if controlled.any():
+            link = links[controlled]
+            green[controlled] = network.green_flat[
+                network.link_base[link] + self.tl_phase[network.link_tl[link]] * network.link_stride[link]]
+        exiting = links == EXIT_LINK
+        next_position = np.where(exiting, self.position[heads], self.position[heads] + 1)
+        next_lanes = self.route_lanes[next_position]
+        space = exiting | (self._lane_counts(running)[next_lanes] < network.lane_capacity[next_lanes])
+        go = green & space & (self.lane_release[lanes] <= self.time)
+        self.lane_release[lanes[go]] = self.time + self.headway
+
+        arrived = heads[go & exiting]
+        self.status[arrived] = ARRIVED
+        self.vehicle_lane[arrived] = -1
+        self.speed[arrived] = 0.0
+        self.arrived.extend(self.vehicle_ids[i] for i in arrived)
+
+        moved = go & ~exiting
+        movers = heads[moved]
+        self.position[movers] = next_position[moved]
+        self.vehicle_lane[movers] = next_lanes[moved]
+        self.distance[movers] = 0.0
+        self.queued_since[movers] = np.inf
+        self.waiting[movers] = 0.0
+
+    def _advance_lights(self) -> None:
+        """Program semafora: faza se mijenja kad istekne njezino trajanje"""
+        if not len(self.tl_phase):
+            return
+        network = self.network
+        self.tl_remaining -= STEP_LENGTH
+        switch = self.tl_remaining <= 0
+        if switch.any():
+            self.tl_phase[switch] = (self.tl_phase[switch] + 1) % network.tl_n_phases[switch]
+            self.tl_remaining[switch] = network.phase_duration[network.tl_phase_offset[switch] + self.tl_phase[switch]]
+
+    def _step(self) -> None:
+        """Jedan korak modela (STEP_LENGTH sekundi)"""
+        network = self.network
+        self.time += STEP_LENGTH
+        self._insert()
+
+        # Vožnja slobodnom brzinom do zaustavne crte, gdje vozilo ulazi u red
+        running = np.flatnonzero(self.status == RUNNING)
+        free = running[self.queued_since[running] == np.inf]
+        lanes = self.vehicle_lane[free]
+        self.distance[free] += network.lane_speed[lanes] * STEP_LENGTH
+        reached = free[self.distance[free] >= network.lane_length[lanes]]
+        self.distance[reached] = network.lane_length[self.vehicle_lane[reached]]
+        self.queued_since[reached] = self.time
+
+        self._discharge(running)
+
+        # Vozila u redu stoje i čekaju, ostala voze brzinom trake
+        running = np.flatnonzero(self.status == RUNNING)
+        queued = self.queued_since[running] < np.inf
+        self.speed[running] = np.where(queued, 0.0, network.lane_speed[self.vehicle_lane[running]])
+        self.waiting[running] = np.where(queued, self.waiting[running] + STEP_LENGTH, 0.0)
+        self._advance_lights()
+
+    def _aggregate(self) -> None:
+        """Agregati po trakama za pretplate i upite"""
+        running = np.flatnonzero(self.status == RUNNING)
+        n_lanes = len(self.network.lane_ids)
+        lanes = self.vehicle_lane[running]
+        self.lane_count = np.bincount(lanes, minlength=n_lanes)
+        self.lane_halting = np.bincount(lanes, weights=self.speed[running] < STOPPED_SPEED,
+                                        minlength=n_lanes).astype(np.int64)
+        speed_sum = np.bincount(lanes, weights=self.speed[running], minlength=n_lanes)
+        self.lane_mean_speed = np.where(self.lane_count > 0, speed_sum / np.maximum(self.lane_count, 1),
+                                        self.network.lane_speed)
+
+    def simulationStep(self, time: float = 0.0) -> None:
+        """Napreduje do zadanog vremena (ili jedan korak); ulasci i izlasci se skupljaju"""
+        self.calls['simulationStep'] += 1
+        self.departed, self.arrived = [], []
+        target = max(self.time + STEP_LENGTH, float(time))
+        while self.time < target - 1e-9:
+            self._step()
+        self._aggregate()
+        for domain in self._domains:
+            domain._refresh()
+
+    def round_trips(self) -> int:
+        """Ukupan broj poziva (kao TraCI round-tripovi)"""
+        return sum(self.calls.values())
+
+    def reset_counters(self) -> None:
+        self.calls.clear()
+        self.local_calls.clear()
+
+    def close(self) -> None:
+        self.calls['close'] += 1
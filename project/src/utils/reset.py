@@ -0,0 +1,185 @@
+import os
+import shutil
+import tempfile
+import time
+from typing import List, Optional
+from .sumo_utils import initialize_simulation, close_simulation, get_backend
+
+# Načini resetiranja epizode:
+# 'load_state' - loadState iz stanja spremljenog jednom po pokretanju
+# 'restart'    - zatvaranje i ponovno pokretanje SUMO-a (traci.start)
+# 'auto'       - loadState dok je brži od ponovnog pokretanja, inače restart
+RESET_MODES = ('load_state', 'restart', 'auto')
+
+class EpisodeResetManager:
+    """
+    Resetiranje simulacije između epizoda.
+
+    Početno stanje se sprema jednom po pokretanju u vlastiti privremeni
+    direktorij (binarni .sbx format gdje ga SUMO podržava, inače .xml),
+    pa paralelna pokretanja ne dijele datoteku. Mjeri se trajanje svakog
+    resetiranja i pokretanja SUMO-a, a u načinu 'auto' se prelazi na
+    ponovno pokretanje ako je ono brže od učitavanja stanja.
+
+    Primjer:
+        resets = EpisodeResetManager(net_file, trips_file)
+        traci = resets.start()
+        for episode in range(episodes):
+            resets.reset(observer)
+            ...
+        resets.close()
+    """
+
+    def __init__(self, net_file: str, trips_file: str, mode: str = 'auto',
+                 label: Optional[str] = None, backend: Optional[str] = None,
+                 port: Optional[int] = None):
+        """
+        Args:
+            net_file: Putanja do SUMO mrežne datoteke
+            trips_file: Putanja do datoteke s rutama vozila
+            mode: Način resetiranja (vidi RESET_MODES)
+            label: Oznaka TraCI konekcije (za paralelna pokretanja)
+            backend: Pozadina simulatora (vidi utils.backend.BACKENDS)
+            port: TCP port za TraCI (ako nije zadan, traci bira slobodan port)
+        """
+        if mode not in RESET_MODES:
+            raise ValueError(f"Nepoznat način resetiranja: {mode}")
+        self.net_file = net_file
+        self.trips_file = trips_file
+        self.mode = mode
+        self.label = label
+        self.backend = backend
+        self.port = port
+        self.connection = None
+        # Pozadina koju je pokrenuo ovaj upravitelj (njezina iznimka za neuspjele naredbe)
+        self.simulator = None
+        self.state_dir: Optional[str] = None
+        self.state_file: Optional[str] = None
+        self.start_latencies: List[float] = []
+        self.reset_latencies: List[float] = []
+        self._fresh = False
+        self._reload = False
+
+    def _start_sumo(self):
+        """Pokreće SUMO i mjeri trajanje pokretanja"""
+        start = time.perf_counter()
+        self.connection = initialize_simulation(self.net_file, self.trips_file, label=self.label,
+                                                port=self.port, backend=self.backend)
+        self.simulator = get_backend()
+        self.start_latencies.append(time.perf_counter() - start)
+        self._fresh = True
+        return self.connection
+
+    def _save_state(self) -> None:
+        """Sprema početno stanje u privremeni direktorij ovog pokretanja"""
+        if self.state_dir is not None:
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+        self.state_dir = tempfile.mkdtemp(prefix="sumo_state_")
+        for extension in ('.sbx', '.xml'):
+            path = os.path.join(self.state_dir, f"initial_state{extension}")
+            try:
+                self.connection.simulation.saveState(path)
+                self.state_file = path
+                return
+            except self.simulator.error:
+                # Starije/novije inačice SUMO-a nemaju binarni format
+                continue
+        raise RuntimeError("Nije moguće spremiti početno stanje simulacije")
+
+    def start(self):
+        """Pokreće simulaciju i sprema početno stanje (osim u načinu 'restart')"""
+        self._start_sumo()
+        if self.mode != 'restart':
+            self._save_state()
+        return self.connection
+
+    def reset(self, observer=None) -> float:
+        """
+        Vraća simulaciju u početno stanje.
+        Odmah nakon pokretanja simulacija je već u početnom stanju, pa se
+        prvo resetiranje preskače.
+
+        Args:
+            observer: Opažač čije se pretplate osvježavaju nakon resetiranja
+
+        Returns:
+            Trajanje resetiranja u sekundama (0 ako je preskočeno)
+        """
+        if self._fresh:
+            self._fresh = False
+            if observer is not None:
+                observer.reset()
+            return 0.0
+
+        start = time.perf_counter()
+        if self._reload:
+            # Nova datoteka ruta: ponovno pokretanje i novo početno stanje
+            self._reload = False
+            close_simulation()
+            self._start_sumo()
+            self._fresh = False
+            if self.mode != 'restart':
+                self._save_state()
+        elif self.mode == 'restart':
+            close_simulation()
+            self._start_sumo()
+            self._fresh = False
+        else:
+            self.connection.simulation.loadState(self.state_file)
+            latency = time.perf_counter() - start
+            # Ponovno pokretanje je brže od učitavanja stanja
+            if self.mode == 'auto' and latency > min(self.start_latencies):
+                print(f"Resetiranje: loadState ({latency * 1000:.1f} ms) sporiji od "
+                      f"pokretanja ({min(self.start_latencies) * 1000:.1f} ms), prelazim na restart")
+                self.mode = 'restart'
+
+        if observer is not None:
+            # Ponovno pokretanje može dati novu konekciju (pozadine osim traci)
+            observer.connection = self.connection
+            observer.reset()
+        latency = time.perf_counter() - start
+        self.reset_latencies.append(latency)
+        return latency
+
+    def set_trips_file(self, trips_file: str) -> None:
+        """
+        Mijenja datoteku ruta (npr. vremenski prozor potražnje); sljedeće
+        resetiranje ponovno pokreće simulaciju s njom i sprema novo početno
+        stanje. loadState tu ne pomaže: spremljeno stanje sadrži samo vozila
+        koja su već krenula, a buduće polaske SUMO čita iz datoteke ruta
+        zadane pri pokretanju. Ista datoteka ne uzrokuje ponovno pokretanje.
+        """
+        if trips_file != self.trips_file:
+            self.trips_file = trips_file
+            self._reload = True
+            self._fresh = False
+
+    def invalidate(self) -> None:
+        """
+        Simulacija je napredovala izvan epizode (npr. kalibracijski prolaz),
+        pa se sljedeće resetiranje ne smije preskočiti.
+        """
+        self._fresh = False
+
+    @property
+    def mean_reset_latency(self) -> float:
+        """Prosječno trajanje resetiranja u sekundama"""
+        if not self.reset_latencies:
+            return 0.0
+        return sum(self.reset_latencies) / len(self.reset_latencies)
+
+    def print_summary(self) -> None:
+        """Ispisuje trajanje resetiranja i pokretanja"""
+        print(f"Resetiranje ({self.mode}): {len(self.reset_latencies)} puta, "
+              f"prosječno {self.mean_reset_latency * 1000:.1f} ms; "
+              f"pokretanje SUMO-a: {min(self.start_latencies, default=0.0) * 1000:.1f} ms")
+
+    def close(self) -> None:
+        """Zatvara simulaciju i briše spremljeno stanje"""
+        if self.connection is not None:
+            close_simulation()
+            self.connection = None
+        if self.state_dir is not None:
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+            self.state_dir = None
+            self.state_file = None
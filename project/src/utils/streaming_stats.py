@@ -0,0 +1,186 @@
+import math
+import os
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+# Kvantili koji se prate za svaku metriku
+DEFAULT_QUANTILES = (0.5, 0.95)
+
+class P2Quantile:
+    """
+    Procjena kvantila P² algoritmom (Jain i Chlamtac, 1985).
+    Pamti samo pet markera, pa memorija ne ovisi o broju vrijednosti.
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self.n = 0
+        self.heights = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1.0 + 2 * p, 1.0 + 4 * p, 3.0 + 2 * p, 5.0]
+        self.increments = [0.0, p / 2, p, (1.0 + p) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        """Dodaje vrijednost"""
+        q = self.heights
+        self.n += 1
+        if self.n <= 5:
+            q.append(x)
+            if self.n == 5:
+                q.sort()
+            return
+
+        # Ćelija u koju vrijednost pada (rubni markeri se pomiču na min/max)
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Prilagodba tri srednja markera (parabolično, inače linearno)
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        """Trenutna procjena kvantila"""
+        if self.n == 0:
+            return math.nan
+        if self.n < 5:
+            ordered = sorted(self.heights)
+            return ordered[min(len(ordered) - 1, int(round(self.p * (len(ordered) - 1))))]
+        return self.heights[2]
+
+class RunningStat:
+    """
+    Statistika jedne metrike u jednom prolazu: broj, zbroj, Welfordova
+    sredina i varijanca, min, max, zadnja vrijednost i P² kvantili.
+    """
+
+    def __init__(self, quantiles: Sequence[float] = DEFAULT_QUANTILES):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = math.nan
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def add(self, x: float) -> None:
+        """Dodaje vrijednost"""
+        self.count += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        self.last = x
+        for estimator in self.quantiles.values():
+            estimator.add(x)
+
+    @property
+    def variance(self) -> float:
+        """Uzoračka varijanca"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, p: float) -> float:
+        """Procjena kvantila p (mora biti među praćenim kvantilima)"""
+        return self.quantiles[p].value
+
+    def summary(self) -> Dict[str, float]:
+        """Sažetak kao rječnik"""
+        result = {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.mean if self.count else math.nan,
+            'std': self.std,
+            'min': self.min if self.count else math.nan,
+            'max': self.max if self.count else math.nan
+        }
+        for p, estimator in self.quantiles.items():
+            result[f"p{int(round(p * 100))}"] = estimator.value
+        return result
+
+class SeriesRing:
+    """
+    Unaprijed alocirani NumPy prsten za zadnjih `capacity` redaka sirovih
+    vrijednosti. Ako je zadana datoteka, svaki puni prsten se dodaje na
+    kraj datoteke (float64 retci), pa je cijela serija dostupna preko
+    load_series bez držanja u memoriji.
+    """
+
+    def __init__(self, capacity: int, width: int, spill_path: Optional[str] = None):
+        self.capacity = capacity
+        self.width = width
+        self.values = np.zeros((capacity, width), dtype=np.float64)
+        self.position = 0
+        self.size = 0
+        self.spill_path = spill_path
+        self._unspilled = 0
+        if spill_path is not None:
+            open(spill_path, 'wb').close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row: Sequence[float]) -> None:
+        """Dodaje redak (prepisuje najstariji kad je prsten pun)"""
+        self.values[self.position] = row
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._unspilled += 1
+        if self.spill_path is not None and self._unspilled == self.capacity:
+            self.flush()
+
+    def flush(self) -> None:
+        """Zapisuje još nezapisane retke u datoteku"""
+        if self.spill_path is None or not self._unspilled:
+            return
+        with open(self.spill_path, 'ab') as f:
+            self._ordered(self._unspilled).tofile(f)
+        self._unspilled = 0
+
+    def _ordered(self, n: int) -> np.ndarray:
+        """Zadnjih n redaka redom dodavanja"""
+        idx = (self.position - n + np.arange(n)) % self.capacity
+        return self.values[idx]
+
+    def array(self) -> np.ndarray:
+        """Retci u prstenu redom dodavanja"""
+        return self._ordered(self.size)
+
+def load_series(path: str, width: int, mmap: bool = True) -> np.ndarray:
+    """Učitava seriju koju je SeriesRing zapisao u datoteku"""
+    if os.path.getsize(path) == 0:
+        return np.zeros((0, width), dtype=np.float64)
+    if mmap:
+        return np.memmap(path, dtype=np.float64, mode='r').reshape(-1, width)
+    return np.fromfile(path, dtype=np.float64).reshape(-1, width)
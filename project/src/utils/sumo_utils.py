@@ -1,73 +1,127 @@
 import traci
+import numpy as np
+import traci.constants as tc
 import xml.etree.ElementTree as ET
 import os
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from .observation import VehicleData, StepSnapshot, VEHICLE_VARIABLES
+from .backend import SimulatorBackend, create_backend
+from .trips import load_trips_index
 
-def initialize_simulation(net_file: str, trips_file: str) -> None:
-    """Inicijalizira SUMO simulaciju s datim mrežom i rutama"""
+# Pozadina pokrenute simulacije (koriste je funkcije iz ovog modula)
+_backend: Optional[SimulatorBackend] = None
+
+def initialize_simulation(net_file: str, trips_file: str, label: Optional[str] = None,
+                          port: Optional[int] = None, backend: Optional[str] = None):
+    """
+    Inicijalizira SUMO simulaciju s datim mrežom i rutama.
+    
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        trips_file: Putanja do datoteke s rutama vozila
+        label: Oznaka TraCI konekcije (za više simulacija istovremeno)
+        port: TCP port za TraCI (ako nije zadan, traci bira slobodan port)
+        backend: Pozadina simulatora ('traci', 'libsumo', 'fake', 'queue'; default: SUMO_BACKEND ili 'traci')
+    
+    Returns:
+        Konekcija sa sučeljem traci modula
+    """
+    global _backend
     sumo_cmd = ["sumo", "-n", net_file, "--route-files", trips_file, "--quit-on-end", "--ignore-route-errors", "--no-warnings"]
-    traci.start(sumo_cmd)
-    return traci
+    simulator = create_backend(backend)
+    connection = simulator.start(sumo_cmd, net_file, trips_file, label=label, port=port)
+    _backend = simulator
+    return connection
+
+def get_backend() -> Optional[SimulatorBackend]:
+    """Pozadina pokrenute simulacije (None ako simulacija nije pokrenuta)"""
+    return _backend
+
+def _connection():
+    """Konekcija pokrenute simulacije (globalni traci ako nije pokrenuta ovdje)"""
+    return _backend.connection if _backend is not None and _backend.connection is not None else traci
 
 def load_trips(trips_file: str) -> int:
-    """Učitava rute iz trips datoteke i vraća broj vozila"""
-    tree = ET.parse(trips_file)
-    root = tree.getroot()
-    return len(root.findall('.//trip'))
+    """Vraća broj vozila u trips datoteci (iz indeksa, vidi utils.trips)"""
+    return load_trips_index(trips_file).count
 
 def get_traffic_lights() -> List[str]:
     """Dohvaća listu ID-ova svih semafora u mreži"""
-    return traci.trafficlight.getIDList()
+    return _connection().trafficlight.getIDList()
 
 def get_traffic_light_phases(tl_id: str) -> List[str]:
     """Dohvaća sve faze za zadani semafor"""
-    return traci.trafficlight.getAllProgramLogics(tl_id)[0].phases
+    return _connection().trafficlight.getAllProgramLogics(tl_id)[0].phases
 
 def save_network_state(filename: str = "initial_state.xml") -> None:
     """Sprema početno stanje mreže"""
-    traci.simulation.saveState(filename)
+    _connection().simulation.saveState(filename)
 
 def load_network_state(filename: str = "initial_state.xml") -> None:
     """Učitava početno stanje mreže"""
-    traci.simulation.loadState(filename)
+    _connection().simulation.loadState(filename)
 
 def get_vehicle_count() -> int:
     """Dohvaća broj aktivnih vozila u simulaciji"""
-    return traci.vehicle.getIDCount()
+    return _connection().vehicle.getIDCount()
 
 def get_waiting_vehicles(lane_id: str) -> int:
     """Dohvaća broj vozila koja čekaju na zadanoj traci"""
-    return traci.lane.getLastStepHaltingNumber(lane_id)
+    return _connection().lane.getLastStepHaltingNumber(lane_id)
 
 def get_controlled_lanes(tl_id: str) -> List[str]:
     """Dohvaća listu traka koje kontrolira zadani semafor"""
-    return traci.trafficlight.getControlledLanes(tl_id)
+    return _connection().trafficlight.getControlledLanes(tl_id)
 
 def set_traffic_light_phase(tl_id: str, phase: int) -> None:
     """Postavlja fazu semafora"""
-    traci.trafficlight.setPhase(tl_id, phase)
+    _connection().trafficlight.setPhase(tl_id, phase)
 
 def simulation_step() -> None:
     """Napravi jedan korak simulacije"""
-    traci.simulationStep()
+    _connection().simulationStep()
 
 def close_simulation() -> None:
     """Zatvori SUMO simulaciju"""
-    traci.close()
+    global _backend
+    if _backend is None:
+        traci.close()
+        return
+    _backend.close()
+    _backend = None
 
-def get_vehicle_data() -> Dict[str, Dict[str, float]]:
+def get_vehicle_data(snapshot: Optional[StepSnapshot] = None, connection=None) -> VehicleData:
     """
-    Dohvaća podatke o svim vozilima u simulaciji.
+    Dohvaća podatke o svim vozilima u simulaciji kao polja.
+    
+    Ako je zadana snimka opažača, podaci se uzimaju iz nje bez TraCI
+    poziva. Inače se na svako vozilo pretplaćuje jednom (kad se prvi put
+    pojavi), a vrijednosti se čitaju iz rezultata pretplata, pa po koraku
+    ostaje jedan poziv (getIDList) umjesto tri po vozilu.
+    
+    Args:
+        snapshot: Snimka koraka (SubscriptionObserver)
+        connection: TraCI konekcija (default: konekcija pokrenute simulacije)
     
     Returns:
-        Rječnik s ID-ovima vozila kao ključevima i njihovim podacima kao vrijednostima.
-        Podaci uključuju: vrijeme čekanja, brzinu i broj zaustavljanja.
+        VehicleData s poljima ids, waiting (vrijeme čekanja), speed (brzina)
+        i stops (stanje zaustavljanja)
     """
-    vehicle_data = {}
-    for veh_id in traci.vehicle.getIDList():
-        vehicle_data[veh_id] = {
-            'waiting_time': traci.vehicle.getWaitingTime(veh_id),
-            'speed': traci.vehicle.getSpeed(veh_id),
-            'stops': traci.vehicle.getStopState(veh_id)
-        }
-    return vehicle_data 
\ No newline at end of file
+    if snapshot is not None:
+        return snapshot.vehicle_data()
+    
+    connection = connection or _connection()
+    results = connection.vehicle.getAllSubscriptionResults()
+    ids = list(connection.vehicle.getIDList())
+    for veh_id in ids:
+        if veh_id not in results:
+            connection.vehicle.subscribe(veh_id, VEHICLE_VARIABLES)
+            results[veh_id] = connection.vehicle.getSubscriptionResults(veh_id)
+    
+    values = [results[veh_id] for veh_id in ids]
+    return VehicleData(
+        ids,
+        np.fromiter((v.get(tc.VAR_WAITING_TIME, 0.0) for v in values), dtype=np.float64, count=len(ids)),
+        np.fromiter((v.get(tc.VAR_SPEED, 0.0) for v in values), dtype=np.float64, count=len(ids)),
+        np.fromiter((v.get(tc.VAR_STOPSTATE, 0) for v in values), dtype=np.int64, count=len(ids))
+    ) 
\ No newline at end of file
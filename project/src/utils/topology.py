@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import numpy as np
+import traci
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+# Inačica formata predmemorije (povećati kad se promijeni struktura)
+CACHE_VERSION = 1
+
+class JunctionTopology:
+    """
+    Statička topologija jednog semafora.
+
+    Atributi:
+        tl_id: ID semafora
+        link_lanes: Ulazna traka za svaki indeks veze (signal link)
+        lanes: Jedinstvene ulazne trake, redom prvog pojavljivanja
+        lane_links: Traka -> indeksi veza koje kontrolira
+        phase_states: Niz stanja signala ('GrGr...') za svaku fazu
+        green_mask: Bool matrica [faze, trake], True ako traka ima zeleno u fazi
+    """
+
+    def __init__(self, tl_id: str, link_lanes: List[str], phase_states: List[str]):
+        self.tl_id = tl_id
+        self.link_lanes = list(link_lanes)
+        self.phase_states = list(phase_states)
+        self.lanes = [lane for lane in dict.fromkeys(self.link_lanes) if lane]
+
+        self.lane_links: Dict[str, List[int]] = {lane: [] for lane in self.lanes}
+        for link_index, lane in enumerate(self.link_lanes):
+            if lane:
+                self.lane_links[lane].append(link_index)
+
+        self.green_mask = np.zeros((len(self.phase_states), len(self.lanes)), dtype=bool)
+        for p, state in enumerate(self.phase_states):
+            for i, lane in enumerate(self.lanes):
+                self.green_mask[p, i] = any(
+                    link < len(state) and state[link] in 'Gg' for link in self.lane_links[lane])
+
+    @property
+    def n_phases(self) -> int:
+        return len(self.phase_states)
+
+    def to_dict(self) -> Dict:
+        return {'link_lanes': self.link_lanes, 'phase_states': self.phase_states}
+
+class TopologyIndex:
+    """
+    Indeks topologije mreže: semafor -> jedinstvene ulazne trake -> indeksi
+    veza -> maske zelenog po fazi, te traka -> semafori.
+    Gradi se jednom (iz mrežne datoteke ili preko TraCI-ja) umjesto
+    ponovljenih getControlledLanes / getAllProgramLogics poziva.
+    """
+
+    def __init__(self, junctions: Dict[str, JunctionTopology]):
+        self.junctions = junctions
+        self.lane_junctions: Dict[str, List[str]] = {}
+        for tl_id, junction in junctions.items():
+            for lane in junction.lanes:
+                self.lane_junctions.setdefault(lane, []).append(tl_id)
+
+    @property
+    def traffic_lights(self) -> List[str]:
+        """ID-ovi svih semafora"""
+        return list(self.junctions)
+
+    def lanes(self, tl_id: str) -> List[str]:
+        """Jedinstvene ulazne trake semafora"""
+        return self.junctions[tl_id].lanes
+
+    def phases(self, tl_id: str) -> List[str]:
+        """Stanja signala za sve faze semafora"""
+        return self.junctions[tl_id].phase_states
+
+    def green_mask(self, tl_id: str) -> np.ndarray:
+        """Maska zelenog [faze, trake] za semafor"""
+        return self.junctions[tl_id].green_mask
+
+    @classmethod
+    def from_net_file(cls, net_file: str) -> 'TopologyIndex':
+        """Gradi indeks iz SUMO mrežne datoteke (jedan prolaz kroz XML)"""
+        link_lanes: Dict[str, Dict[int, str]] = {}
+        phase_states: Dict[str, List[str]] = {}
+
+        for _, elem in ET.iterparse(net_file, events=('end',)):
+            if elem.tag == 'tlLogic':
+                tl_id = elem.get('id')
+                # Kao getAllProgramLogics(tl_id)[0]: prvi program semafora
+                if tl_id not in phase_states:
+                    phase_states[tl_id] = [phase.get('state', '') for phase in elem.findall('phase')]
+                elem.clear()
+            elif elem.tag == 'connection':
+                tl_id = elem.get('tl')
+                if tl_id is not None and elem.get('linkIndex') is not None:
+                    lane = f"{elem.get('from')}_{elem.get('fromLane')}"
+                    link_lanes.setdefault(tl_id, {})[int(elem.get('linkIndex'))] = lane
+                elem.clear()
+            elif elem.tag in ('edge', 'junction'):
+                elem.clear()
+
+        junctions = {}
+        for tl_id, states in phase_states.items():
+            links = link_lanes.get(tl_id, {})
+            ordered = [links.get(i, '') for i in range(max(links) + 1)] if links else []
+            junctions[tl_id] = JunctionTopology(tl_id, ordered, states)
+        return cls(junctions)
+
+    @classmethod
+    def from_traci(cls, connection=traci) -> 'TopologyIndex':
+        """Gradi indeks preko TraCI-ja (po dva poziva po semaforu, jednom pri pokretanju)"""
+        junctions = {}
+        for tl_id in connection.trafficlight.getIDList():
+            links = connection.trafficlight.getControlledLinks(tl_id)
+            ordered = [link[0][0] if link else '' for link in links]
+            logic = connection.trafficlight.getAllProgramLogics(tl_id)[0]
+            junctions[tl_id] = JunctionTopology(tl_id, ordered, [phase.state for phase in logic.phases])
+        return cls(junctions)
+
+    def to_dict(self) -> Dict:
+        return {tl_id: junction.to_dict() for tl_id, junction in self.junctions.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TopologyIndex':
+        return cls({
+            tl_id: JunctionTopology(tl_id, item['link_lanes'], item['phase_states'])
+            for tl_id, item in data.items()
+        })
+
+def file_hash(path: str) -> str:
+    """SHA-1 sažetak sadržaja datoteke"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_topology(net_file: str, connection=traci, cache_file: Optional[str] = None) -> TopologyIndex:
+    """
+    Vraća indeks topologije mreže.
+
+    Ako mrežna datoteka postoji, indeks se gradi iz nje i sprema u
+    predmemoriju pokraj nje (ključ je sažetak sadržaja datoteke), pa ga
+    sljedeća pokretanja samo učitaju. Inače se gradi preko TraCI-ja.
+
+    Args:
+        net_file: Putanja do SUMO mrežne datoteke
+        connection: TraCI konekcija (ako mrežna datoteka nije dostupna)
+        cache_file: Putanja predmemorije (default: <net_file>.topology.json)
+    """
+    if not os.path.exists(net_file):
+        return TopologyIndex.from_traci(connection)
+
+    cache_file = cache_file or f"{net_file}.topology.json"
+    digest = file_hash(net_file)
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == CACHE_VERSION and cached.get('hash') == digest:
+                return TopologyIndex.from_dict(cached['junctions'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    topology = TopologyIndex.from_net_file(net_file)
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'hash': digest, 'junctions': topology.to_dict()}, f)
+    except OSError as e:
+        print(f"Upozorenje: Nije moguće spremiti topologiju u {cache_file}: {e}")
+    return topology
@@ -0,0 +1,58 @@
+"""
+Zajednička osnova domena s TraCI sučeljem (pretplate i brojanje poziva)
+za FakeTraci i QueueSimulator.
+"""
+from typing import Dict, List
+
+class Domain:
+    """
+    Osnova domene (lane, vehicle, simulation, trafficlight) za zamjene
+    traci modula. Pretplate se čuvaju po objektu, a rezultati se računaju
+    nakon svakog koraka (_refresh) kao u SUMO-u. Simulator mora imati
+    brojače `calls` (pozivi preko socketa) i `local_calls` (lokalna
+    čitanja rezultata pretplata).
+    """
+
+    name = ''
+
+    def __init__(self, sim):
+        self._sim = sim
+        self._subscriptions: Dict[str, List[int]] = {}
+        self._results: Dict[str, Dict[int, object]] = {}
+
+    def _call(self, method: str) -> None:
+        self._sim.calls[f"{self.name}.{method}"] += 1
+
+    def _value(self, object_id: str, var_id: int):
+        raise NotImplementedError
+
+    def _exists(self, object_id: str) -> bool:
+        return True
+
+    def _compute(self, object_id: str) -> Dict[int, object]:
+        return {var: self._value(object_id, var) for var in self._subscriptions[object_id]}
+
+    def _refresh(self) -> None:
+        """Računa rezultate pretplata kao što SUMO radi nakon svakog koraka"""
+        for object_id in list(self._subscriptions):
+            if not self._exists(object_id):
+                del self._subscriptions[object_id]
+        self._results = {object_id: self._compute(object_id) for object_id in self._subscriptions}
+
+    def subscribe(self, object_id: str, var_ids=(), begin=None, end=None) -> None:
+        self._call('subscribe')
+        self._subscriptions[object_id] = list(var_ids)
+        self._results[object_id] = self._compute(object_id)
+
+    def unsubscribe(self, object_id: str) -> None:
+        self._call('unsubscribe')
+        self._subscriptions.pop(object_id, None)
+        self._results.pop(object_id, None)
+
+    def getSubscriptionResults(self, object_id: str) -> Dict[int, object]:
+        self._sim.local_calls[f"{self.name}.getSubscriptionResults"] += 1
+        return dict(self._results.get(object_id, {}))
+
+    def getAllSubscriptionResults(self) -> Dict[str, Dict[int, object]]:
+        self._sim.local_calls[f"{self.name}.getAllSubscriptionResults"] += 1
+        return {object_id: dict(values) for object_id, values in self._results.items()}
@@ -0,0 +1,158 @@
+import json
+import os
+import numpy as np
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import Dict, Optional
+from .topology import file_hash
+
+# Inačica formata indeksa (povećati kad se promijeni struktura)
+INDEX_VERSION = 1
+
+# Širina razreda histograma vremena polaska u sekundama
+DEPART_BIN = 60
+
+# Elementi potražnje koji se broje kao vozila
+TRIP_TAGS = ('trip', 'vehicle')
+
+class TripsIndex:
+    """
+    Sažetak trips datoteke: broj vozila, histogram vremena polaska i broj
+    polazaka / dolazaka po rubu.
+
+    Atributi:
+        count: Broj vozila (trip i vehicle elementi)
+        bin_size: Širina razreda histograma u sekundama
+        depart_histogram: Razred (depart // bin_size) -> broj polazaka
+        origins: Rub polaska -> broj vozila
+        destinations: Rub odredišta -> broj vozila
+        first_depart, last_depart: Najranije i najkasnije vrijeme polaska (None ako nema vozila)
+    """
+
+    def __init__(self, count: int = 0, bin_size: int = DEPART_BIN,
+                 depart_histogram: Optional[Dict[int, int]] = None,
+                 origins: Optional[Dict[str, int]] = None,
+                 destinations: Optional[Dict[str, int]] = None,
+                 first_depart: Optional[float] = None, last_depart: Optional[float] = None):
+        self.count = count
+        self.bin_size = bin_size
+        self.depart_histogram = dict(depart_histogram or {})
+        self.origins = dict(origins or {})
+        self.destinations = dict(destinations or {})
+        self.first_depart = first_depart
+        self.last_depart = last_depart
+
+    @classmethod
+    def scan(cls, trips_file: str, bin_size: int = DEPART_BIN) -> 'TripsIndex':
+        """
+        Gradi indeks jednim prolazom kroz XML (iterparse). Obrađeni elementi
+        se brišu iz stabla, pa memorija ne raste s brojem vozila.
+        """
+        count = 0
+        histogram: Counter = Counter()
+        origins: Counter = Counter()
+        destinations: Counter = Counter()
+        first_depart = last_depart = None
+
+        context = ET.iterparse(trips_file, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end' or elem.tag not in TRIP_TAGS:
+                continue
+            count += 1
+            try:
+                depart = float(elem.get('depart', 0))
+            except ValueError:
+                # 'triggered', 'now' i sl. nemaju vrijeme polaska
+                depart = None
+            if depart is not None:
+                histogram[int(depart // bin_size)] += 1
+                first_depart = depart if first_depart is None else min(first_depart, depart)
+                last_depart = depart if last_depart is None else max(last_depart, depart)
+
+            origin, destination = elem.get('from'), elem.get('to')
+            if origin is None:
+                route = elem.find('route')
+                edges = route.get('edges', '').split() if route is not None else []
+                if edges:
+                    origin, destination = edges[0], edges[-1]
+            if origin is not None:
+                origins[origin] += 1
+            if destination is not None:
+                destinations[destination] += 1
+            root.clear()
+
+        return cls(count, bin_size, histogram, origins, destinations, first_depart, last_depart)
+
+    def histogram(self) -> np.ndarray:
+        """Histogram polazaka kao polje (indeks = razred od vremena 0)"""
+        if not self.depart_histogram:
+            return np.zeros(0, dtype=np.int64)
+        counts = np.zeros(max(self.depart_histogram) + 1, dtype=np.int64)
+        for bin_index, value in self.depart_histogram.items():
+            counts[bin_index] = value
+        return counts
+
+    def departures_between(self, begin: float, end: float) -> int:
+        """Procjena broja polazaka u [begin, end) iz histograma (cijeli razredi)"""
+        first, last = int(begin // self.bin_size), int(np.ceil(end / self.bin_size))
+        return sum(value for bin_index, value in self.depart_histogram.items() if first <= bin_index < last)
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'bin_size': self.bin_size,
+            'depart_histogram': {str(k): v for k, v in self.depart_histogram.items()},
+            'origins': self.origins,
+            'destinations': self.destinations,
+            'first_depart': self.first_depart,
+            'last_depart': self.last_depart
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TripsIndex':
+        return cls(data['count'], data['bin_size'],
+                   {int(k): v for k, v in data['depart_histogram'].items()},
+                   data['origins'], data['destinations'], data['first_depart'], data['last_depart'])
+
+def load_trips_index(trips_file: str, bin_size: int = DEPART_BIN,
+                     cache_file: Optional[str] = None) -> TripsIndex:
+    """
+    Vraća indeks trips datoteke.
+
+    Indeks se sprema u predmemoriju pokraj datoteke. Ako se veličina i
+    vrijeme izmjene datoteke nisu promijenili, indeks se samo učita; inače
+    se uspoređuje sažetak sadržaja, a datoteka se ponovno prolazi tek ako
+    se i on promijenio.
+
+    Args:
+        trips_file: Putanja do datoteke s rutama vozila
+        bin_size: Širina razreda histograma vremena polaska u sekundama
+        cache_file: Putanja predmemorije (default: <trips_file>.index.json)
+    """
+    cache_file = cache_file or f"{trips_file}.index.json"
+    stat = os.stat(trips_file)
+    cached = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') != INDEX_VERSION or cached['index']['bin_size'] != bin_size:
+                cached = None
+        except (OSError, ValueError, KeyError):
+            cached = None
+    if cached is not None and cached.get('mtime') == stat.st_mtime and cached.get('size') == stat.st_size:
+        return TripsIndex.from_dict(cached['index'])
+
+    digest = file_hash(trips_file)
+    if cached is not None and cached.get('hash') == digest:
+        index = TripsIndex.from_dict(cached['index'])
+    else:
+        index = TripsIndex.scan(trips_file, bin_size)
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'hash': digest, 'mtime': stat.st_mtime,
+                       'size': stat.st_size, 'index': index.to_dict()}, f)
+    except OSError as e:
+        print(f"Upozorenje: Nije moguće spremiti indeks vozila u {cache_file}: {e}")
+    return index
@@ -0,0 +1,36 @@
+import pytest
+
+# Najmanja mreža s jednim semaforom: dva ulaza (in1, in2) i jedan izlaz
+NET_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<net version="1.9">
+    <edge id="in1" from="A" to="J1"><lane id="in1_0" index="0" speed="13.89" length="100.00"/></edge>
+    <edge id="in2" from="B" to="J1"><lane id="in2_0" index="0" speed="13.89" length="100.00"/></edge>
+    <edge id="out" from="J1" to="C"><lane id="out_0" index="0" speed="13.89" length="100.00"/></edge>
+    <tlLogic id="J1" type="static" programID="0" offset="0">
+        <phase duration="30" state="Gr"/>
+        <phase duration="30" state="rG"/>
+    </tlLogic>
+    <junction id="J1" type="traffic_light" x="0" y="0" incLanes="in1_0 in2_0" intLanes=""/>
+    <connection from="in1" to="out" fromLane="0" toLane="0" tl="J1" linkIndex="0" dir="s" state="O"/>
+    <connection from="in2" to="out" fromLane="0" toLane="0" tl="J1" linkIndex="1" dir="l" state="o"/>
+</net>
+"""
+
+TRIPS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<routes>
+    <trip id="t0" depart="0.00" from="in1" to="out"/>
+    <trip id="t1" depart="5.00" from="in2" to="out"/>
+</routes>
+"""
+
+@pytest.fixture
+def net_file(tmp_path):
+    path = tmp_path / "test.net.xml"
+    path.write_text(NET_XML, encoding='utf-8')
+    return str(path)
+
+@pytest.fixture
+def trips_file(tmp_path):
+    path = tmp_path / "test.trips.xml"
+    path.write_text(TRIPS_XML, encoding='utf-8')
+    return str(path)
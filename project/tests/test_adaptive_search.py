@@ -0,0 +1,103 @@
+import json
+import math
+import os
+import numpy as np
+import pytest
+from src.utils import adaptive_search
+from src.utils.adaptive_search import (
+    DEFAULT_SPACE, sample_configurations, successive_halving, hyperband
+)
+
+# Pozivi lažnog simulatora (workers=1, pa se izvršava u ovom procesu)
+CALLS = []
+
+def stub_run(net_file, trips_file, alpha, gamma, epsilon, epsilon_decay,
+             episodes=10, steps=100, checkpoint=None, warm_start=None, resume=False, **kwargs):
+    """Lažni simulator: nagrada je alpha, a checkpoint pamti ukupan broj epizoda"""
+    completed = 0
+    if warm_start:
+        with open(os.path.join(warm_start, 'state.json'), 'r', encoding='utf-8') as f:
+            completed = json.load(f)['episodes']
+    CALLS.append({'alpha': alpha, 'episodes': episodes, 'completed': completed,
+                  'checkpoint': checkpoint, 'resume': resume})
+    if checkpoint:
+        os.makedirs(checkpoint, exist_ok=True)
+        with open(os.path.join(checkpoint, 'state.json'), 'w', encoding='utf-8') as f:
+            json.dump({'episodes': completed + episodes}, f)
+    stats = {'waiting_time': 1.0, 'queue_length': 2.0, 'speed': 3.0, 'vehicles': 4.0}
+    return alpha, stats
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    CALLS.clear()
+
+def configs(n):
+    return [{'alpha': (i + 1) / 100, 'gamma': 0.9, 'epsilon': 0.1, 'epsilon_decay': 0.99}
+            for i in range(n)]
+
+def test_sample_configurations_respects_bounds():
+    samples = sample_configurations(500, seed=0)
+    assert len(samples) == 500
+    for name, (kind, low, high) in DEFAULT_SPACE.items():
+        values = np.array([sample[name] for sample in samples])
+        if kind == 'log_decay':
+            values = 1.0 - values
+        assert values.min() >= low and values.max() <= high
+        if kind == 'log_uniform' or kind == 'log_decay':
+            # Log-jednoliko: otprilike pola uzoraka ispod geometrijske sredine
+            below = np.mean(values < math.sqrt(low * high))
+            assert 0.4 < below < 0.6
+
+def test_sample_configurations_is_reproducible_and_rejects_unknown_kind():
+    assert sample_configurations(5, seed=1) == sample_configurations(5, seed=1)
+    assert sample_configurations(5, seed=1) != sample_configurations(5, seed=2)
+    with pytest.raises(ValueError):
+        sample_configurations(1, space={'alpha': ('normal', 0.0, 1.0)})
+
+def test_successive_halving_survivors_and_budgets(net_file, trips_file):
+    best = successive_halving(net_file, trips_file, configs=configs(9), min_episodes=1,
+                              max_episodes=9, eta=3, run_fn=stub_run)
+
+    rungs = [[call for call in CALLS if call['completed'] == completed] for completed in (0, 1, 3)]
+    assert [len(rung) for rung in rungs] == [9, 3, 1]
+    # Preživjeli nastavljaju iz checkpointa i odrađuju samo razliku do novog budžeta
+    assert {call['episodes'] for call in rungs[0]} == {1}
+    assert {call['episodes'] for call in rungs[1]} == {2}
+    assert {call['episodes'] for call in rungs[2]} == {6}
+    assert not any(call['resume'] for call in rungs[0])
+    assert all(call['resume'] for call in rungs[1] + rungs[2])
+    # Najboljih 1/eta po nagradi (alpha)
+    assert sorted(call['alpha'] for call in rungs[1]) == [0.07, 0.08, 0.09]
+    assert rungs[2][0]['alpha'] == 0.09
+    assert rungs[2][0]['checkpoint'] == next(c['checkpoint'] for c in rungs[0] if c['alpha'] == 0.09)
+
+    assert best['alpha'] == 0.09 and best['episodes'] == 9
+    assert not set(best) & {'checkpoint', 'warm_start', 'resume'}
+    # Privremeni checkpointi se brišu
+    assert not os.path.exists(rungs[0][0]['checkpoint'])
+
+def test_successive_halving_caps_budget_at_max_episodes(net_file, trips_file):
+    successive_halving(net_file, trips_file, configs=configs(4), min_episodes=2,
+                       max_episodes=5, eta=2, run_fn=stub_run)
+
+    assert [(call['completed'], call['episodes']) for call in CALLS if call['alpha'] == 0.04] == \
+        [(0, 2), (2, 2), (4, 1)]
+    assert len(CALLS) == 4 + 2 + 1
+
+def test_hyperband_brackets(net_file, trips_file, monkeypatch):
+    brackets = []
+
+    def fake_halving(net_file, trips_file, n_configs, min_episodes, max_episodes, **kwargs):
+        brackets.append((n_configs, min_episodes))
+        return {'reward': float(min_episodes), 'episodes': max_episodes}
+
+    monkeypatch.setattr(adaptive_search, 'successive_halving', fake_halving)
+    best = hyperband(net_file, trips_file, max_episodes=9, eta=3, run_fn=stub_run)
+
+    # s_max = 2: zagrade (9 × 1), (5 × 3), (3 × 9)
+    assert brackets == [(9, 1), (5, 3), (3, 9)]
+    assert best['reward'] == 9.0
+
+    brackets.clear()
+    hyperband(net_file, trips_file, max_episodes=27, eta=3, run_fn=stub_run)
+    assert brackets == [(27, 1), (12, 3), (6, 9), (4, 27)]
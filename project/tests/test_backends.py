@@ -0,0 +1,46 @@
+import math
+import pytest
+from src.utils import backend, sumo_utils
+from src.utils.fake_traci import FakeTraci
+from src.utils.grid_search import run_simulation_with_params
+from src.utils.queue_sim import QueueSimulator
+
+PARAMS = {'alpha': 0.1, 'gamma': 0.9, 'epsilon': 0.5, 'epsilon_decay': 0.9}
+STAT_KEYS = {'waiting_time', 'queue_length', 'speed', 'vehicles'}
+
+@pytest.mark.parametrize('name', ['fake', 'queue'])
+def test_training_loop_runs_on_backend(net_file, trips_file, name):
+    avg_reward, stats = run_simulation_with_params(net_file, trips_file, **PARAMS,
+                                                   episodes=2, steps=60, backend=name)
+
+    assert math.isfinite(avg_reward)
+    assert set(stats) == STAT_KEYS
+    assert all(math.isfinite(value) for value in stats.values())
+    # Simulacija je zatvorena nakon pokretanja
+    assert sumo_utils.get_backend() is None
+
+def test_queue_backend_moves_trips_through_the_junction(net_file, trips_file):
+    _, stats = run_simulation_with_params(net_file, trips_file, **PARAMS,
+                                          episodes=1, steps=60, backend='queue')
+
+    assert stats['vehicles'] > 0
+    assert stats['speed'] > 0
+
+@pytest.mark.parametrize('name, connection_type', [('fake', FakeTraci), ('queue', QueueSimulator)])
+def test_default_backend_comes_from_environment(net_file, trips_file, monkeypatch, name, connection_type):
+    # DEFAULT_BACKEND se čita iz SUMO_BACKEND pri uvozu modula
+    monkeypatch.setenv('SUMO_BACKEND', name)
+    monkeypatch.setattr(backend, 'DEFAULT_BACKEND', name)
+    started = []
+    initialize = sumo_utils.initialize_simulation
+
+    def recording_initialize(*args, **kwargs):
+        connection = initialize(*args, **kwargs)
+        started.append(connection)
+        return connection
+
+    monkeypatch.setattr('src.utils.reset.initialize_simulation', recording_initialize)
+    avg_reward, _ = run_simulation_with_params(net_file, trips_file, **PARAMS, episodes=1, steps=20)
+
+    assert math.isfinite(avg_reward)
+    assert started and all(isinstance(connection, connection_type) for connection in started)
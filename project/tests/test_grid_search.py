@@ -0,0 +1,57 @@
+import os
+from src.utils.grid_search import iter_parallel_grid_search, parallel_grid_search
+
+PARAM_SETS = [
+    {'alpha': 0.1, 'gamma': 0.9, 'epsilon': 0.1, 'epsilon_decay': 0.995},
+    {'alpha': 0.1, 'gamma': 0.95, 'epsilon': 0.2, 'epsilon_decay': 0.995},
+    {'alpha': 0.2, 'gamma': 0.9, 'epsilon': 0.2, 'epsilon_decay': 0.995}
+]
+
+# Kombinacija za koju lažni simulator baca iznimku
+FAILING = {'alpha': 0.5, 'gamma': 0.5, 'epsilon': 0.5, 'epsilon_decay': 0.5}
+
+def stub_run(net_file, trips_file, alpha, gamma, epsilon, epsilon_decay,
+             episodes=10, steps=100, label=None, **kwargs):
+    """Lažni simulator (na razini modula, kako bi se mogao poslati u radni proces)"""
+    if alpha == FAILING['alpha']:
+        raise RuntimeError("neuspjelo pokretanje")
+    stats = {'waiting_time': 1.0, 'queue_length': 2.0, 'speed': 3.0, 'vehicles': 4.0,
+             'label': label, 'pid': os.getpid(), **kwargs}
+    return alpha + gamma + epsilon, stats
+
+def test_results_stream_back_for_every_param_set(net_file, trips_file):
+    results = list(iter_parallel_grid_search(net_file, trips_file, PARAM_SETS, workers=2,
+                                             episodes=1, steps=10, run_fn=stub_run))
+
+    assert sorted(map(str, (params for params, _, _ in results))) == sorted(map(str, PARAM_SETS))
+    for params, avg_reward, stats in results:
+        assert avg_reward == params['alpha'] + params['gamma'] + params['epsilon']
+        assert stats['pid'] != os.getpid()
+
+def test_each_run_gets_a_distinct_label(net_file, trips_file):
+    results = list(iter_parallel_grid_search(net_file, trips_file, PARAM_SETS, workers=2,
+                                             episodes=1, steps=10, run_fn=stub_run))
+
+    labels = [stats['label'] for _, _, stats in results]
+    assert all(labels)
+    assert len(set(labels)) == len(PARAM_SETS)
+    # Oznaka sadrži PID radnog procesa, pa se TraCI konekcije procesa ne sudaraju
+    assert all(str(stats['pid']) in stats['label'] for _, _, stats in results)
+
+def test_each_run_gets_a_distinct_port(net_file, trips_file):
+    results = list(iter_parallel_grid_search(net_file, trips_file, PARAM_SETS, workers=2,
+                                             episodes=1, steps=10, run_fn=stub_run))
+
+    ports = [stats['port'] for _, _, stats in results]
+    assert all(isinstance(port, int) and port > 0 for port in ports)
+    assert len(set(ports)) == len(PARAM_SETS)
+
+def test_failing_combination_is_reported_and_skipped(net_file, trips_file, capsys):
+    best = parallel_grid_search(net_file, trips_file, workers=2,
+                                param_sets=PARAM_SETS + [FAILING], run_fn=stub_run)
+
+    output = capsys.readouterr().out
+    assert "Greška pri testiranju parametara" in output
+    assert "neuspjelo pokretanje" in output
+    assert best['alpha'] == 0.2 and best['gamma'] == 0.9 and best['epsilon'] == 0.2
+    assert best['reward'] == 0.2 + 0.9 + 0.2
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from src.utils.metrics_sink import MetricsSink, MetricsReader, pq
+
+TL_IDS = ['J1', 'J2', 'J3']
+
+def log_junctions(sink, episode, step, n):
+    """Zapisuje n redaka u jednom pozivu (kružno po semaforima)"""
+    tl_ids = [TL_IDS[i % len(TL_IDS)] for i in range(n)]
+    sink.log_junctions(episode, step, tl_ids,
+                       actions=np.arange(n) % 4,
+                       rewards=-np.arange(n, dtype=np.float32),
+                       queues=np.arange(n),
+                       waiting_times=np.arange(n, dtype=np.float32) / 2)
+
+@pytest.mark.parametrize('format', [
+    'npz',
+    pytest.param('parquet', marks=pytest.mark.skipif(pq is None, reason="pyarrow nije instaliran"))
+])
+def test_round_trip_across_chunk_boundaries(tmp_path, format):
+    sink = MetricsSink(str(tmp_path), run_id='run', tl_ids=TL_IDS[:1], chunk_size=4, format=format)
+    # 3 + 6 + 1 redaka: drugi poziv popunjava prvi blok, cijeli drugi i počinje treći
+    log_junctions(sink, 0, 1.0, 3)
+    log_junctions(sink, 0, 2.0, 6)
+    log_junctions(sink, 1, 3.0, 1)
+    for episode in range(5):
+        sink.log_episode(episode, total_reward=float(episode), mean_waiting_time=0.5,
+                         mean_queue=1.5, reset_latency=0.01)
+    sink.close()
+
+    reader = MetricsReader(sink.run_dir)
+    assert reader.schema['chunks'] == {'steps': 0, 'junctions': 3, 'episodes': 2}
+
+    junctions = reader.table('junctions')
+    expected_n = [3, 6, 1]
+    assert len(junctions['episode']) == sum(expected_n)
+    np.testing.assert_array_equal(junctions['episode'], [0] * 9 + [1])
+    np.testing.assert_array_equal(junctions['step'], np.repeat([1.0, 2.0, 3.0], expected_n))
+    np.testing.assert_array_equal(junctions['action'],
+                                  np.concatenate([np.arange(n) % 4 for n in expected_n]))
+    np.testing.assert_array_equal(junctions['queue'],
+                                  np.concatenate([np.arange(n) for n in expected_n]))
+    names = reader.junction_names(junctions['tl_id'])
+    assert list(names) == [TL_IDS[i % len(TL_IDS)] for n in expected_n for i in range(n)]
+    # Semafori koji nisu zadani unaprijed dobivaju indekse redom pojavljivanja
+    assert reader.tl_ids == TL_IDS
+
+    episodes = reader.table('episodes')
+    np.testing.assert_array_equal(episodes['episode'], np.arange(5))
+    np.testing.assert_array_equal(episodes['total_reward'], np.arange(5, dtype=np.float64))
+    assert len(reader.table('steps')['step']) == 0
+
+def test_cached_columns_are_memory_mapped(tmp_path):
+    sink = MetricsSink(str(tmp_path), run_id='run', chunk_size=2)
+    for episode in range(3):
+        sink.log_episode(episode, total_reward=1.0)
+    sink.close()
+
+    reader = MetricsReader(sink.run_dir)
+    mapped = reader.table('episodes')
+    assert isinstance(mapped['episode'], np.memmap)
+    # Drugo čitanje koristi spremljenu predmemoriju i daje iste vrijednosti
+    np.testing.assert_array_equal(reader.table('episodes', mmap=False)['episode'], mapped['episode'])
@@ -0,0 +1,62 @@
+from collections import Counter
+from src.utils.fake_traci import FakeTraci
+from src.utils.observation import SubscriptionObserver
+from src.simulation.qlearning import TrafficLightQLearning
+
+LANES = ['n_0', 'n_1', 's_0', 'e_0', 'w_0', 'w_1']
+TRAFFIC_LIGHTS = {'J1': ['n_0', 'n_1', 's_0'], 'J2': ['e_0', 'w_0', 'w_1']}
+
+# Getteri koji bi značili jedan round-trip po traci ili po vozilu
+PER_OBJECT_GETTERS = ('lane.getLastStep', 'vehicle.getSpeed', 'vehicle.getWaitingTime',
+                      'vehicle.getStopState', 'vehicle.getLaneID')
+
+def make_agents(fake):
+    observer = SubscriptionObserver(LANES, connection=fake)
+    agents = {tl_id: TrafficLightQLearning(tl_id, [0, 1, 2, 3], lanes, observer=observer)
+              for tl_id, lanes in TRAFFIC_LIGHTS.items()}
+    return observer, agents
+
+def step_calls(fake, agents, new_vehicles=()):
+    """Jedan korak: nova vozila, simulationStep, stanje i nagrada svih agenata"""
+    for i, veh_id in enumerate(new_vehicles):
+        fake.add_vehicle(veh_id, LANES[i % len(LANES)], speed=0.0, waiting_time=float(i))
+    fake.reset_counters()
+    fake.simulationStep()
+    for agent in agents.values():
+        agent.get_state()
+        agent.get_reward()
+    return Counter(fake.calls), Counter(fake.local_calls)
+
+def test_socket_calls_per_step_do_not_depend_on_lanes_or_vehicles():
+    fake = FakeTraci(lanes=LANES, traffic_lights=TRAFFIC_LIGHTS)
+    observer, agents = make_agents(fake)
+    step_calls(fake, agents)
+
+    for step in range(5):
+        # Vozila se pomiču, mijenjaju brzinu i traku kao u pravoj simulaciji
+        for i, vehicle in enumerate(list(fake.vehicles.values())):
+            vehicle.speed = float((i + step) % 3)
+            vehicle.waiting_time += 1.0
+            if (i + step) % 4 == 0:
+                vehicle.lane = LANES[(i + step) % len(LANES)]
+        new_vehicles = [f"v{step}_{k}" for k in range(step + 1)]
+        calls, local_calls = step_calls(fake, agents, new_vehicles)
+
+        # Jedan simulationStep i po jedna pretplata za svako novo vozilo, ništa po traci
+        assert calls == Counter({'simulationStep': 1, 'vehicle.subscribe': len(new_vehicles)})
+        assert not any(name.startswith(PER_OBJECT_GETTERS) for name in calls)
+        # Rezultati traka i vozila čitaju se jednom po koraku za sve agente;
+        # ostala čitanja samo lokalno provjeravaju vrijeme simulacije
+        assert local_calls['lane.getAllSubscriptionResults'] == 1
+        assert local_calls['vehicle.getAllSubscriptionResults'] == 1
+        assert local_calls['simulation.getSubscriptionResults'] == 2 * len(agents)
+
+def test_steady_state_costs_one_round_trip_per_step():
+    fake = FakeTraci(lanes=LANES, traffic_lights=TRAFFIC_LIGHTS)
+    observer, agents = make_agents(fake)
+    calls, _ = step_calls(fake, agents, [f"v{i}" for i in range(50)])
+    assert calls['vehicle.subscribe'] == 50
+
+    for _ in range(5):
+        calls, _ = step_calls(fake, agents)
+        assert calls == Counter({'simulationStep': 1})
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+from src.simulation.qtable import QTable, DenseQTable
+
+STATES = [(0, 1, 2), (3, 4), (5,), (1, 1, 1, 1)]
+
+def filled_table():
+    table = QTable(3, initial_capacity=2)
+    for sid, state in enumerate(STATES):
+        for action in range(3):
+            table.set(state, action, sid * 10 + action)
+    return table
+
+def filled_dense():
+    table = DenseQTable(8, 3)
+    for state in (1, 4, 6):
+        for action in range(3):
+            table.set(state, action, state * 10 + action)
+    return table
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_qtable_round_trip(tmp_path, mmap):
+    table = filled_table()
+    prefix = str(tmp_path / 'q')
+    table.save(prefix)
+
+    loaded = QTable.load(prefix, mmap=mmap)
+    assert loaded.frozen == mmap
+    assert len(loaded) == len(STATES)
+    for state in STATES:
+        assert state in loaded
+        assert loaded.lookup(state) == table.lookup(state)
+        np.testing.assert_array_equal(loaded.values[loaded.lookup(state)], table.row(state))
+    assert loaded.lookup((9, 9)) == -1
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_dense_qtable_round_trip(tmp_path, mmap):
+    table = filled_dense()
+    prefix = str(tmp_path / 'dense')
+    table.save(prefix)
+
+    loaded = DenseQTable.load(prefix, mmap=mmap)
+    assert loaded.frozen == mmap
+    np.testing.assert_array_equal(loaded.table(), table.table())
+    np.testing.assert_array_equal(loaded.visited, table.visited)
+
+def test_mmap_qtable_copies_on_first_update(tmp_path):
+    table = filled_table()
+    prefix = str(tmp_path / 'q')
+    table.save(prefix)
+    loaded = QTable.load(prefix, mmap=True)
+
+    # Poznata stanja: update_batch ne dodaje stanje, ali mora kopirati tablicu
+    states = np.array([0, 1])
+    actions = np.array([2, 0])
+    rewards = np.array([1.0, -1.0])
+    next_states = np.array([1, 2])
+    table.update_batch(states, actions, rewards, next_states, alpha=0.5, gamma=0.9)
+    loaded.update_batch(states, actions, rewards, next_states, alpha=0.5, gamma=0.9)
+
+    assert not loaded.frozen
+    np.testing.assert_allclose(loaded.table(), table.table())
+    # Datoteka na disku ostaje nepromijenjena
+    np.testing.assert_array_equal(QTable.load(prefix, mmap=True).table(), filled_table().table())
+
+    loaded.set(STATES[3], 1, -5.0)
+    assert loaded.get(STATES[3], 1) == -5.0
+
+def test_mmap_qtable_copies_on_set(tmp_path):
+    prefix = str(tmp_path / 'q')
+    filled_table().save(prefix)
+    loaded = QTable.load(prefix, mmap=True)
+
+    loaded.set(STATES[0], 0, 7.0)
+    assert not loaded.frozen
+    assert loaded.get(STATES[0], 0) == 7.0
+    assert loaded.get(STATES[1], 2) == 12.0
+
+def test_mmap_dense_qtable_copies_on_first_update(tmp_path):
+    table = filled_dense()
+    prefix = str(tmp_path / 'dense')
+    table.save(prefix)
+    loaded = DenseQTable.load(prefix, mmap=True)
+
+    states = np.array([1, 4, 1])
+    actions = np.array([0, 1, 0])
+    rewards = np.array([1.0, 2.0, 3.0])
+    next_states = np.array([4, 6, 6])
+    table.update_batch(states, actions, rewards, next_states, alpha=0.1, gamma=0.9)
+    loaded.update_batch(states, actions, rewards, next_states, alpha=0.1, gamma=0.9)
+
+    assert not loaded.frozen
+    np.testing.assert_allclose(loaded.table(), table.table())
+
+def sequential_update(values, states, actions, rewards, next_states, alpha, gamma):
+    """Referentno ažuriranje: prijelaz po prijelaz, s ciljevima iz tablice prije serije"""
+    values = values.astype(np.float64)
+    targets = rewards + gamma * values[next_states].max(axis=1)
+    for s, a, target in zip(states, actions, targets):
+        values[s, a] = (1 - alpha) * values[s, a] + alpha * target
+    return values
+
+@pytest.mark.parametrize('duplicates', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_update_batch_matches_sequential_updates(seed, duplicates):
+    rng = np.random.default_rng(seed)
+    n_states, n_actions, batch = 6, 3, 64
+    table = QTable(n_actions)
+    for state in range(n_states):
+        table.state_id((state,))
+    table.values[:n_states] = rng.normal(size=(n_states, n_actions))
+    initial = table.table().copy()
+
+    if duplicates:
+        # Malo parova (s, a): ponavljanja su nužna
+        states = rng.integers(0, 2, batch)
+        actions = rng.integers(0, 2, batch)
+    else:
+        pairs = rng.choice(n_states * n_actions, size=n_states * n_actions, replace=False)
+        states, actions = np.divmod(pairs, n_actions)
+    rewards = rng.normal(size=len(states))
+    next_states = rng.integers(0, n_states, len(states))
+
+    table.update_batch(states, actions, rewards, next_states, alpha=0.3, gamma=0.9)
+
+    expected = sequential_update(initial, states, actions, rewards, next_states, alpha=0.3, gamma=0.9)
+    np.testing.assert_allclose(table.table(), expected, rtol=1e-5, atol=1e-5)
+
+def test_update_batch_repeated_pair_composes_decay():
+    table = QTable(2)
+    table.set((0,), 0, 1.0)
+    table.set((1,), 1, 4.0)
+    states = np.array([0, 0, 0])
+    actions = np.array([0, 0, 0])
+    rewards = np.array([1.0, 2.0, 3.0])
+    next_states = np.array([1, 1, 1])
+
+    table.update_batch(states, actions, rewards, next_states, alpha=0.5, gamma=0.5)
+
+    # Ciljevi 3, 4, 5: 1 -> 2 -> 3 -> 4
+    assert table.get((0,), 0) == pytest.approx(4.0)
+    assert table.get((1,), 1) == pytest.approx(4.0)
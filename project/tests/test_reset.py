@@ -0,0 +1,26 @@
+import shutil
+from src.utils.reset import EpisodeResetManager
+
+def test_new_trips_file_restarts_once(net_file, trips_file, tmp_path):
+    other = str(tmp_path / 'other.trips.xml')
+    shutil.copy(trips_file, other)
+    resets = EpisodeResetManager(net_file, trips_file, mode='load_state', backend='fake')
+    resets.start()
+    resets.reset()
+
+    # Ista datoteka: loadState, bez ponovnog pokretanja
+    resets.set_trips_file(trips_file)
+    resets.reset()
+    assert len(resets.start_latencies) == 1
+
+    # Nova datoteka: ponovno pokretanje i novo početno stanje
+    state_dir = resets.state_dir
+    resets.set_trips_file(other)
+    resets.reset()
+    assert len(resets.start_latencies) == 2
+    assert resets.state_dir != state_dir and resets.state_file is not None
+
+    # Sljedeće resetiranje opet koristi loadState
+    resets.reset()
+    assert len(resets.start_latencies) == 2
+    resets.close()
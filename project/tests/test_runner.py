@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from src.simulation.qlearning import TrafficLightQLearning
+from src.simulation.multi_agent import MultiIntersectionQLearning
+from src.simulation.shared_policy import SharedPolicyQLearning
+from src.simulation.checkpoint import read_checkpoint_meta
+from src.simulation.standard_simulation import SimulationStats
+from src.simulation.runner import run_episodes, checkpoint_due
+from src.utils.observation import SubscriptionObserver
+from src.utils.topology import load_topology
+from src.utils.reset import EpisodeResetManager
+from src.utils.metrics_sink import MetricsSink, MetricsReader
+
+def start(net_file, trips_file):
+    """Simulacija na pozadini 'queue' s agentom po semaforu"""
+    resets = EpisodeResetManager(net_file, trips_file, mode='load_state', backend='queue')
+    connection = resets.start()
+    topology = load_topology(net_file, connection)
+    observer = SubscriptionObserver(connection=connection)
+    agents = {
+        tl_id: TrafficLightQLearning(tl_id, topology.phases(tl_id), topology.lanes(tl_id),
+                                     observer=observer)
+        for tl_id in topology.traffic_lights
+    }
+    # Mala serija, kako bi se učilo već u kratkim epizodama
+    for agent in agents.values():
+        agent.batch_size = 4
+    return resets, observer, agents
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_run_episodes_learns_logs_and_closes(net_file, trips_file, tmp_path, pipelined):
+    resets, observer, agents = start(net_file, trips_file)
+    stats = SimulationStats()
+    sink = MetricsSink(str(tmp_path / 'metrics'), run_id='run', tl_ids=list(agents))
+    checkpoint = str(tmp_path / 'checkpoint')
+
+    rewards = run_episodes(resets, observer, agents, stats, episodes=3, steps=60, sink=sink,
+                           pipelined=pipelined, checkpoint_dir=checkpoint, checkpoint_every=2,
+                           completed=5)
+
+    assert len(rewards) == 3 and all(np.isfinite(rewards))
+    assert len(stats.episode_summaries) == 3
+    assert all(len(agent.q_table) > 0 for agent in agents.values())
+    # Checkpoint nakon zadnje epizode broji i epizode prije ovog pokretanja
+    assert read_checkpoint_meta(checkpoint)['episode'] == 8
+    # Simulacija i zapisivanje metrika su zatvoreni
+    assert resets.connection is None
+    episodes = MetricsReader(sink.run_dir).table('episodes')
+    np.testing.assert_array_equal(episodes['episode'], [0, 1, 2])
+    np.testing.assert_allclose(episodes['total_reward'], rewards)
+
+@pytest.mark.parametrize('multi_class', [MultiIntersectionQLearning, SharedPolicyQLearning])
+def test_run_episodes_multi_agent_path(net_file, trips_file, multi_class):
+    resets, observer, agents = start(net_file, trips_file)
+    multi = multi_class(agents)
+    stats = SimulationStats()
+
+    rewards = run_episodes(resets, observer, agents, stats, episodes=2, steps=60, multi=multi)
+
+    assert len(rewards) == 2 and all(np.isfinite(rewards))
+    assert stats.overall['vehicle_count'].count > 0
+
+def test_frozen_agents_do_not_learn(net_file, trips_file):
+    resets, observer, agents = start(net_file, trips_file)
+    for agent in agents.values():
+        agent.freeze()
+    stats = SimulationStats()
+
+    run_episodes(resets, observer, agents, stats, episodes=2, steps=60)
+
+    assert all(len(agent.experience) == 0 for agent in agents.values())
+    assert all(len(agent.q_table) == 0 for agent in agents.values())
+
+def test_checkpoint_schedule():
+    assert [done for done in range(1, 8) if checkpoint_due(done, 3, 7)] == [3, 6, 7]
@@ -0,0 +1,36 @@
+import pytest
+from src.simulation.standard_simulation import SimulationStats
+
+def run_episode(stats, values):
+    stats.start_episode()
+    for value in values:
+        stats.record([value, value, value, value, 0])
+
+def test_single_episode_is_summarised_on_close():
+    stats = SimulationStats()
+    run_episode(stats, [1.0, 2.0, 3.0])
+    stats.close()
+
+    assert len(stats.episode_summaries) == 1
+    assert stats.episode_summaries[0]['waiting_time']['count'] == 3
+    assert stats.episode_summaries[0]['waiting_time']['mean'] == pytest.approx(2.0)
+
+def test_every_episode_is_summarised_once():
+    stats = SimulationStats()
+    for episode in range(3):
+        run_episode(stats, [float(episode)] * (episode + 1))
+    stats.close()
+    # Ponovno zatvaranje ne dodaje praznu epizodu
+    stats.close()
+
+    assert [s['queue_length']['count'] for s in stats.episode_summaries] == [1, 2, 3]
+    assert [s['queue_length']['mean'] for s in stats.episode_summaries] == [0.0, 1.0, 2.0]
+    assert stats.overall['queue_length'].count == 6
+
+def test_empty_episode_is_skipped():
+    stats = SimulationStats()
+    run_episode(stats, [1.0])
+    run_episode(stats, [])
+    stats.end_episode()
+
+    assert len(stats.episode_summaries) == 1